@@ -1,45 +1,138 @@
 import os
-import sqlite3
-from flask import Flask, render_template, request, redirect, url_for, session, g
+import sys
+from flask import Flask, render_template, request, redirect, url_for, session, g, jsonify
 from functools import wraps
 
+import migrations
+from storage import Storage
+
 BASE_DIR = os.path.dirname(__file__)
-DB_PATH = os.path.join(BASE_DIR, 'vault.db')
+DB_PATH = os.environ.get('VAULT_DB', os.path.join(BASE_DIR, 'vault.db'))
+
+# Modules shared by the apps live in <repo>/shared
+sys.path.insert(0, os.path.join(os.path.abspath(BASE_DIR), '..', '..', 'shared'))
+import http_pipeline
 
 app = Flask(__name__)
 # Use environment variable to set secret in real usage
 app.secret_key = os.environ.get('VAULT_SECRET', 'change-me')
 
+# Compression, conditional GETs and fingerprinted static files
+http_pipeline.init_app(app)
+
+# Opt-in request timing, /metrics and profiling (see shared/instrument.py);
+# set up before any database connection is opened
+if os.environ.get('INSTRUMENT') == '1':
+    import instrument
+    instrument.init_app(app, prefix='password_vault')
+
+# Per-thread WAL connections, handed to requests via g and released on teardown
+storage = Storage(DB_PATH)
+storage.init_app(app)
+
 # Static credentials (for demo only)
 USERNAME = os.environ.get('VAULT_USER', 'admin')
 PASSWORD = os.environ.get('VAULT_PASS', 'password')
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Maximum number of rows returned by a search
+SEARCH_LIMIT = int(os.environ.get('VAULT_SEARCH_LIMIT', 200))
+
+# Rows per page on the index page / JSON listing (keyset pagination on id)
+PAGE_SIZE = int(os.environ.get('VAULT_PAGE_SIZE', 50))
+MAX_PAGE_SIZE = 500
+
+# Columns the list views need; passwords are fetched one at a time on reveal
+# or edit, so listings never carry them
+LIST_COLUMNS = 'id, site, username, description'
+
+# Set by init_db(); False when this SQLite build lacks FTS5 (trigram needs 3.34+)
+FTS_ENABLED = False
+
+def get_db():
+    return storage.get_db()
 
 def init_db():
-    conn = get_db_connection()
-    # Drop existing table and recreate with schema
-    conn.execute('DROP TABLE IF EXISTS entries')
-    conn.execute(
-        '''
-        CREATE TABLE IF NOT EXISTS entries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            site TEXT NOT NULL,
-            username TEXT NOT NULL,
-            password TEXT NOT NULL,
-            description TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        '''
-    )
-    conn.commit()
-    conn.close()
+    # Apply pending schema migrations (a cheap version check once current)
+    global FTS_ENABLED
+    conn = storage.connect()
+    try:
+        migrations.migrate(conn)
+        FTS_ENABLED = migrations.has_table(conn, 'entries_fts')
+    finally:
+        conn.close()
 
 init_db()
 
+def search_entries(conn, query, limit=SEARCH_LIMIT):
+    """Return up to ``limit`` entries matching ``query``, best matches first.
+
+    Uses the trigram FTS5 index (ranked by bm25) for queries of three or
+    more characters; shorter queries, which trigrams cannot index, and
+    SQLite builds without FTS5 fall back to a bounded LIKE scan.
+    """
+    if FTS_ENABLED and len(query) >= 3:
+        # quote as a single FTS phrase so user input is never parsed as syntax
+        phrase = '"' + query.replace('"', '""') + '"'
+        return conn.execute(
+            '''
+            SELECT e.id, e.site, e.username, e.description FROM entries_fts
+            JOIN entries e ON e.id = entries_fts.rowid
+            WHERE entries_fts MATCH ?
+            ORDER BY bm25(entries_fts), e.id DESC
+            LIMIT ?
+            ''',
+            (phrase, limit)
+        ).fetchall()
+    # Search across site, username, and description fields
+    pattern = f'%{query}%'
+    return conn.execute(
+        f'''
+        SELECT {LIST_COLUMNS} FROM entries
+        WHERE site LIKE ?
+        OR username LIKE ?
+        OR description LIKE ?
+        ORDER BY id DESC
+        LIMIT ?
+        ''',
+        (pattern, pattern, pattern, limit)
+    ).fetchall()
+
+def list_entries(conn, before=None, limit=PAGE_SIZE):
+    """Return ``(rows, next_cursor)`` for one page of entries, newest first.
+
+    Keyset pagination: ``before`` is the id of the last row already shown,
+    so each page is an index range scan on the primary key regardless of
+    how many entries the vault holds. ``next_cursor`` is None on the last
+    page.
+    """
+    if before is not None:
+        rows = conn.execute(
+            f'SELECT {LIST_COLUMNS} FROM entries WHERE id < ? ORDER BY id DESC LIMIT ?',
+            (before, limit + 1)
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            f'SELECT {LIST_COLUMNS} FROM entries ORDER BY id DESC LIMIT ?',
+            (limit + 1,)
+        ).fetchall()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1]['id']
+    return rows, None
+
+def data_version():
+    """Counter bumped by triggers on every change to entries (migration 4)."""
+    return get_db().execute('SELECT n FROM data_version').fetchone()[0]
+
+def page_version():
+    # pages are private to the logged-in user and change with any entry
+    return (data_version(), session.get('user'))
+
+def page_args():
+    before = request.args.get('before', type=int)
+    limit = request.args.get('limit', PAGE_SIZE, type=int)
+    return before, max(1, min(limit, MAX_PAGE_SIZE))
+
 def login_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -69,6 +162,8 @@ def logout():
 
 @app.route('/', methods=['GET', 'POST'])
 @login_required
+@http_pipeline.uncompressed
+@http_pipeline.conditional(page_version, cache_control='private, no-cache')
 def index():
     if request.method == 'POST':
         site = request.form.get('site')
@@ -76,53 +171,67 @@ def index():
         pwd = request.form.get('pwd')
         desc = request.form.get('description')
         if site and uname and pwd:
-            conn = get_db_connection()
+            conn = get_db()
             conn.execute(
                 'INSERT INTO entries (site, username, password, description) VALUES (?, ?, ?, ?)',
                 (site, uname, pwd, desc)
             )
             conn.commit()
-            conn.close()
         return redirect(url_for('index'))
 
     search_query = request.args.get('q', '').strip()
-    conn = get_db_connection()
-    
+    conn = get_db()
+
+    next_cursor = None
     if search_query:
-        # Search across site, username, and description fields
-        query = '''
-            SELECT * FROM entries 
-            WHERE site LIKE ? 
-            OR username LIKE ? 
-            OR description LIKE ?
-            ORDER BY id DESC
-        '''
-        search_pattern = f'%{search_query}%'
-        rows = conn.execute(query, (search_pattern, search_pattern, search_pattern)).fetchall()
+        rows = search_entries(conn, search_query)
     else:
-        rows = conn.execute('SELECT * FROM entries ORDER BY id DESC').fetchall()
-    
-    conn.close()
+        before, limit = page_args()
+        rows, next_cursor = list_entries(conn, before, limit)
+
     items = [dict(r) for r in rows]
-    return render_template('index.html', items=items)
+    return render_template('index.html', items=items, next_cursor=next_cursor)
+
+@app.route('/api/entries')
+@login_required
+@http_pipeline.uncompressed
+@http_pipeline.conditional(page_version, cache_control='private, no-cache')
+def api_entries():
+    """JSON page of entries for infinite scroll: ``?before=<id>&limit=<n>``."""
+    before, limit = page_args()
+    if before is None and request.args.get('before'):
+        return jsonify({'error': 'invalid cursor'}), 400
+    rows, next_cursor = list_entries(get_db(), before, limit)
+    return jsonify({'items': [dict(r) for r in rows], 'next': next_cursor})
+
+@app.route('/api/entries/<int:entry_id>/password')
+@login_required
+@http_pipeline.uncompressed
+def reveal_password(entry_id):
+    """One entry's password, for the list's Reveal button."""
+    row = get_db().execute('SELECT password FROM entries WHERE id = ?', (entry_id,)).fetchone()
+    if row is None:
+        return jsonify({'error': 'not found'}), 404
+    resp = jsonify({'password': row['password']})
+    resp.headers['Cache-Control'] = 'no-store'
+    return resp
 
 @app.route('/delete/<int:entry_id>', methods=['POST'])
 @login_required
 def delete(entry_id):
-    conn = get_db_connection()
+    conn = get_db()
     conn.execute('DELETE FROM entries WHERE id = ?', (entry_id,))
     conn.commit()
-    conn.close()
     return redirect(url_for('index'))
 
 
 @app.route('/edit/<int:entry_id>', methods=['GET', 'POST'])
 @login_required
+@http_pipeline.uncompressed
 def edit(entry_id):
-    conn = get_db_connection()
+    conn = get_db()
     row = conn.execute('SELECT * FROM entries WHERE id = ?', (entry_id,)).fetchone()
     if not row:
-        conn.close()
         return redirect(url_for('index'))
 
     if request.method == 'POST':
@@ -135,11 +244,9 @@ def edit(entry_id):
             (site, uname, pwd, desc, entry_id)
         )
         conn.commit()
-        conn.close()
         return redirect(url_for('index'))
 
     item = dict(row)
-    conn.close()
     return render_template('edit.html', item=item)
 
 if __name__ == '__main__':
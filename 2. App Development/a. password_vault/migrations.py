@@ -0,0 +1,175 @@
+"""Versioned, non-destructive schema migrations for the vault database.
+
+The applied schema version is stored in the database itself
+(``PRAGMA user_version``). ``migrate()`` first does a lock-free version
+check, which is all a worker pays once the schema is current. Only when
+migrations are pending does it take SQLite's write lock
+(``BEGIN IMMEDIATE``), re-check the version and apply what is still
+missing. N workers starting together therefore run each migration exactly
+once, and never drop or rewrite existing data.
+
+An OPTIONAL migration that fails (e.g. FTS5 missing from this SQLite
+build) is skipped and recorded in ``skipped_migrations`` with the SQLite
+version it failed on. It is retried once the app runs on a different
+SQLite version, so upgrading SQLite picks it up.
+
+To change the schema, append a new ``(version, description, statements)``
+entry to MIGRATIONS; never edit one that has shipped.
+"""
+import sqlite3
+
+MIGRATIONS = [
+    (1, 'create entries table', [
+        '''
+        CREATE TABLE IF NOT EXISTS entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            site TEXT NOT NULL,
+            username TEXT NOT NULL,
+            password TEXT NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    ]),
+    # Full-text index over site/username/description, kept in sync by
+    # triggers. Optional: skipped on SQLite builds without FTS5 trigram.
+    (2, 'full-text search index', [
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+            site, username, description,
+            content='entries', content_rowid='id', tokenize='trigram'
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS entries_fts_ai AFTER INSERT ON entries BEGIN
+            INSERT INTO entries_fts(rowid, site, username, description)
+            VALUES (new.id, new.site, new.username, new.description);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS entries_fts_ad AFTER DELETE ON entries BEGIN
+            INSERT INTO entries_fts(entries_fts, rowid, site, username, description)
+            VALUES ('delete', old.id, old.site, old.username, old.description);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS entries_fts_au AFTER UPDATE ON entries BEGIN
+            INSERT INTO entries_fts(entries_fts, rowid, site, username, description)
+            VALUES ('delete', old.id, old.site, old.username, old.description);
+            INSERT INTO entries_fts(rowid, site, username, description)
+            VALUES (new.id, new.site, new.username, new.description);
+        END
+        ''',
+        "INSERT INTO entries_fts(entries_fts) VALUES ('rebuild')",
+    ]),
+    (3, 'indexes on site and created_at', [
+        'CREATE INDEX IF NOT EXISTS entries_site ON entries(site)',
+        'CREATE INDEX IF NOT EXISTS entries_created_at ON entries(created_at)',
+    ]),
+    # Single-row change counter; pages derive their ETags from it instead
+    # of hashing the rendered output.
+    (4, 'data version counter', [
+        'CREATE TABLE IF NOT EXISTS data_version (id INTEGER PRIMARY KEY CHECK (id = 1), n INTEGER NOT NULL)',
+        'INSERT OR IGNORE INTO data_version (id, n) VALUES (1, 0)',
+        '''
+        CREATE TRIGGER IF NOT EXISTS entries_version_ai AFTER INSERT ON entries BEGIN
+            UPDATE data_version SET n = n + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS entries_version_au AFTER UPDATE ON entries BEGIN
+            UPDATE data_version SET n = n + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS entries_version_ad AFTER DELETE ON entries BEGIN
+            UPDATE data_version SET n = n + 1;
+        END
+        ''',
+    ]),
+]
+
+OPTIONAL = {2}
+
+LATEST = MIGRATIONS[-1][0]
+
+
+SKIPPED_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS skipped_migrations '
+    '(version INTEGER PRIMARY KEY, sqlite_version TEXT NOT NULL)'
+)
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def retry_due(conn):
+    """Versions skipped on a different SQLite version than this one."""
+    if not has_table(conn, 'skipped_migrations'):
+        return []
+    return [r[0] for r in conn.execute(
+        'SELECT version FROM skipped_migrations WHERE sqlite_version != ? ORDER BY version',
+        (sqlite3.sqlite_version,),
+    )]
+
+
+def _apply(conn, version, statements):
+    """Run one migration in a savepoint; False if an OPTIONAL one failed."""
+    conn.execute(f'SAVEPOINT migration_{version}')
+    try:
+        for sql in statements:
+            conn.execute(sql)
+    except sqlite3.OperationalError:
+        conn.execute(f'ROLLBACK TO migration_{version}')
+        conn.execute(f'RELEASE migration_{version}')
+        if version not in OPTIONAL:
+            raise
+        conn.execute(SKIPPED_SCHEMA)
+        conn.execute(
+            'INSERT OR REPLACE INTO skipped_migrations (version, sqlite_version) VALUES (?, ?)',
+            (version, sqlite3.sqlite_version),
+        )
+        return False
+    conn.execute(f'RELEASE migration_{version}')
+    if has_table(conn, 'skipped_migrations'):
+        conn.execute('DELETE FROM skipped_migrations WHERE version = ?', (version,))
+    return True
+
+
+def migrate(conn):
+    """Bring the database behind ``conn`` up to LATEST; returns versions applied."""
+    if schema_version(conn) >= LATEST and not retry_due(conn):
+        return []
+
+    applied = []
+    previous = conn.isolation_level
+    conn.isolation_level = None  # explicit transaction control below
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # another worker may have migrated while we waited for the lock
+            current = schema_version(conn)
+            retry = set(retry_due(conn))
+            for version, _description, statements in MIGRATIONS:
+                if version <= current and version not in retry:
+                    continue
+                if _apply(conn, version, statements):
+                    applied.append(version)
+                if version > current:
+                    # skipped optional steps still advance the version;
+                    # skipped_migrations remembers them
+                    conn.execute(f'PRAGMA user_version = {version}')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    finally:
+        conn.isolation_level = previous
+    return applied
+
+
+def has_table(conn, name):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = ?", (name,)
+    ).fetchone() is not None
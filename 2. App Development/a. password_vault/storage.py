@@ -0,0 +1,77 @@
+"""SQLite storage layer for the password vault.
+
+Connections are opened once per worker thread with WAL journaling and
+tuned pragmas, then reused across requests: ``get_db()`` hands the
+thread's connection to the current request via ``flask.g`` and the
+app-context teardown rolls back anything left uncommitted instead of
+closing it. sqlite3's per-connection statement cache (``cached_statements``)
+means repeated queries skip re-preparing their SQL.
+"""
+import sqlite3
+import threading
+
+from flask import g
+
+# Pragmas applied to every new connection. journal_mode=WAL is persistent
+# in the database file; the rest are per-connection.
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -16000),        # ~16 MiB page cache
+    ('mmap_size', 256 * 1024 * 1024),
+    ('temp_store', 'MEMORY'),
+)
+
+STATEMENT_CACHE_SIZE = 256
+BUSY_TIMEOUT = 5.0
+
+
+class Storage:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def connect(self):
+        """Open a new, tuned connection (not tracked per thread)."""
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            check_same_thread=True,
+        )
+        conn.row_factory = sqlite3.Row
+        for name, value in PRAGMAS:
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def thread_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self.connect()
+        return conn
+
+    def get_db(self):
+        """Connection for the current request, reused across requests on this thread."""
+        if 'db' not in g:
+            g.db = self.thread_connection()
+        return g.db
+
+    def release(self, exc=None):
+        conn = g.pop('db', None)
+        if conn is None:
+            return
+        if exc is not None:
+            # don't hand a connection in an unknown state to the next request
+            conn.close()
+            self._local.conn = None
+        elif conn.in_transaction:
+            conn.rollback()
+
+    def close_thread_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def init_app(self, app):
+        app.teardown_appcontext(self.release)
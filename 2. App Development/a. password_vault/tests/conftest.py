@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app.py migrates its database on import; point it at a scratch file first
+os.environ['VAULT_DB'] = os.path.join(tempfile.mkdtemp(prefix='vault-tests-'), 'vault.db')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as vault  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    conn = vault.storage.connect()
+    with conn:
+        conn.execute('DELETE FROM entries')
+    conn.close()
+    client = vault.app.test_client()
+    resp = client.post('/login', data={'username': vault.USERNAME, 'password': vault.PASSWORD})
+    assert resp.status_code == 302
+    return client
+
+
+def add_entry(client, site, uname='user', pwd='secret', description=''):
+    resp = client.post('/', data={'site': site, 'uname': uname, 'pwd': pwd, 'description': description})
+    assert resp.status_code == 302
+
+
+def db():
+    return vault.storage.connect()
@@ -0,0 +1,56 @@
+import pytest
+
+from conftest import add_entry, vault
+
+
+def all_pages(client, limit):
+    pages = [client.get(f'/api/entries?limit={limit}').get_json()]
+    while pages[-1]['next'] is not None:
+        pages.append(client.get(f"/api/entries?limit={limit}&before={pages[-1]['next']}").get_json())
+    return pages
+
+
+def test_keyset_pages_newest_first(client):
+    for i in range(12):
+        add_entry(client, f'site{i}.example')
+    pages = all_pages(client, 5)
+    assert [len(p['items']) for p in pages] == [5, 5, 2]
+    sites = [it['site'] for p in pages for it in p['items']]
+    assert sites == [f'site{i}.example' for i in range(11, -1, -1)]
+    # listings never carry passwords
+    assert all('password' not in it for p in pages for it in p['items'])
+
+
+def test_exact_multiple_ends_without_an_empty_page(client):
+    for i in range(10):
+        add_entry(client, f'site{i}.example')
+    pages = all_pages(client, 5)
+    assert [len(p['items']) for p in pages] == [5, 5]
+    assert pages[-1]['next'] is None
+
+
+def test_cursor_past_the_end(client):
+    add_entry(client, 'only.example')
+    data = client.get('/api/entries?before=1').get_json()
+    assert data == {'items': [], 'next': None}
+
+
+@pytest.mark.parametrize('before', ['abc', '1.5', '-'])
+def test_invalid_cursor_is_rejected(client, before):
+    assert client.get(f'/api/entries?before={before}').status_code == 400
+
+
+def test_limit_is_clamped(client):
+    for i in range(3):
+        add_entry(client, f'site{i}.example')
+    assert len(client.get('/api/entries?limit=0').get_json()['items']) == 1
+    assert len(client.get(f'/api/entries?limit={vault.MAX_PAGE_SIZE + 1}').get_json()['items']) == 3
+
+
+def test_reveal_password(client):
+    add_entry(client, 'bank.example', pwd='hunter2')
+    item = client.get('/api/entries').get_json()['items'][0]
+    resp = client.get(f"/api/entries/{item['id']}/password")
+    assert resp.get_json() == {'password': 'hunter2'}
+    assert resp.headers['Cache-Control'] == 'no-store'
+    assert client.get(f"/api/entries/{item['id'] + 1}/password").status_code == 404
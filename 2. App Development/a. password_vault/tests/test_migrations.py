@@ -0,0 +1,70 @@
+import sqlite3
+
+import pytest
+
+import migrations
+
+# the schema init_db() used to drop and recreate on every start
+BASELINE = '''
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    site TEXT NOT NULL,
+    username TEXT NOT NULL,
+    password TEXT NOT NULL,
+    description TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+'''
+
+
+@pytest.fixture
+def baseline(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'vault.db'))
+    conn.execute(BASELINE)
+    conn.executemany(
+        'INSERT INTO entries (site, username, password, description) VALUES (?, ?, ?, ?)',
+        [(f'site{i}.example', f'user{i}', f'pw{i}', f'account {i}') for i in range(20)],
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def rows(conn):
+    return conn.execute('SELECT id, site, username, password, description FROM entries ORDER BY id').fetchall()
+
+
+def test_baseline_database_keeps_its_rows(baseline):
+    before = rows(baseline)
+    applied = migrations.migrate(baseline)
+    assert applied[0] == 1 and applied[-1] == migrations.LATEST
+    assert rows(baseline) == before
+    assert migrations.schema_version(baseline) == migrations.LATEST
+    assert baseline.execute('SELECT n FROM data_version').fetchone()[0] == 0
+    if migrations.has_table(baseline, 'entries_fts'):
+        # the rebuild indexed the rows that were already there
+        hits = baseline.execute("SELECT rowid FROM entries_fts WHERE entries_fts MATCH '\"site7\"'").fetchall()
+        assert [h[0] for h in hits] == [8]
+    # a second start finds nothing to do
+    assert migrations.migrate(baseline) == []
+
+
+def test_skipped_optional_migration_is_retried_on_another_sqlite(baseline, monkeypatch):
+    real = migrations.MIGRATIONS
+    broken = [(v, d, ['CREATE VIRTUAL TABLE entries_fts USING no_such_module(site)'] if v == 2 else s)
+              for v, d, s in real]
+    monkeypatch.setattr(migrations, 'MIGRATIONS', broken)
+    assert 2 not in migrations.migrate(baseline)
+    assert migrations.schema_version(baseline) == migrations.LATEST
+    assert baseline.execute('SELECT version FROM skipped_migrations').fetchall() == [(2,)]
+    # same SQLite: not retried, and startup stays a version check
+    assert migrations.migrate(baseline) == []
+
+    monkeypatch.setattr(migrations, 'MIGRATIONS', real)
+    monkeypatch.setattr(migrations.sqlite3, 'sqlite_version', '0.0.0-upgraded')
+    applied = migrations.migrate(baseline)
+    if not migrations.has_table(baseline, 'entries_fts'):
+        pytest.skip('SQLite without FTS5 trigram')
+    assert applied == [2]
+    assert baseline.execute('SELECT COUNT(*) FROM skipped_migrations').fetchone()[0] == 0
+    assert migrations.migrate(baseline) == []
@@ -0,0 +1,64 @@
+import pytest
+
+from conftest import add_entry, db, vault
+
+
+@pytest.fixture(autouse=True)
+def fts():
+    if not vault.FTS_ENABLED:
+        pytest.skip('SQLite without FTS5 trigram')
+
+
+def fts_ids(term):
+    conn = db()
+    try:
+        return sorted(r[0] for r in conn.execute(
+            'SELECT rowid FROM entries_fts WHERE entries_fts MATCH ?', ('"' + term + '"',)))
+    finally:
+        conn.close()
+
+
+def entry_id(site):
+    conn = db()
+    try:
+        return conn.execute('SELECT id FROM entries WHERE site = ?', (site,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def search(client, q):
+    html = client.get('/', query_string={'q': q}).get_data(as_text=True)
+    return [site for site in ('github.com', 'gitlab.com', 'bank.example', 'mail.example') if site in html]
+
+
+def test_triggers_keep_the_index_in_sync(client):
+    add_entry(client, 'github.com', description='work account')
+    item = entry_id('github.com')
+    assert fts_ids('work') == [item]
+    client.post(f'/edit/{item}', data={'site': 'github.com', 'uname': 'user', 'pwd': 'x',
+                                       'description': 'personal account'})
+    assert fts_ids('work') == []
+    assert fts_ids('personal') == [item]
+    client.post(f'/delete/{item}')
+    assert fts_ids('personal') == []
+    assert fts_ids('github') == []
+
+
+def test_trigram_search_matches_inside_words(client):
+    add_entry(client, 'github.com', uname='alice', description='code hosting')
+    add_entry(client, 'gitlab.com', uname='bob', description='mirror')
+    add_entry(client, 'bank.example', uname='alice.smith', description='savings')
+    add_entry(client, 'mail.example', uname='carol', description='inbox')
+    assert search(client, 'git') == ['github.com', 'gitlab.com']
+    # substrings of usernames and descriptions, case-insensitive
+    assert search(client, 'LICE') == ['github.com', 'bank.example']
+    assert search(client, 'avin') == ['bank.example']
+    # user input is a phrase, not FTS syntax
+    assert search(client, 'git OR mail') == []
+    assert search(client, '"ban') == []
+
+
+def test_short_queries_fall_back_to_like(client):
+    add_entry(client, 'github.com', uname='alice')
+    add_entry(client, 'mail.example', uname='carol')
+    assert search(client, 'ub') == ['github.com']
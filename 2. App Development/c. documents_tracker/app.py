@@ -4,87 +4,538 @@
 Provides a minimal REST API and serves the static frontend.
 """
 from pathlib import Path
+import base64
 import json
+import os
+import re
+import sys
+import time
 from datetime import datetime
+from urllib.parse import urlsplit
 
-from flask import Flask, jsonify, request, send_from_directory, abort
+from flask import Flask, Response, jsonify, request, abort, stream_with_context, url_for
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import insert, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import deferred, lazyload, load_only
 
 HERE = Path(__file__).parent.resolve()
 
+# Modules shared by the apps live in <repo>/shared
+sys.path.insert(0, str(HERE.parent.parent / 'shared'))
+import http_pipeline
+
 app = Flask(__name__, static_folder=str(HERE / 'static'), static_url_path='/static')
-CORS(app)
+CORS(app, expose_headers=['X-Next-Cursor', 'X-Change-Token'])
+# Compression, ETags from the change log and fingerprinted static files
+http_pipeline.init_app(app)
 
-# SQLite DB in the project folder
-db_path = HERE / 'doctrack.db'
+# SQLite DB in the project folder (DOCTRACK_DB points elsewhere, e.g. for tests)
+db_path = Path(os.environ.get('DOCTRACK_DB', HERE / 'doctrack.db'))
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(app)
 
+ITEM_FIELDS = ('id', 'section', 'desc', 'urls', 'notes', 'created')
+
+
+def clean_urls(urls):
+    if isinstance(urls, str):
+        urls = [urls]
+    return [u for u in (str(u).strip() for u in urls or []) if u]
+
+
+def url_host(url):
+    parts = urlsplit(url if '//' in url else '//' + url)
+    return parts.hostname  # already lower-cased, None if there is none
+
+
+def url_rows(item_id, urls):
+    return [{'item_id': item_id, 'position': i, 'url': u, 'host': url_host(u)} for i, u in enumerate(urls)]
+
 
 class Item(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     section = db.Column(db.String(200), index=True)
     desc = db.Column(db.String(500))
-    urls = db.Column(db.Text)  # store JSON list
+    # JSON copy of the URL list, only read by the FTS triggers; the API
+    # reads URLs from item_urls
+    search_urls = deferred(db.Column('urls', db.Text))
     notes = db.Column(db.Text)
     created = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'section': self.section,
-            'desc': self.desc,
-            'urls': json.loads(self.urls or '[]'),
-            'notes': self.notes,
-            'created': int(self.created.timestamp() * 1000) if self.created else None,
-        }
+    url_rows = db.relationship(
+        'ItemUrl', order_by='ItemUrl.position', lazy='selectin', cascade='all, delete-orphan',
+    )
+
+    # newest-first listing and its keyset cursor
+    __table_args__ = (db.Index('ix_item_created_id', 'created', 'id'),)
+
+    @property
+    def url_list(self):
+        return [u.url for u in self.url_rows]
+
+    def set_urls(self, urls):
+        urls = clean_urls(urls)
+        self.search_urls = json.dumps(urls)
+        self.url_rows = [ItemUrl(position=i, url=u, host=url_host(u)) for i, u in enumerate(urls)]
+
+    def to_dict(self, fields=ITEM_FIELDS):
+        out = {}
+        for f in fields:
+            if f == 'urls':
+                out[f] = self.url_list
+            elif f == 'created':
+                out[f] = int(self.created.timestamp() * 1000) if self.created else None
+            else:
+                out[f] = getattr(self, f)
+        return out
+
+
+class ItemUrl(db.Model):
+    """One URL of an item; indexed by url and host for reverse lookups."""
+    __tablename__ = 'item_urls'
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id', ondelete='CASCADE'), nullable=False)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    url = db.Column(db.Text, nullable=False, index=True)
+    host = db.Column(db.String(255), index=True)
+
+    __table_args__ = (db.Index('ix_item_urls_item_id', 'item_id', 'position'),)
+
+
+class ItemChange(db.Model):
+    """
+    Change log for delta sync: the latest change per item ('upsert' or
+    'delete'), written by triggers on item. ``seq`` only grows, so
+    "everything after seq N" is a range scan and the log stays one row per
+    item (plus tombstones) however often items are edited.
+    """
+    __tablename__ = 'item_changes'
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    item_id = db.Column(db.Integer, nullable=False, unique=True)
+    op = db.Column(db.String(10), nullable=False)
+
+    __table_args__ = {'sqlite_autoincrement': True}  # never reuse a seq
+
+
+# Opt-in request timing, /metrics and profiling (see shared/instrument.py);
+# set up before init_db() opens the first connection
+if os.environ.get('INSTRUMENT') == '1':
+    import instrument
+    instrument.init_app(app, prefix='documents_tracker')
+    instrument.wrap(Item, 'to_dict', 'json')
+
+# INSERT OR REPLACE on the unique item_id drops the item's previous entry
+# and appends a new one with the next seq.
+CHANGE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS item_changes_ai AFTER INSERT ON item BEGIN
+        INSERT OR REPLACE INTO item_changes(item_id, op) VALUES (new.id, 'upsert');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS item_changes_au AFTER UPDATE ON item BEGIN
+        INSERT OR REPLACE INTO item_changes(item_id, op) VALUES (new.id, 'upsert');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS item_changes_ad AFTER DELETE ON item BEGIN
+        INSERT OR REPLACE INTO item_changes(item_id, op) VALUES (old.id, 'delete');
+    END
+    """,
+]
+
+
+# Full-text index over section/desc/notes/urls, kept in sync with the item
+# table by triggers. prefix='2 3' pre-indexes short prefixes so
+# search-as-you-type queries stay cheap.
+FTS_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE item_fts USING fts5(
+        section, "desc", notes, urls,
+        content='item', content_rowid='id', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS item_fts_ai AFTER INSERT ON item BEGIN
+        INSERT INTO item_fts(rowid, section, "desc", notes, urls)
+        VALUES (new.id, new.section, new."desc", new.notes, new.urls);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS item_fts_ad AFTER DELETE ON item BEGIN
+        INSERT INTO item_fts(item_fts, rowid, section, "desc", notes, urls)
+        VALUES ('delete', old.id, old.section, old."desc", old.notes, old.urls);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS item_fts_au AFTER UPDATE ON item BEGIN
+        INSERT INTO item_fts(item_fts, rowid, section, "desc", notes, urls)
+        VALUES ('delete', old.id, old.section, old."desc", old.notes, old.urls);
+        INSERT INTO item_fts(rowid, section, "desc", notes, urls)
+        VALUES (new.id, new.section, new."desc", new.notes, new.urls);
+    END
+    """,
+    "INSERT INTO item_fts(item_fts) VALUES ('rebuild')",
+]
+
+# bm25 column weights: section, desc, notes, urls
+FTS_WEIGHTS = (4.0, 8.0, 2.0, 1.0)
+SEARCH_LIMIT = 50
+PAGE_SIZE = 100
+CHANGES_LIMIT = 500
+# The event stream polls the change log for each open connection, so it is
+# opt-in (DOCTRACK_SSE=1) and every connection ends after SSE_MAX_SECONDS;
+# EventSource reconnects SSE_RETRY_MS later and resumes from Last-Event-ID.
+SSE_ENABLED = os.environ.get('DOCTRACK_SSE') == '1'
+SSE_POLL_INTERVAL = 1.0
+SSE_KEEPALIVE = 15
+SSE_MAX_SECONDS = 60
+SSE_RETRY_MS = 5000
+EXPORT_BATCH = 500
+# rows per statement/transaction for the batch endpoints; also keeps
+# IN (...) lists under SQLite's bound-parameter limit
+WRITE_CHUNK = 500
+EDITABLE_FIELDS = ('section', 'desc', 'urls', 'notes')
+MAX_LIMIT = 500
+FTS_ENABLED = False
+
+
+def init_fts():
+    """Create the FTS index on first run; False if SQLite lacks FTS5."""
+    with db.engine.connect() as conn:
+        if conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'item_fts'").first():
+            return True
+    try:
+        with db.engine.begin() as conn:
+            for sql in FTS_SCHEMA:
+                conn.exec_driver_sql(sql)
+    except OperationalError as e:
+        app.logger.warning('FTS5 unavailable, search falls back to LIKE: %s', e)
+        return False
+    return True
+
+
+def chunks(seq, size=WRITE_CHUNK):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def backfill_item_urls():
+    """Copy URL lists from item.urls into item_urls (databases from before item_urls)."""
+    rows = db.session.execute(text("SELECT id, urls FROM item WHERE urls IS NOT NULL AND urls != '[]'")).all()
+    new_rows = []
+    for item_id, raw in rows:
+        try:
+            urls = json.loads(raw)
+        except ValueError:
+            continue
+        new_rows.extend(url_rows(item_id, clean_urls(urls)))
+    for chunk in chunks(new_rows):
+        db.session.execute(insert(ItemUrl), chunk)
+    db.session.commit()
 
 
 def init_db():
+    global FTS_ENABLED
     with app.app_context():
+        had_item_urls = db.inspect(db.engine).has_table('item_urls')
+        had_changes = db.inspect(db.engine).has_table('item_changes')
         db.create_all()
+        if not had_item_urls:
+            backfill_item_urls()
+        with db.engine.begin() as conn:
+            if not had_changes:
+                # existing items are the first changes a new client sees
+                conn.exec_driver_sql(
+                    "INSERT INTO item_changes(item_id, op) SELECT id, 'upsert' FROM item ORDER BY created, id"
+                )
+            for sql in CHANGE_TRIGGERS:
+                conn.exec_driver_sql(sql)
+        # create_all() skips tables that already exist; add newer indexes
+        for index in Item.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+        FTS_ENABLED = init_fts()
 
 init_db()
 
+
+def fts_query(q):
+    """Turn user input into an FTS5 query: every word must match as a prefix."""
+    terms = re.findall(r'\w+', q)
+    return ' '.join(f'"{t}"*' for t in terms)
+
+
+def encode_cursor(*values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, *types):
+    """The values given to encode_cursor(); 400 unless there is one of each of ``types``."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        abort(400, 'invalid cursor')
+    if (not isinstance(values, list) or len(values) != len(types)
+            or not all(isinstance(v, t) and not isinstance(v, bool) for v, t in zip(values, types))):
+        abort(400, 'invalid cursor')
+    return values
+
+
+def fields_arg():
+    """``?fields=id,desc`` -> the requested subset of ITEM_FIELDS (default: all)."""
+    raw = request.args.get('fields')
+    if not raw:
+        return ITEM_FIELDS
+    fields = tuple(f.strip() for f in raw.split(',') if f.strip())
+    unknown = set(fields) - set(ITEM_FIELDS)
+    if unknown or not fields:
+        abort(400, f"unknown fields: {', '.join(sorted(unknown))}")
+    return fields
+
+
+def only_fields(query, fields):
+    """Load just the columns needed for ``fields`` (and the cursor)."""
+    if fields == ITEM_FIELDS:
+        return query
+    columns = [getattr(Item, f) for f in set(fields) - {'urls'} | {'created'}]
+    query = query.options(load_only(*columns))
+    if 'urls' not in fields:
+        query = query.options(lazyload(Item.url_rows))
+    return query
+
+
+def limit_arg(default):
+    limit = request.args.get('limit', default, type=int)
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def page_limit(default):
+    """limit_arg(), or None (everything) when neither ?limit= nor ?cursor= is given."""
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        return None
+    return limit_arg(default)
+
+
+def list_items(query, limit, cursor=None):
+    """
+    One page of ``query`` newest first, plus the next page's cursor or None.
+    Keyset pagination on (created, id) walks ix_item_created_id, so every
+    page costs the same however deep it is. ``limit=None`` returns every row.
+    """
+    if cursor:
+        created, item_id = decode_cursor(cursor, str, int)
+        try:
+            created = datetime.fromisoformat(created)
+        except (TypeError, ValueError):
+            abort(400, 'invalid cursor')
+        query = query.filter(db.tuple_(Item.created, Item.id) < (created, item_id))
+    query = query.order_by(Item.created.desc(), Item.id.desc())
+    if limit is None:
+        return query.all(), None
+    items = query.limit(limit + 1).all()
+    more = len(items) > limit
+    items = items[:limit]
+    next_cursor = encode_cursor(items[-1].created.isoformat(), items[-1].id) if more else None
+    return items, next_cursor
+
+
+def change_token():
+    return db.session.query(db.func.max(ItemChange.seq)).scalar() or 0
+
+
+def changes_since(since, limit=CHANGES_LIMIT, fields=ITEM_FIELDS):
+    """
+    Changes after token ``since``, oldest first, as
+    ([{"op": "upsert", "item": {...}} | {"op": "delete", "id": n}], token, more).
+    Pass ``token`` back as ``since`` to continue.
+    """
+    rows = (ItemChange.query.filter(ItemChange.seq > since)
+            .order_by(ItemChange.seq).limit(limit + 1).all())
+    more = len(rows) > limit
+    rows = rows[:limit]
+    upserts = [r.item_id for r in rows if r.op == 'upsert']
+    by_id = {}
+    if upserts:
+        by_id = {it.id: it for it in only_fields(Item.query, fields).filter(Item.id.in_(upserts))}
+    changes = []
+    for r in rows:
+        it = by_id.get(r.item_id)
+        if it is not None:
+            changes.append({'op': 'upsert', 'item': it.to_dict(fields)})
+        else:
+            # deleted (or deleted again after this row was read)
+            changes.append({'op': 'delete', 'id': r.item_id})
+    return changes, rows[-1].seq if rows else since, more
+
+
+def search_items(q, limit, cursor=None, fields=ITEM_FIELDS):
+    """
+    Items matching ``q`` ordered by BM25 (best first), plus the cursor for
+    the next page or None. The cursor is the last row's (score, id), so
+    pages don't shift when items are added between requests. ``limit=None``
+    returns every match.
+    """
+    match = fts_query(q)
+    if not match:
+        return [], None
+    after = decode_cursor(cursor, (int, float), int) if cursor else None
+    sql = f"""
+        SELECT id, score FROM (
+            SELECT rowid AS id, bm25(item_fts, {', '.join(map(str, FTS_WEIGHTS))}) AS score
+            FROM item_fts WHERE item_fts MATCH :match
+        )
+        {'WHERE (score, id) > (:score, :id)' if after else ''}
+        ORDER BY score, id
+        LIMIT :limit
+    """
+    # LIMIT -1 is no limit in SQLite
+    params = {'match': match, 'limit': -1 if limit is None else limit + 1}
+    if after:
+        params['score'], params['id'] = after
+    rows = db.session.execute(text(sql), params).all()
+    more = limit is not None and len(rows) > limit
+    rows = rows[:limit]
+    by_id = {it.id: it for it in only_fields(Item.query, fields).filter(Item.id.in_([r.id for r in rows]))}
+    items = [by_id[r.id] for r in rows if r.id in by_id]
+    next_cursor = encode_cursor(rows[-1].score, rows[-1].id) if more else None
+    return items, next_cursor
+
+# static/ references in index.html, rewritten to fingerprinted URLs
+STATIC_REF = re.compile(r'((?:src|href)=")static/([^"?]+)"')
+
+
 @app.route('/')
 def index():
-    # serve the static index.html
-    return send_from_directory(str(HERE), 'index.html')
+    # serve index.html; its assets get ?v=<hash> URLs cached for a year
+    html = (HERE / 'index.html').read_text(encoding='utf-8')
+    return STATIC_REF.sub(lambda m: f'{m.group(1)}{url_for("static", filename=m.group(2))}"', html)
 
 
 @app.route('/api/ping')
 def ping():
-    return jsonify({'ok': True})
+    return jsonify({'ok': True, 'stream': SSE_ENABLED})
 
 
 @app.route('/api/items', methods=['GET'])
 def get_items():
-    q = request.args.get('q', '').strip().lower()
-    query = Item.query
-    
-    if q:
-        # Search across multiple fields using LIKE
-        query = query.filter(db.or_(
-            db.func.lower(Item.section).like(f'%{q}%'),
-            db.func.lower(Item.desc).like(f'%{q}%'),
-            db.func.lower(Item.notes).like(f'%{q}%')
-        ))
-    
-    items = query.order_by(Item.created.desc()).all()
-    return jsonify([it.to_dict() for it in items])
+    # Every match, as before paging existed, unless ?limit= or ?cursor= asks
+    # for one page; the next page's cursor is then returned in the
+    # X-Next-Cursor header. ?fields= trims each item.
+    # X-Change-Token is where /api/items/changes should continue from; it
+    # is read first, so a change racing this request is replayed, not lost.
+    # The token is also the page's ETag: unchanged data answers 304.
+    token = change_token()
+    etag = http_pipeline.version_etag(request.full_path, token)
+    resp = http_pipeline.not_modified(etag)
+    if resp is not None:
+        resp.headers['X-Change-Token'] = str(token)
+        return resp
+    q = request.args.get('q', '').strip()
+    url = request.args.get('url', '').strip()
+    host = request.args.get('host', '').strip().lower()
+    fields = fields_arg()
+    cursor = request.args.get('cursor')
+
+    if q and FTS_ENABLED and not (url or host):
+        # ranked full-text search
+        items, next_cursor = search_items(q, page_limit(SEARCH_LIMIT), cursor, fields)
+    else:
+        query = only_fields(Item.query, fields)
+        # documents referencing a URL / host: index lookups on item_urls
+        if url:
+            query = query.filter(Item.id.in_(db.select(ItemUrl.item_id).where(ItemUrl.url == url)))
+        if host:
+            query = query.filter(Item.id.in_(db.select(ItemUrl.item_id).where(ItemUrl.host == host)))
+        if q:
+            # Search across multiple fields using LIKE
+            q = q.lower()
+            query = query.filter(db.or_(
+                db.func.lower(Item.section).like(f'%{q}%'),
+                db.func.lower(Item.desc).like(f'%{q}%'),
+                db.func.lower(Item.notes).like(f'%{q}%')
+            ))
+        items, next_cursor = list_items(query, page_limit(PAGE_SIZE), cursor)
+
+    resp = jsonify([it.to_dict(fields) for it in items])
+    if next_cursor:
+        resp.headers['X-Next-Cursor'] = next_cursor
+    resp.headers['X-Change-Token'] = str(token)
+    return http_pipeline.tag(resp, etag)
+
+
+@app.route('/api/items/changes', methods=['GET'])
+@http_pipeline.conditional(lambda: (change_token(),))
+def get_changes():
+    """Inserts/updates (full items) and deletes (tombstones) after ?since=."""
+    since = request.args.get('since', 0, type=int)
+    changes, token, more = changes_since(since, limit_arg(CHANGES_LIMIT), fields_arg())
+    return jsonify({'changes': changes, 'token': token, 'more': more})
+
+
+@app.route('/api/items/changes/stream', methods=['GET'])
+def stream_changes():
+    """
+    The same changes as Server-Sent Events, one event per batch with the
+    token as its id, so EventSource resumes via Last-Event-ID on reconnect.
+    Only served with DOCTRACK_SSE=1; each connection lasts SSE_MAX_SECONDS.
+    """
+    if not SSE_ENABLED:
+        abort(404)
+    since = request.headers.get('Last-Event-ID', type=int)
+    if since is None:
+        since = request.args.get('since', 0, type=int)
+
+    def generate():
+        token = since
+        quiet = 0.0
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        while time.monotonic() < deadline:
+            changes, token, more = changes_since(token)
+            # end the read transaction so the next poll sees new commits
+            db.session.rollback()
+            if changes:
+                quiet = 0.0
+                yield f"id: {token}\ndata: {json.dumps(changes, separators=(',', ':'))}\n\n"
+                if more:
+                    continue
+            elif quiet >= SSE_KEEPALIVE:
+                quiet = 0.0
+                yield ': keep-alive\n\n'
+            time.sleep(SSE_POLL_INTERVAL)
+            quiet += SSE_POLL_INTERVAL
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/export', methods=['GET'])
+@http_pipeline.conditional(lambda: (change_token(),))
+def export_items():
+    """Every item as NDJSON, streamed in batches instead of built in memory."""
+    fields = fields_arg()
+    query = only_fields(Item.query, fields).order_by(Item.created.desc(), Item.id.desc())
+
+    def generate():
+        for it in query.yield_per(EXPORT_BATCH):
+            yield json.dumps(it.to_dict(fields), separators=(',', ':')) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 
 @app.route('/api/items', methods=['POST'])
 def create_item():
     data = request.get_json() or {}
+    check_types(data)
     section = data.get('section')
     desc = data.get('desc')
-    urls = data.get('urls') or []
     notes = data.get('notes')
-    it = Item(section=section, desc=desc, urls=json.dumps(urls), notes=notes)
+    it = Item(section=section, desc=desc, notes=notes)
+    it.set_urls(data.get('urls'))
     db.session.add(it)
     db.session.commit()
     return jsonify(it.to_dict()), 201
@@ -94,9 +545,11 @@ def create_item():
 def update_item(item_id):
     it = Item.query.get_or_404(item_id)
     data = request.get_json() or {}
+    check_types(data)
     it.section = data.get('section', it.section)
     it.desc = data.get('desc', it.desc)
-    it.urls = json.dumps(data.get('urls', json.loads(it.urls or '[]')))
+    if 'urls' in data and clean_urls(data['urls']) != it.url_list:
+        it.set_urls(data['urls'])
     it.notes = data.get('notes', it.notes)
     db.session.commit()
     return jsonify(it.to_dict())
@@ -110,19 +563,116 @@ def delete_item(item_id):
     return jsonify({'ok': True})
 
 
+def check_types(entry):
+    """400 unless the editable fields in ``entry`` are strings (urls: a string or list of strings) or null."""
+    for f in EDITABLE_FIELDS:
+        value = entry.get(f)
+        if f == 'urls' and isinstance(value, list):
+            if not all(isinstance(u, str) for u in value):
+                abort(400, '"urls" must be a list of strings')
+        elif value is not None and not isinstance(value, str):
+            abort(400, f'"{f}" must be a string')
+
+
+def item_values(entry, fields=EDITABLE_FIELDS):
+    """
+    (column values, url list or None) for the editable ``fields`` present
+    in ``entry``; the url list goes to item_urls.
+    """
+    check_types(entry)
+    values = {f: entry[f] for f in fields if f in entry and f != 'urls'}
+    urls = None
+    if 'urls' in fields and 'urls' in entry:
+        urls = clean_urls(entry['urls'])
+        values['search_urls'] = json.dumps(urls)
+    return values, urls
+
+
+def is_id(value):
+    # JSON true/false arrive as bool, which is an int subclass
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def json_list(key=None):
+    data = request.get_json(silent=True)
+    if key is not None:
+        data = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(data, list):
+        abort(400, f'expected an object with a "{key}" array' if key else 'expected array')
+    return data
+
+
 @app.route('/api/import', methods=['POST'])
 def import_items():
-    data = request.get_json() or []
-    if not isinstance(data, list):
-        return abort(400, 'expected array')
-    created = []
+    """
+    Bulk insert, all or nothing: every entry is validated before the first
+    insert, then one executemany per WRITE_CHUNK entries and one commit.
+    """
+    data = json_list()
+    if not all(isinstance(entry, dict) for entry in data):
+        abort(400, 'expected array of objects')
+    prepared = [item_values(entry) for entry in data]
+    ids = []
+    for chunk in chunks(prepared):
+        rows = [{'section': None, 'desc': None, 'notes': None, 'search_urls': '[]', **values}
+                for values, urls in chunk]
+        new_ids = db.session.scalars(insert(Item).returning(Item.id, sort_by_parameter_order=True), rows).all()
+        child_rows = [r for item_id, (values, urls) in zip(new_ids, chunk) for r in url_rows(item_id, urls or [])]
+        if child_rows:
+            db.session.execute(insert(ItemUrl), child_rows)
+        ids.extend(new_ids)
+    db.session.commit()
+    return jsonify({'created': len(ids), 'ids': ids})
+
+
+@app.route('/api/items/delete', methods=['POST'])
+def delete_items():
+    """Delete many items: {"ids": [...]} -> {"deleted": n, "ids": [...]}."""
+    ids = [i for i in json_list('ids') if is_id(i)]
+    deleted = []
+    for chunk in chunks(ids):
+        found = db.session.scalars(db.select(Item.id).where(Item.id.in_(chunk))).all()
+        if found:
+            db.session.execute(db.delete(ItemUrl).where(ItemUrl.item_id.in_(found)))
+            db.session.execute(db.delete(Item).where(Item.id.in_(found)))
+            deleted.extend(found)
+    db.session.commit()
+    return jsonify({'deleted': len(deleted), 'ids': deleted})
+
+
+@app.route('/api/items', methods=['PATCH'])
+def patch_items():
+    """
+    Update many items: [{"id": 1, "notes": "..."}, ...]. Only the fields
+    given are changed. Returns {"updated": n, "ids": [...], "missing": [...]}.
+    """
+    data = json_list()
+    changes = {}
+    new_urls = {}
     for entry in data:
-        urls = entry.get('urls') or []
-        it = Item(section=entry.get('section'), desc=entry.get('desc'), urls=json.dumps(urls), notes=entry.get('notes'))
-        db.session.add(it)
-        created.append(it)
+        if isinstance(entry, dict) and is_id(entry.get('id')):
+            values, urls = item_values(entry)
+            if values:
+                changes.setdefault(entry['id'], {}).update(values)
+            if urls is not None:
+                new_urls[entry['id']] = urls
+    updated = []
+    ids = list(changes)
+    for chunk in chunks(ids):
+        found = db.session.scalars(db.select(Item.id).where(Item.id.in_(chunk))).all()
+        if found:
+            # ORM bulk UPDATE by primary key: executemany per set of columns
+            db.session.execute(update(Item), [{'id': i, **changes[i]} for i in found])
+            relinked = [i for i in found if i in new_urls]
+            if relinked:
+                db.session.execute(db.delete(ItemUrl).where(ItemUrl.item_id.in_(relinked)))
+                child_rows = [r for i in relinked for r in url_rows(i, new_urls[i])]
+                if child_rows:
+                    db.session.execute(insert(ItemUrl), child_rows)
+            updated.extend(found)
     db.session.commit()
-    return jsonify([c.to_dict() for c in created])
+    missing = sorted(set(ids) - set(updated))
+    return jsonify({'updated': len(updated), 'ids': updated, 'missing': missing})
 
 
 if __name__ == '__main__':
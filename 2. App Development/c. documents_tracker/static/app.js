@@ -23,6 +23,14 @@
   let items = [];
   let useApi = false;
   let editId = null; // when editing an API-backed item
+  let loadSeq = 0; // bumped by every load() so a stale one stops paging
+  let apiChecked = false;
+  let changeToken = null; // /api/items/changes position of the full list
+  let changeStream = null;
+  let streamEnabled = false; // the server opted in to /api/items/changes/stream
+  let currentQuery = '';
+  const PAGE_SIZE = 100;
+  const MORE_PAGE_SIZE = 500;
 
   // detect API availability (simple ping)
   // detect API availability (try relative path first, then common localhost origins)
@@ -45,18 +53,94 @@
     for(const url of candidates){
       try{
         const res = await fetchWithTimeout(url, 400);
-        if(res && res.ok){ useApi = true; break; }
+        if(res && res.ok){
+          useApi = true;
+          streamEnabled = Boolean((await res.json().catch(() => ({}))).stream);
+          break;
+        }
       }catch(e){ /* try next */ }
     }
   }
 
+  async function fetchPage(url){
+    const res = await fetch(url);
+    if(!res.ok) throw new Error(res.statusText);
+    return {items: await res.json(), next: res.headers.get('X-Next-Cursor'), token: res.headers.get('X-Change-Token')};
+  }
+
+  // Apply a batch from /api/items/changes to the local list. While a search
+  // is shown, only items already in the results are updated or removed.
+  function applyChanges(changes){
+    changes.forEach(ch => {
+      const id = ch.op === 'delete' ? ch.id : ch.item.id;
+      const idx = items.findIndex(it => it.id === id);
+      if(ch.op === 'delete'){
+        if(idx >= 0) items.splice(idx, 1);
+      }else if(idx >= 0){
+        items[idx] = ch.item;
+      }else if(!currentQuery && ch.item.id !== editId){
+        items.unshift(ch.item);
+      }
+    });
+    if(changes.length) render(currentQuery);
+  }
+
+  async function sync(){
+    if(!useApi || changeToken === null || changeStream) return;
+    let more = true;
+    while(more){
+      const res = await fetch('/api/items/changes?since=' + encodeURIComponent(changeToken));
+      if(!res.ok) return;
+      const data = await res.json();
+      changeToken = data.token;
+      more = data.more;
+      applyChanges(data.changes);
+    }
+  }
+
+  // keep the list live with Server-Sent Events when the server offers them;
+  // the server ends each connection after a while and EventSource resumes
+  // from the last event id
+  function startStream(){
+    if(!streamEnabled || changeStream || !window.EventSource || changeToken === null) return;
+    changeStream = new EventSource('/api/items/changes/stream?since=' + encodeURIComponent(changeToken));
+    changeStream.onmessage = e => {
+      changeToken = e.lastEventId;
+      applyChanges(JSON.parse(e.data));
+    };
+    changeStream.onerror = () => {
+      // given up (e.g. the stream was switched off): fall back to sync()
+      if(changeStream.readyState === EventSource.CLOSED) changeStream = null;
+    };
+  }
+
+  // without a stream, catch up whenever the page is looked at again
+  document.addEventListener('visibilitychange', () => {
+    if(document.visibilityState === 'visible') sync();
+  });
+
   async function load(searchQuery = ''){
-    await detectApi();
+    const seq = ++loadSeq;
+    currentQuery = searchQuery;
+    if(!apiChecked){
+      await detectApi();
+      apiChecked = true;
+    }
     if(useApi){
       try{
-        const url = '/api/items' + (searchQuery ? `?q=${encodeURIComponent(searchQuery)}` : '');
-        const res = await fetch(url);
-        items = await res.json();
+        const base = '/api/items?' + (searchQuery ? `q=${encodeURIComponent(searchQuery)}&` : '');
+        let page = await fetchPage(base + 'limit=' + PAGE_SIZE);
+        if(seq !== loadSeq) return;
+        items = page.items;
+        if(!searchQuery && changeToken === null) changeToken = page.token;
+        // show the first page right away, then page through the rest of the
+        // list (search results stay at their best-ranked first page)
+        while(!searchQuery && page.next){
+          render(searchQuery);
+          page = await fetchPage(base + 'limit=' + MORE_PAGE_SIZE + '&cursor=' + encodeURIComponent(page.next));
+          if(seq !== loadSeq) return;
+          items = items.concat(page.items);
+        }
       }catch(e){ console.warn('API load failed, falling back to localStorage', e); items = JSON.parse(localStorage.getItem(STORAGE_KEY) || '[]'); }
     }else{
       try { items = JSON.parse(localStorage.getItem(STORAGE_KEY) || '[]'); }
@@ -164,8 +248,21 @@
     form.reset();
   });
 
-  exportBtn.addEventListener('click', ()=>{
-    const blob = new Blob([JSON.stringify(items, null, 2)], {type:'application/json'});
+  async function exportAll(){
+    // full export streamed from the server as NDJSON, one item per line
+    const res = await fetch('/api/export');
+    if(!res.ok) throw new Error(res.statusText);
+    const txt = await res.text();
+    return txt.split('\n').filter(Boolean).map(line => JSON.parse(line));
+  }
+
+  exportBtn.addEventListener('click', async ()=>{
+    let data = items;
+    if(useApi){
+      try{ data = await exportAll(); }
+      catch(e){ alert('Export failed: ' + e.message); return; }
+    }
+    const blob = new Blob([JSON.stringify(data, null, 2)], {type:'application/json'});
     const url = URL.createObjectURL(blob);
     const a = document.createElement('a'); a.href=url; a.download='doctrack_export.json'; document.body.appendChild(a); a.click(); a.remove();
   });
@@ -179,13 +276,13 @@
       if(useApi){
         // post to API import endpoint
         const res = await fetch('/api/import', {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify(json)});
-        const created = await res.json();
-        items = created.concat(items);
+        if(!res.ok) throw new Error(res.statusText);
+        await sync();
       } else {
         items = json.concat(items);
         save();
+        render();
       }
-      render();
       alert('Imported ' + json.length + ' items');
     } catch(e){ alert('Import failed: ' + e.message); }
     fileImport.value = '';
@@ -194,11 +291,13 @@
   clearBtn.addEventListener('click', async ()=>{
     if(!confirm('Remove all saved items?')) return;
     if(useApi){
-      // naive: delete items individually
+      // one batch request for all loaded items
       try{
         const ids = items.map(i=>i.id).filter(Boolean);
-        for(const id of ids){ await fetch('/api/items/' + id, {method:'DELETE'}); }
-        items = [];
+        const res = await fetch('/api/items/delete', {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({ids})});
+        if(!res.ok) throw new Error(res.statusText);
+        const removed = new Set((await res.json()).ids);
+        items = items.filter(i => !removed.has(i.id));
       }catch(e){ alert('Failed to clear via API: ' + e.message); }
     } else {
       items = [];
@@ -216,12 +315,11 @@
       try{
         const res = await fetch('/api/import', {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify(localItems)});
         if(!res.ok) throw new Error('Import failed: ' + res.statusText);
-        const created = await res.json();
+        const summary = await res.json();
         // clear localStorage (optional) and refresh list
         localStorage.removeItem(STORAGE_KEY);
-        items = created.concat(items);
-        render();
-        alert('Migration complete — ' + created.length + ' items migrated. Local copy removed.');
+        await sync();
+        alert('Migration complete — ' + summary.created + ' items migrated. Local copy removed.');
       }catch(err){ alert('Migration failed: ' + (err.message || err)); }
     });
   }
@@ -246,6 +344,6 @@
   });
 
   // initial
-  load();
+  load().then(startStream);
 
 })();
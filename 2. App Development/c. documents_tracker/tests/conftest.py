@@ -0,0 +1,27 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app.py opens its database on import; point it at a scratch file first
+os.environ['DOCTRACK_DB'] = os.path.join(tempfile.mkdtemp(prefix='doctrack-tests-'), 'doctrack.db')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as doctrack  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    with doctrack.app.app_context():
+        doctrack.db.session.execute(doctrack.db.delete(doctrack.ItemUrl))
+        doctrack.db.session.execute(doctrack.db.delete(doctrack.Item))
+        doctrack.db.session.commit()
+    return doctrack.app.test_client()
+
+
+def add_items(client, n, **values):
+    entries = [{'section': 's', 'desc': f'doc {i}', 'urls': [f'https://example.com/{i}'], **values} for i in range(n)]
+    resp = client.post('/api/import', json=entries)
+    assert resp.status_code == 200
+    return resp.get_json()['ids']
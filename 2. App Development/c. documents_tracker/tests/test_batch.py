@@ -0,0 +1,53 @@
+from conftest import add_items, doctrack
+
+
+def count_items():
+    with doctrack.app.app_context():
+        return doctrack.db.session.query(doctrack.Item).count()
+
+
+def test_import_is_all_or_nothing(client):
+    entries = [{'desc': f'doc {i}', 'urls': [f'https://example.com/{i}']} for i in range(600)]
+    entries[550]['notes'] = {'not': 'a string'}
+    assert client.post('/api/import', json=entries).status_code == 400
+    assert count_items() == 0
+    with doctrack.app.app_context():
+        assert doctrack.db.session.query(doctrack.ItemUrl).count() == 0
+
+
+def test_import_spanning_chunks(client):
+    entries = [{'desc': f'doc {i}', 'urls': [f'https://example.com/{i}']} for i in range(doctrack.WRITE_CHUNK + 20)]
+    data = client.post('/api/import', json=entries).get_json()
+    assert data['created'] == len(entries) == count_items()
+    last = client.get(f'/api/items?url=https://example.com/{len(entries) - 1}').get_json()
+    assert [it['id'] for it in last] == [data['ids'][-1]]
+
+
+def test_delete_ignores_bools_and_non_int_ids(client):
+    ids = add_items(client, 3)
+    data = client.post('/api/items/delete', json={'ids': [True, False, str(ids[0]), 1.0, None, ids[1]]}).get_json()
+    assert data == {'deleted': 1, 'ids': [ids[1]]}
+    assert sorted(it['id'] for it in client.get('/api/items').get_json()) == [ids[0], ids[2]]
+
+
+def test_delete_requires_ids_array(client):
+    assert client.post('/api/items/delete', json={'ids': 1}).status_code == 400
+    assert client.post('/api/items/delete', json=[1]).status_code == 400
+
+
+def test_patch_ignores_bool_ids(client):
+    ids = add_items(client, 2)
+    data = client.patch('/api/items', json=[{'id': True, 'notes': 'x'}, {'id': str(ids[0]), 'notes': 'x'}]).get_json()
+    assert data == {'updated': 0, 'ids': [], 'missing': []}
+    assert all(it['notes'] is None for it in client.get('/api/items').get_json())
+
+
+def test_partial_patch_leaves_other_fields(client):
+    ids = add_items(client, 2, notes='old')
+    data = client.patch('/api/items', json=[{'id': ids[0], 'notes': 'new'}, {'id': 10 ** 9, 'desc': 'x'}]).get_json()
+    assert data == {'updated': 1, 'ids': [ids[0]], 'missing': [10 ** 9]}
+    items = {it['id']: it for it in client.get('/api/items').get_json()}
+    patched = items[ids[0]]
+    assert (patched['section'], patched['desc'], patched['urls'], patched['notes']) == (
+        's', 'doc 0', ['https://example.com/0'], 'new')
+    assert items[ids[1]]['notes'] == 'old'
@@ -0,0 +1,45 @@
+import json
+
+from conftest import add_items, doctrack
+
+
+def read_events(resp):
+    events = []
+    for block in resp.get_data(as_text=True).split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if fields:
+            events.append(fields)
+    return events
+
+
+def test_changes_since_token(client):
+    token = int(client.get('/api/items?limit=1').headers['X-Change-Token'])
+    ids = add_items(client, 3)
+    client.delete(f'/api/items/{ids[0]}')
+    data = client.get(f'/api/items/changes?since={token}').get_json()
+    assert [(c['op'], c.get('id') or c['item']['id']) for c in data['changes']] == [
+        ('upsert', ids[1]), ('upsert', ids[2]), ('delete', ids[0]),
+    ]
+    assert not data['more']
+    assert client.get(f'/api/items/changes?since={data["token"]}').get_json()['changes'] == []
+
+
+def test_stream_is_off_by_default(client):
+    assert client.get('/api/ping').get_json()['stream'] is False
+    assert client.get('/api/items/changes/stream').status_code == 404
+
+
+def test_stream_ends_after_max_seconds(client, monkeypatch):
+    monkeypatch.setattr(doctrack, 'SSE_ENABLED', True)
+    monkeypatch.setattr(doctrack, 'SSE_MAX_SECONDS', 0.05)
+    monkeypatch.setattr(doctrack, 'SSE_POLL_INTERVAL', 0.01)
+    token = int(client.get('/api/items?limit=1').headers['X-Change-Token'])
+    ids = add_items(client, 2)
+    resp = client.get(f'/api/items/changes/stream?since={token}')
+    events = read_events(resp)
+    assert events[0] == {'retry': str(doctrack.SSE_RETRY_MS)}
+    assert [c['item']['id'] for c in json.loads(events[1]['data'])] == ids
+    # a reconnect resumes after the last event id
+    last = events[-1]['id']
+    resp = client.get('/api/items/changes/stream', headers={'Last-Event-ID': last})
+    assert [e for e in read_events(resp) if 'data' in e] == []
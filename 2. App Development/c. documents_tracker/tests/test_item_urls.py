@@ -0,0 +1,25 @@
+def ids_for(client, **params):
+    return sorted(it['id'] for it in client.get('/api/items', query_string=params).get_json())
+
+
+def test_url_and_host_filters(client):
+    a = client.post('/api/items', json={'desc': 'a', 'urls': ['https://Docs.Example.com/a', 'https://other.org/x']}).get_json()
+    b = client.post('/api/items', json={'desc': 'b', 'urls': 'docs.example.com/b'}).get_json()
+    c = client.post('/api/items', json={'desc': 'c', 'urls': []}).get_json()
+    assert ids_for(client, url='https://other.org/x') == [a['id']]
+    assert ids_for(client, host='DOCS.example.com') == [a['id'], b['id']]
+    assert ids_for(client, host='other.org', url='https://other.org/x') == [a['id']]
+    assert ids_for(client, host='nowhere.test') == []
+    assert c['urls'] == []
+
+
+def test_url_rows_follow_updates_and_deletes(client):
+    item = client.post('/api/items', json={'desc': 'a', 'urls': ['https://old.example/1']}).get_json()
+    client.put(f"/api/items/{item['id']}", json={'urls': ['https://new.example/1']})
+    assert ids_for(client, host='old.example') == []
+    assert ids_for(client, host='new.example') == [item['id']]
+    client.patch('/api/items', json=[{'id': item['id'], 'urls': ['https://patched.example/1']}])
+    assert ids_for(client, host='new.example') == []
+    assert ids_for(client, url='https://patched.example/1') == [item['id']]
+    client.delete(f"/api/items/{item['id']}")
+    assert ids_for(client, host='patched.example') == []
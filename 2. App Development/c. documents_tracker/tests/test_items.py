@@ -0,0 +1,51 @@
+import pytest
+
+from conftest import add_items
+
+
+def test_list_without_limit_returns_everything(client):
+    ids = add_items(client, 120)
+    resp = client.get('/api/items')
+    assert [it['id'] for it in resp.get_json()] == ids[::-1]
+    assert 'X-Next-Cursor' not in resp.headers
+
+
+def test_limit_and_cursor_page_through(client):
+    ids = add_items(client, 120)
+    resp = client.get('/api/items?limit=50')
+    seen = [it['id'] for it in resp.get_json()]
+    while 'X-Next-Cursor' in resp.headers:
+        resp = client.get('/api/items', query_string={'cursor': resp.headers['X-Next-Cursor']})
+        seen += [it['id'] for it in resp.get_json()]
+    assert seen == ids[::-1]
+
+
+@pytest.mark.parametrize('entry', [
+    {'section': {'a': 1}},
+    {'desc': 3},
+    {'notes': ['x']},
+    {'urls': 7},
+    {'urls': ['https://example.com', 1]},
+])
+def test_bad_field_types_are_rejected(client, entry):
+    item_id = add_items(client, 1)[0]
+    assert client.post('/api/import', json=[entry]).status_code == 400
+    assert client.patch('/api/items', json=[{'id': item_id, **entry}]).status_code == 400
+    assert client.post('/api/items', json=entry).status_code == 400
+    assert client.put(f'/api/items/{item_id}', json=entry).status_code == 400
+    assert client.get('/api/items').get_json()[0]['desc'] == 'doc 0'
+
+
+def test_string_urls_and_nulls_are_accepted(client):
+    resp = client.post('/api/import', json=[{'urls': 'https://example.com/a', 'notes': None}])
+    assert resp.status_code == 200
+    item_id = resp.get_json()['ids'][0]
+    assert client.patch('/api/items', json=[{'id': item_id, 'urls': ['https://example.com/b']}]).status_code == 200
+    assert client.get('/api/items').get_json()[0]['urls'] == ['https://example.com/b']
+
+
+# 1, null, [1, 2, 3], ["x", 1] and no JSON at all
+@pytest.mark.parametrize('cursor', ['MQ', 'bnVsbA', 'WzEsMiwzXQ', 'WyJ4IiwgMV0', 'not base64!'])
+def test_malformed_list_cursor_is_rejected(client, cursor):
+    add_items(client, 3)
+    assert client.get('/api/items', query_string={'cursor': cursor}).status_code == 400
@@ -0,0 +1,26 @@
+import pytest
+
+from conftest import add_items, doctrack
+
+
+@pytest.fixture(autouse=True)
+def fts():
+    if not doctrack.FTS_ENABLED:
+        pytest.skip('SQLite without FTS5')
+
+
+def test_search_pages_with_cursor(client):
+    ids = add_items(client, 30, notes='needle')
+    resp = client.get('/api/items?q=needle&limit=20')
+    seen = [it['id'] for it in resp.get_json()]
+    resp = client.get('/api/items', query_string={'q': 'needle', 'cursor': resp.headers['X-Next-Cursor']})
+    seen += [it['id'] for it in resp.get_json()]
+    assert 'X-Next-Cursor' not in resp.headers
+    assert sorted(seen) == ids
+
+
+# 1, [1, 2, 3], ["x", 1]
+@pytest.mark.parametrize('cursor', ['MQ', 'WzEsMiwzXQ', 'WyJ4IiwgMV0'])
+def test_malformed_search_cursor_is_rejected(client, cursor):
+    add_items(client, 3, notes='needle')
+    assert client.get('/api/items', query_string={'q': 'needle', 'cursor': cursor}).status_code == 400
@@ -1,29 +1,89 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+import os
+import sys
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
 import feedparser
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import SSLError
 from urllib.parse import urlparse
 import warnings
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 
+from feed_cache import FeedCache, NotModified
+from feed_model import Entry, Feed
+from feed_poller import FeedPoller
+from feed_stream import parse_stream
+from page_cache import PageCache
+from feed_store import FeedStore, entry_cursor, parse_cursor
+from river import River
+
+# Modules shared by the apps live in <repo>/shared
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'shared'))
+import http_pipeline
+
 app = Flask(__name__)
 app.secret_key = 'change-this-in-production'
+# Compression, conditional GETs and fingerprinted static files
+http_pipeline.init_app(app)
+
+# Bounded, TTL-aware cache of parsed feeds for the river (see feed_cache.py);
+# the main page and /api/feed read the poller's store instead
+RSS_CACHE = FeedCache(
+    max_entries=int(os.environ.get('RSS_CACHE_MAX_ENTRIES', 128)),
+    max_bytes=int(os.environ.get('RSS_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+    default_ttl=int(os.environ.get('RSS_CACHE_DEFAULT_TTL', 900)),
+)
+
+# Shared keep-alive session; the pool size bounds concurrent connections per host
+SESSION = requests.Session()
+SESSION.headers['User-Agent'] = 'rss-reader/1.0'
+_adapter = HTTPAdapter(pool_connections=32, pool_maxsize=int(os.environ.get('RSS_POOL_SIZE', 16)))
+SESSION.mount('http://', _adapter)
+SESSION.mount('https://', _adapter)
+
+FETCH_TIMEOUT = float(os.environ.get('RSS_FETCH_TIMEOUT', 8))
+
+# Streaming mode reads feeds in chunks and stops at these limits, so huge
+# archive feeds cost no more than a normal one
+STREAMING = os.environ.get('RSS_STREAMING', '1') == '1'
+MAX_ENTRIES = int(os.environ.get('RSS_MAX_ENTRIES', 200))
+MAX_BYTES = int(os.environ.get('RSS_MAX_BYTES', 5 * 1024 * 1024))
+CHUNK_SIZE = 64 * 1024
 
-# Simple cache to avoid repeated requests (in-memory)
-RSS_CACHE = {}
+PAGE_SIZE = int(os.environ.get('RSS_PAGE_SIZE', 25))
+
+def fetch_feed(url, etag=None, modified=None, stream=None, max_entries=None, max_bytes=None):
+    """Fetch and parse ``url``.
+
+    Returns ``(feed, insecure_used)`` where ``feed`` is a compact
+    ``feed_model.Feed``. When ``etag``/``modified`` are given
+    the request is conditional, and ``feed`` is a ``feed_cache.NotModified``
+    (carrying the 304's own TTL) if the origin answered 304 Not Modified. In streaming mode (the default, see ``RSS_STREAMING``)
+    the body is parsed incrementally and reading stops after ``max_entries``
+    items or ``max_bytes`` bytes.
+    """
+    if stream is None:
+        stream = STREAMING
+    if max_entries is None:
+        max_entries = MAX_ENTRIES
+    if max_bytes is None:
+        max_bytes = MAX_BYTES
 
-def fetch_feed(url):
     # Basic validation
     parsed = urlparse(url)
     if not parsed.scheme:
         url = 'http://' + url
 
-    headers = {'User-Agent': 'rss-reader/1.0'}
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if modified:
+        headers['If-Modified-Since'] = modified
     insecure_used = False
 
     try:
         # Normal, verified request first
-        r = requests.get(url, timeout=8, headers=headers, verify=True)
+        r = SESSION.get(url, timeout=FETCH_TIMEOUT, headers=headers, verify=True, stream=stream)
         r.raise_for_status()
     except SSLError:
         # Retry without verification (some internal feeds use self-signed certs)
@@ -32,7 +92,7 @@ def fetch_feed(url):
         except Exception:
             pass
         try:
-            r = requests.get(url, timeout=8, headers=headers, verify=False)
+            r = SESSION.get(url, timeout=FETCH_TIMEOUT, headers=headers, verify=False, stream=stream)
             r.raise_for_status()
             insecure_used = True
         except Exception as e:
@@ -40,17 +100,190 @@ def fetch_feed(url):
     except Exception as e:
         raise RuntimeError(f"Failed to fetch feed: {e}")
 
-    feed = feedparser.parse(r.content)
-    if feed.bozo:
+    if r.status_code == 304:
+        r.close()
+        return NotModified.from_headers(r.headers), insecure_used
+
+    if stream:
+        try:
+            parsed = parse_stream(r.iter_content(CHUNK_SIZE), max_entries=max_entries, max_bytes=max_bytes)
+        except Exception as e:
+            raise RuntimeError(f"Failed to fetch feed: {e}")
+        finally:
+            r.close()
+    else:
+        parsed = feedparser.parse(r.content)
+    if parsed.bozo:
         # malformed feed; feedparser may still return usable entries
         pass
-    return feed, insecure_used
+    # normalize once here; the raw parser output is dropped
+    return Feed.from_parsed(parsed, headers=r.headers), insecure_used
+
+def get_feed(url):
+    """Return ``(feed, insecure)`` for ``url``, served from RSS_CACHE when fresh.
+
+    Stale entries are revalidated with a conditional GET, so an unchanged
+    feed costs a 304 instead of a download and re-parse.
+    """
+    return RSS_CACHE.load(url, fetch_feed)
+
+# Opt-in request timing, /metrics and profiling (see shared/instrument.py).
+# fetch_feed counts as outbound HTTP as a whole: with streaming, the body
+# is downloaded while it is parsed.
+if os.environ.get('INSTRUMENT') == '1':
+    import instrument
+    instrument.init_app(app, prefix='rss_reader')
+    instrument.wrap(sys.modules[__name__], 'fetch_feed', 'http')
+
+RIVER = River(
+    get_feed,
+    max_workers=int(os.environ.get('RSS_RIVER_WORKERS', 16)),
+    per_host=int(os.environ.get('RSS_RIVER_PER_HOST', 2)),
+)
+RIVER_TIMEOUT = float(os.environ.get('RSS_RIVER_TIMEOUT', 10))
+RIVER_MAX_FEEDS = 100
+
+def river_urls(args=None):
+    # accept repeated ?url=... and/or a comma/newline separated ?urls=...
+    args = request.args if args is None else args
+    urls = args.getlist('url')
+    for chunk in args.getlist('urls'):
+        urls.extend(u.strip() for u in chunk.replace('\n', ',').split(','))
+    return [u for u in urls if u][:RIVER_MAX_FEEDS]
+
+# Subscribed feeds are refreshed in the background and persisted here, so
+# page renders read locally instead of waiting on the upstream server.
+STORE = FeedStore(
+    os.environ.get('RSS_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'feeds.db')),
+    max_entries=int(os.environ.get('RSS_STORE_MAX_ENTRIES', 1000)),
+    max_age=int(os.environ.get('RSS_STORE_MAX_DAYS', 0)) * 86400 or None,
+)
+POLLER = FeedPoller(
+    STORE, fetch_feed,
+    default_interval=int(os.environ.get('RSS_POLL_INTERVAL', 900)),
+    idle_days=int(os.environ.get('RSS_IDLE_DAYS', 30)),
+)
+
+def start_poller():
+    """Start the background poller unless ``RSS_POLLER=0``.
+
+    Called by the entry points that serve the app (``python app.py`` and
+    asgi.py's lifespan), so importing this module from scripts, tests or
+    extra worker processes doesn't start one more poller each.
+    """
+    if os.environ.get('RSS_POLLER') != '0':
+        POLLER.start()
+
+# under other servers (flask run, gunicorn, ...) one designated process sets RSS_POLLER=1
+if os.environ.get('RSS_POLLER') == '1':
+    POLLER.start()
+
+# Rendered index pages keyed by (url, feed version, embed, cursors, per_page,
+# stylesheet URL); the same key is the page's ETag
+PAGES = PageCache(
+    max_entries=int(os.environ.get('RSS_PAGE_CACHE_ENTRIES', 512)),
+    max_bytes=int(os.environ.get('RSS_PAGE_CACHE_BYTES', 16 * 1024 * 1024)),
+)
+
+_inline_css = {'mtime': None, 'text': None}
+
+def inline_css():
+    """Contents of static/styles.css, re-read only when the file changes."""
+    path = os.path.join(app.static_folder, 'styles.css')
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    if mtime != _inline_css['mtime']:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except Exception:
+            return None
+        _inline_css.update(mtime=mtime, text=text)
+        # pages embedding the old stylesheet are stale now
+        PAGES.clear()
+    return _inline_css['text']
+
+def page_response(page):
+    # let clients keep the page but revalidate it (cheap 304) every time
+    return http_pipeline.tag(app.response_class(page.body, mimetype='text/html'), page.etag)
+
+def stored_feed_row(url):
+    """Return the store row for ``url``, subscribing to it if needed.
+
+    A feed seen for the first time is subscribed and fetched once inline
+    (there is nothing local to show yet); after that the poller keeps it
+    fresh and reading it is a local indexed query.
+    """
+    row = STORE.get_feed(url)
+    if row is None or row['last_polled'] is None:
+        # under asgi.py the first fetch already happened without holding
+        # this thread; report its failure instead of fetching again
+        error = request.environ.get('rss.fetch_errors', {}).get(url)
+        if error is not None:
+            raise RuntimeError(error)
+        row = STORE.subscribe(url)
+        try:
+            POLLER.poll(row)
+        except Exception:
+            # don't keep polling URLs that never worked
+            STORE.unsubscribe(url)
+            raise
+        row = STORE.get_feed(url)
+    else:
+        STORE.touch(row)
+    return row
+
+def page_cursors():
+    """``(before, after)`` keys from ``?before=``/``?after=``; ValueError if malformed."""
+    before, after = request.args.get('before'), request.args.get('after')
+    return (parse_cursor(before) if before else None,
+            parse_cursor(after) if after else None)
+
+def stored_feed_page(row, limit=PAGE_SIZE, before=None, after=None):
+    """Return ``(feed, older, newer)`` for one page of a stored feed.
+
+    ``older``/``newer`` are the cursors (``?before=``/``?after=``) of the
+    neighbouring pages, or None at either end.
+    """
+    # one extra row tells us whether there is a page beyond this one
+    rows = STORE.entries(row['id'], limit=limit + 1, before=before, after=after)
+    if after is not None:
+        if len(rows) <= limit:
+            # back at the newest entries
+            return stored_feed_page(row, limit)
+        rows = rows[1:]
+        more, newer = True, entry_cursor(rows[0])
+    else:
+        more = len(rows) > limit
+        rows = rows[:limit]
+        newer = entry_cursor(rows[0]) if before is not None and rows else None
+    older = entry_cursor(rows[-1]) if more and rows else None
+    feed = Feed(
+        title=row['title'] or '',
+        subtitle=row['subtitle'] or '',
+        updated=row['updated'] or '',
+        entries=(Entry.from_row(e) for e in rows),
+        etag=row['etag'],
+        modified=row['modified'],
+    )
+    return feed, older, newer
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     feed = None
+    insecure = False
+    older = newer = None
+    cache_key = None
     url = request.args.get('url') or ''
     embed = request.args.get('embed') == '1'
+    try:
+        before, after = page_cursors()
+    except ValueError:
+        # a mangled pager link: start from the newest entries
+        before = after = None
+    per_page = min(max(request.args.get('per_page', PAGE_SIZE, type=int), 1), 100)
     if request.method == 'POST':
         url = request.form.get('feed_url', '').strip()
         if not url:
@@ -58,26 +291,100 @@ def index():
             return redirect(url_for('index'))
         return redirect(url_for('index', url=url))
 
+    css = inline_css() if embed else None
     if url:
         try:
-            if url in RSS_CACHE:
-                feed, insecure = RSS_CACHE[url]
-            else:
-                feed, insecure = fetch_feed(url)
-                RSS_CACHE[url] = (feed, insecure)
-            if insecure:
-                flash('Loaded feed with SSL verification disabled (self-signed certificate).', 'warning')
+            row = stored_feed_row(url)
         except Exception as e:
             flash(str(e), 'danger')
-            feed = None
-    inline_css = None
-    if embed:
-        try:
-            with open(app.static_folder + '/styles.css', 'r', encoding='utf-8') as f:
-                inline_css = f.read()
-        except Exception:
-            inline_css = None
-    return render_template('index.html', feed=feed, url=url, inline_css=inline_css)
+            row = None
+        if row is not None:
+            # pages carrying flashed messages are one-off and never cached
+            if '_flashes' not in session:
+                # the stylesheet URL carries its fingerprint, so restyling changes the key
+                cache_key = (url, row['version'], embed, before, after, per_page, url_for('static', filename='styles.css'))
+                etag = http_pipeline.version_etag(*cache_key)
+                resp = http_pipeline.not_modified(etag)
+                if resp is not None:
+                    return resp
+                cached = PAGES.get(cache_key)
+                if cached is not None:
+                    return page_response(cached)
+            insecure = bool(row['insecure'])
+            feed, older, newer = stored_feed_page(row, limit=per_page, before=before, after=after)
+
+    html = render_template('index.html', feed=feed, url=url, inline_css=css, insecure=insecure,
+                           per_page=per_page, older=older, newer=newer, embed=embed)
+    if cache_key is not None:
+        return page_response(PAGES.put(cache_key, html, etag))
+    return html
+
+@app.route('/api/feed')
+def api_feed():
+    url = request.args.get('url', '').strip()
+    if not url:
+        return jsonify({'error': 'pass a feed as ?url='}), 400
+    try:
+        before, after = page_cursors()
+    except ValueError:
+        return jsonify({'error': 'invalid ?before= or ?after= cursor'}), 400
+    per_page = min(max(request.args.get('per_page', PAGE_SIZE, type=int), 1), 100)
+    try:
+        row = stored_feed_row(url)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 502
+    etag = http_pipeline.version_etag(request.full_path, row['version'])
+    resp = http_pipeline.not_modified(etag)
+    if resp is not None:
+        return resp
+    feed, older, newer = stored_feed_page(row, limit=per_page, before=before, after=after)
+    data = feed.public_dict()
+    data.update(url=url, insecure=bool(row['insecure']), version=row['version'],
+                per_page=per_page, has_more=older is not None, older=older, newer=newer)
+    return http_pipeline.tag(jsonify(data), etag)
+
+@app.route('/river', methods=['GET', 'POST'])
+def river():
+    if request.method == 'POST':
+        urls = request.form.get('feed_urls', '').strip()
+        if not urls:
+            flash('Please enter one or more RSS feed URLs', 'warning')
+            return redirect(url_for('river'))
+        return redirect(url_for('river', urls=urls))
+
+    urls = river_urls()
+    result = None
+    if urls:
+        result = RIVER.aggregate(urls, timeout=RIVER_TIMEOUT,
+                                 limit=request.args.get('limit', 100, type=int),
+                                 results=request.environ.get('rss.river_results'))
+        for status in result['feeds']:
+            if status['status'] == 'timeout':
+                flash(f"{status['url']} timed out; showing the other feeds.", 'warning')
+            elif status['status'] == 'error':
+                flash(f"{status['url']}: {status['error']}", 'danger')
+    return render_template('river.html', urls=urls, result=result)
+
+@app.route('/api/river')
+def api_river():
+    urls = river_urls()
+    if not urls:
+        return jsonify({'error': 'pass one or more feeds as ?url= or ?urls='}), 400
+    result = RIVER.aggregate(urls, timeout=RIVER_TIMEOUT,
+                             limit=request.args.get('limit', 100, type=int),
+                             results=request.environ.get('rss.river_results'))
+    entries = [
+        dict(entry.to_dict(), feed=feed_url, feed_title=feed_title)
+        for ts, feed_url, feed_title, entry in result['entries']
+    ]
+    return jsonify({'entries': entries, 'feeds': result['feeds'], 'elapsed': result['elapsed']})
+
+@app.route('/cache/stats')
+def cache_stats():
+    stats = RSS_CACHE.stats()
+    stats['pages'] = PAGES.stats()
+    return jsonify(stats)
 
 if __name__ == '__main__':
+    start_poller()
     app.run(debug=True, use_reloader=False)
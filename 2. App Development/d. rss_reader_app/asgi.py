@@ -0,0 +1,211 @@
+"""ASGI entry point: serve the reader without a thread per pending feed fetch.
+
+    uvicorn asgi:app --host 127.0.0.1 --port 5000
+
+Under plain WSGI a request for a feed that has not been fetched yet (or a
+river of stale feeds) holds its worker thread until every upstream server
+answers. Here that upstream I/O happens first, on the event loop through
+``async_fetch.AsyncFetcher``. Requests for the same feed share one
+in-flight fetch. The Flask app then runs on a small thread pool, and by
+then it only reads local state:
+
+- ``/`` and ``/api/feed``: a feed seen for the first time is subscribed,
+  fetched and stored before the view runs. If the fetch fails, its error
+  is passed on in ``environ['rss.fetch_errors']``.
+- ``/river`` and ``/api/river``: the feeds are loaded through RSS_CACHE
+  concurrently, and the results are passed to ``River.aggregate`` in
+  ``environ['rss.river_results']``.
+
+Everything else goes straight to the Flask app. The background poller is
+started on lifespan startup (unless ``RSS_POLLER=0``) and runs on its
+own threads, once per worker process.
+"""
+import asyncio
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from werkzeug.datastructures import MultiDict
+
+import app as reader
+from async_fetch import AsyncFetcher, Coalescer
+
+FETCHER = AsyncFetcher(
+    timeout=reader.FETCH_TIMEOUT,
+    max_connections=int(os.environ.get('RSS_ASYNC_MAX_CONNECTIONS', 256)),
+    per_host=int(os.environ.get('RSS_ASYNC_PER_HOST', 6)),
+    max_entries=reader.MAX_ENTRIES,
+    max_bytes=reader.MAX_BYTES,
+    chunk_size=reader.CHUNK_SIZE,
+)
+# Flask views only read the database and render by now, so a few threads go a long way
+WSGI_POOL = ThreadPoolExecutor(max_workers=int(os.environ.get('RSS_ASGI_THREADS', 16)),
+                               thread_name_prefix='asgi-wsgi')
+FIRST_LOADS = Coalescer()
+# river fetches still running after RIVER_TIMEOUT finish in the background
+_background = set()
+
+
+# --- upstream I/O ------------------------------------------------------------
+
+async def first_load(url):
+    """Subscribe to ``url`` and store its first fetch; the error message or None."""
+    row = await asyncio.to_thread(reader.STORE.subscribe, url)
+    started = time.time()
+    try:
+        feed, insecure = await FETCHER.fetch(url, etag=row['etag'], modified=row['modified'])
+    except Exception as e:
+        def forget():
+            reader.POLLER.record_failure(row, e, started)
+            # don't keep polling URLs that never worked
+            reader.STORE.unsubscribe(url)
+        await asyncio.to_thread(forget)
+        return str(e)
+    await asyncio.to_thread(reader.POLLER.record, row, feed, insecure, started)
+    return None
+
+
+async def ensure_stored(url):
+    row = await asyncio.to_thread(reader.STORE.get_feed, url)
+    if row is not None and row['last_polled'] is not None:
+        return None
+    return await FIRST_LOADS.run(url, lambda: first_load(url))
+
+
+async def get_feed(url):
+    """Async ``app.get_feed``: RSS_CACHE first, then a (conditional) fetch."""
+    return await reader.RSS_CACHE.aload(url, FETCHER.fetch)
+
+
+def _settle(task):
+    _background.discard(task)
+    if not task.cancelled():
+        task.exception()  # retrieved; it was reported as a timeout already
+
+
+async def load_river(urls):
+    """``River.aggregate`` results: url -> (feed, insecure) or exception; slow feeds are left out."""
+    tasks = {url: asyncio.ensure_future(get_feed(url)) for url in dict.fromkeys(urls)}
+    if not tasks:
+        return {}
+    await asyncio.wait(tasks.values(), timeout=reader.RIVER_TIMEOUT)
+    results = {}
+    for url, task in tasks.items():
+        if task.done():
+            results[url] = task.exception() or task.result()
+        else:
+            _background.add(task)
+            task.add_done_callback(_settle)
+    return results
+
+
+async def prepare(environ):
+    """Do the upstream I/O a request needs and leave the outcome in ``environ``."""
+    if environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+        return
+    path = environ['PATH_INFO']
+    args = MultiDict(parse_qsl(environ['QUERY_STRING'], keep_blank_values=True))
+    if path in ('/', '/api/feed'):
+        url = (args.get('url') or '').strip() if path == '/api/feed' else args.get('url')
+        if url:
+            error = await ensure_stored(url)
+            if error is not None:
+                environ['rss.fetch_errors'] = {url: error}
+    elif path in ('/river', '/api/river'):
+        urls = reader.river_urls(args)
+        if urls:
+            environ['rss.river_results'] = await load_river(urls)
+
+
+# --- ASGI -> WSGI --------------------------------------------------------------
+# asgiref's WsgiToAsgi runs every request on one thread; this bridge uses WSGI_POOL.
+
+def wsgi_environ(scope, body):
+    root = scope.get('root_path', '')
+    path = scope['path']
+    if root and path.startswith(root):
+        path = path[len(root):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        environ[name] = environ[name] + ',' + value if name in environ else value
+    return environ
+
+
+def call_wsgi(environ):
+    """Run the Flask app; ``(status, headers, body)``."""
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = headers
+
+    chunks = reader.app(environ, start_response)
+    try:
+        body = b''.join(chunks)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    return started['status'], started['headers'], body
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            reader.start_poller()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            reader.POLLER.stop()
+            await FETCHER.aclose()
+            WSGI_POOL.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+    body = []
+    more = True
+    while more:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+        body.append(message.get('body', b''))
+        more = message.get('more_body', False)
+
+    environ = wsgi_environ(scope, b''.join(body))
+    await prepare(environ)
+    status, headers, payload = await asyncio.get_running_loop().run_in_executor(WSGI_POOL, call_wsgi, environ)
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+    })
+    await send({'type': 'http.response.body', 'body': payload})
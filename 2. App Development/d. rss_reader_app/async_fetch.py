@@ -0,0 +1,123 @@
+"""Non-blocking feed fetching for the ASGI entry point (asgi.py).
+
+``AsyncFetcher.fetch`` is the asyncio counterpart of ``app.fetch_feed``:
+same conditional GET, self-signed certificate fallback and streaming
+limits, but on a pooled ``httpx.AsyncClient``, so hundreds of slow feeds
+can be pending at once without holding a thread each.
+
+Concurrent calls for the same feed (and validators) share one in-flight
+request through a ``Coalescer``.
+"""
+import asyncio
+import ssl
+from urllib.parse import urlparse
+
+import httpx
+
+from feed_cache import NotModified
+from feed_model import Feed
+from feed_stream import StreamReader
+
+
+class Coalescer:
+    """Run at most one task per key; concurrent callers await the same one."""
+
+    def __init__(self):
+        self._tasks = {}
+
+    def __len__(self):
+        return len(self._tasks)
+
+    async def run(self, key, factory):
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda t: self._tasks.pop(key, None))
+        # a caller that goes away must not cancel the fetch for the others
+        return await asyncio.shield(task)
+
+
+def _ssl_error(exc):
+    while exc is not None:
+        if isinstance(exc, ssl.SSLError):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+class AsyncFetcher:
+    def __init__(self, timeout=8, max_connections=256, per_host=6,
+                 max_entries=200, max_bytes=5 * 1024 * 1024, chunk_size=64 * 1024):
+        self.timeout = timeout
+        self.per_host = per_host
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self._limits = httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_connections // 4)
+        self._clients = {}
+        self._host_limits = {}
+        self.coalescer = Coalescer()
+
+    def _client(self, verify):
+        # created lazily, on the event loop that uses them
+        client = self._clients.get(verify)
+        if client is None:
+            client = self._clients[verify] = httpx.AsyncClient(
+                verify=verify, timeout=self.timeout, limits=self._limits,
+                follow_redirects=True, headers={'User-Agent': 'rss-reader/1.0'},
+            )
+        return client
+
+    def _host_semaphore(self, url):
+        host = urlparse(url).netloc.lower()
+        sem = self._host_limits.get(host)
+        if sem is None:
+            sem = self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return sem
+
+    async def aclose(self):
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    async def fetch(self, url, etag=None, modified=None):
+        """Return ``(feed, insecure_used)``; ``feed`` is a ``NotModified`` on 304."""
+        if not urlparse(url).scheme:
+            url = 'http://' + url
+        return await self.coalescer.run((url, etag, modified), lambda: self._fetch(url, etag, modified))
+
+    async def _fetch(self, url, etag, modified):
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if modified:
+            headers['If-Modified-Since'] = modified
+        async with self._host_semaphore(url):
+            try:
+                try:
+                    return await self._get(url, headers, verify=True), False
+                except httpx.HTTPError as e:
+                    if not _ssl_error(e):
+                        raise
+                # retry without verification (some internal feeds use self-signed certs)
+                return await self._get(url, headers, verify=False), True
+            except Exception as e:
+                # httpx appends a help link on a second line
+                reason = str(e).splitlines()[0] if str(e) else type(e).__name__
+                raise RuntimeError(f"Failed to fetch feed: {reason}") from e
+
+    async def _get(self, url, headers, verify):
+        async with self._client(verify).stream('GET', url, headers=headers) as r:
+            if r.status_code == 304:
+                return NotModified.from_headers(r.headers)
+            r.raise_for_status()
+            reader = StreamReader(self.max_entries, self.max_bytes)
+            async for chunk in r.aiter_bytes(self.chunk_size):
+                if reader.feed(chunk):
+                    break
+            response_headers = r.headers
+        # the feedparser fallback and normalization are CPU-bound; keep them
+        # off the event loop
+        return await asyncio.to_thread(
+            lambda: Feed.from_parsed(reader.result(), headers=response_headers))
@@ -0,0 +1,237 @@
+"""Bounded, TTL-aware cache for parsed feeds.
+
+Entries are evicted in LRU order once either the entry count or the
+approximate byte budget is exceeded. Each entry carries its own expiry
+(derived from the feed's Cache-Control / ttl / sy:updatePeriod hints) and
+the validators needed to revalidate it with a conditional GET.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+# sy:updatePeriod values mapped to seconds (RSS syndication module)
+UPDATE_PERIODS = {
+    'hourly': 3600,
+    'daily': 86400,
+    'weekly': 7 * 86400,
+    'monthly': 30 * 86400,
+    'yearly': 365 * 86400,
+}
+
+MAX_AGE_RE = re.compile(r'(?:^|,)\s*(?:s-)?max-age\s*=\s*"?(\d+)"?', re.I)
+
+
+def _int_or_none(value):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def feed_ttl(headers=None, ttl=None, update_period=None, update_frequency=None):
+    """Return the freshness lifetime (seconds) advertised by a feed, or None.
+
+    HTTP ``Cache-Control`` wins over ``Expires``, then the in-document
+    hints: RSS ``<ttl>`` (minutes), then ``sy:updatePeriod``/``sy:updateFrequency``.
+    """
+    fields = {key.lower(): value for key, value in (headers or {}).items()}
+    cache_control = fields.get('cache-control') or ''
+    if cache_control:
+        if re.search(r'no-cache|no-store', cache_control, re.I):
+            return 0
+        m = MAX_AGE_RE.search(cache_control)
+        if m:
+            return int(m.group(1))
+    if fields.get('expires'):
+        # relative to the origin's Date so clock skew doesn't matter; an
+        # unparseable Expires means "already expired"
+        expires = _http_date(fields['expires'])
+        date = _http_date(fields.get('date')) or time.time()
+        return 0 if expires is None else max(0, int(expires - date))
+
+    minutes = _int_or_none(ttl)
+    if minutes is not None and minutes > 0:
+        return minutes * 60
+
+    period = UPDATE_PERIODS.get(str(update_period or '').strip().lower())
+    if period:
+        frequency = _int_or_none(update_frequency) or 1
+        return period // max(frequency, 1)
+    return None
+
+
+class NotModified:
+    """What a fetch returns instead of a feed when the origin answered 304.
+
+    ``ttl`` is the lifetime the 304's own ``Cache-Control``/``Expires``
+    headers advertise, or None.
+    """
+    __slots__ = ('ttl',)
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+
+    @classmethod
+    def from_headers(cls, headers):
+        return cls(feed_ttl(headers))
+
+
+class CacheEntry:
+    __slots__ = ('feed', 'insecure', 'etag', 'modified', 'ttl', 'expires', 'size')
+
+    def __init__(self, feed, insecure, etag, modified, ttl, size):
+        self.feed = feed
+        self.insecure = insecure
+        self.etag = etag
+        self.modified = modified
+        self.ttl = ttl
+        self.expires = time.monotonic() + ttl
+        self.size = size
+
+    @property
+    def fresh(self):
+        return time.monotonic() < self.expires
+
+
+class FeedCache:
+    """Thread-safe LRU cache keyed by feed URL."""
+
+    def __init__(self, max_entries=128, max_bytes=32 * 1024 * 1024,
+                 default_ttl=900, min_ttl=60, max_ttl=86400):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def clamp_ttl(self, ttl):
+        if ttl is None:
+            ttl = self.default_ttl
+        return max(self.min_ttl, min(self.max_ttl, ttl))
+
+    def lookup(self, url):
+        """Return the entry for ``url`` (fresh or stale) or None.
+
+        Fresh entries count as hits; stale entries count as misses but are
+        still returned so the caller can revalidate them.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(url)
+            if entry.fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self.expirations += 1
+            return entry
+
+    def put(self, url, feed, insecure=False, etag=None, modified=None, ttl=None, size=0):
+        entry = CacheEntry(feed, insecure, etag, modified, self.clamp_ttl(ttl), size)
+        with self._lock:
+            old = self._entries.pop(url, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[url] = entry
+            self._bytes += size
+            self._evict()
+        return entry
+
+    def load(self, url, fetch):
+        """Return ``(feed, insecure)`` for ``url``, served from the cache when fresh.
+
+        Otherwise ``fetch(url, etag=..., modified=...)`` is called with the
+        stale entry's validators (if any) and must return ``(feed, insecure)``,
+        ``feed`` being a ``NotModified`` (or None) when the origin answered
+        304 Not Modified.
+        """
+        entry, validators = self._validators(url)
+        if validators is None:
+            return entry.feed, entry.insecure
+        return self._fetched(url, entry, *fetch(url, **validators))
+
+    async def aload(self, url, fetch):
+        """``load`` with a coroutine function as ``fetch`` (asgi.py)."""
+        entry, validators = self._validators(url)
+        if validators is None:
+            return entry.feed, entry.insecure
+        return self._fetched(url, entry, *(await fetch(url, **validators)))
+
+    def _validators(self, url):
+        # (entry, None) when fresh, else (entry or None, fetch keyword arguments)
+        entry = self.lookup(url)
+        if entry is None:
+            return None, {}
+        if entry.fresh:
+            return entry, None
+        return entry, {'etag': entry.etag, 'modified': entry.modified}
+
+    def _fetched(self, url, entry, feed, insecure):
+        if feed is None or isinstance(feed, NotModified):
+            # 304: only a request with validators, i.e. for a cached entry, gets one
+            self.revalidated(url, getattr(feed, 'ttl', None))
+            return entry.feed, entry.insecure
+        self.put(url, feed, insecure, etag=feed.etag, modified=feed.modified,
+                 ttl=feed.ttl, size=feed.size)
+        return feed, insecure
+
+    def revalidated(self, url, ttl=None):
+        """Mark ``url`` fresh again after the origin answered 304.
+
+        ``ttl`` is the lifetime the 304 itself advertised; without one the
+        entry keeps its previous lifetime.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            if ttl is not None:
+                entry.ttl = self.clamp_ttl(ttl)
+            entry.expires = time.monotonic() + entry.ttl
+            self.revalidations += 1
+            return entry
+
+    def _evict(self):
+        # Always keep the most recently inserted entry, even if it alone
+        # exceeds the byte budget.
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            }
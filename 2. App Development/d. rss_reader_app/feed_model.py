@@ -0,0 +1,123 @@
+"""Compact, normalized feed representation.
+
+``fetch_feed`` converts parser output into these objects once, at parse
+time, and everything downstream (the cache, the store, templates and the
+JSON APIs) works from them. Only the fields the app actually renders are
+kept, so a cached feed is a handful of strings per entry instead of a full
+``FeedParserDict`` with every raw field, namespace and ``*_detail`` dict.
+"""
+from calendar import timegm
+
+from feed_cache import feed_ttl
+
+
+def _str(value):
+    return value if isinstance(value, str) else ('' if value is None else str(value))
+
+
+class Entry:
+    __slots__ = ('guid', 'title', 'link', 'published', 'timestamp', 'summary')
+
+    def __init__(self, guid='', title='', link='', published='', timestamp=None, summary=''):
+        self.guid = guid
+        self.title = title
+        self.link = link
+        self.published = published
+        self.timestamp = timestamp
+        self.summary = summary
+
+    @classmethod
+    def from_parsed(cls, entry):
+        timestamp = None
+        for key in ('published_parsed', 'updated_parsed'):
+            value = entry.get(key)
+            if value:
+                timestamp = float(timegm(value))
+                break
+        link = _str(entry.get('link'))
+        title = _str(entry.get('title'))
+        return cls(
+            guid=_str(entry.get('id') or entry.get('guid')) or link or title,
+            title=title,
+            link=link,
+            published=_str(entry.get('published') or entry.get('updated')),
+            timestamp=timestamp,
+            summary=_str(entry.get('summary')),
+        )
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row['guid'], row['title'] or '', row['link'] or '', row['published'] or '',
+                   row['published_ts'], row['summary'] or '')
+
+    @property
+    def size(self):
+        return sum(len(getattr(self, s)) for s in ('guid', 'title', 'link', 'published', 'summary'))
+
+    def to_dict(self):
+        return {s: getattr(self, s) for s in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{s: data.get(s) for s in cls.__slots__ if s in data})
+
+
+class Feed:
+    __slots__ = ('title', 'subtitle', 'updated', 'entries', 'ttl', 'etag', 'modified', 'truncated')
+
+    def __init__(self, title='', subtitle='', updated='', entries=(), ttl=None,
+                 etag=None, modified=None, truncated=False):
+        self.title = title
+        self.subtitle = subtitle
+        self.updated = updated
+        self.entries = tuple(entries)
+        self.ttl = ttl
+        self.etag = etag
+        self.modified = modified
+        self.truncated = truncated
+
+    @classmethod
+    def from_parsed(cls, parsed, headers=None):
+        """Build a Feed from ``feedparser.parse``/``parse_stream`` output."""
+        headers = headers if headers is not None else parsed.get('headers') or {}
+        meta = parsed.get('feed', {})
+        return cls(
+            title=_str(meta.get('title')),
+            subtitle=_str(meta.get('subtitle')),
+            updated=_str(meta.get('updated')),
+            entries=(Entry.from_parsed(e) for e in parsed.get('entries', ())),
+            ttl=feed_ttl(
+                headers=headers,
+                ttl=meta.get('ttl'),
+                update_period=meta.get('sy_updateperiod'),
+                update_frequency=meta.get('sy_updatefrequency'),
+            ),
+            etag=headers.get('ETag') or headers.get('etag'),
+            modified=headers.get('Last-Modified') or headers.get('last-modified'),
+            truncated=bool(parsed.get('truncated', False)),
+        )
+
+    @property
+    def size(self):
+        """Approximate payload size in bytes, used for cache accounting."""
+        return (len(self.title) + len(self.subtitle) + len(self.updated)
+                + sum(e.size for e in self.entries))
+
+    def to_dict(self):
+        data = {s: getattr(self, s) for s in self.__slots__ if s != 'entries'}
+        data['entries'] = [e.to_dict() for e in self.entries]
+        return data
+
+    def public_dict(self):
+        """``to_dict`` without the HTTP validators and fetch details (for API responses)."""
+        return {
+            'title': self.title,
+            'subtitle': self.subtitle,
+            'updated': self.updated,
+            'entries': [e.to_dict() for e in self.entries],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        values = {s: data.get(s) for s in cls.__slots__ if s in data and s != 'entries'}
+        return cls(entries=(Entry.from_dict(e) for e in data.get('entries', ())), **values)
@@ -0,0 +1,105 @@
+"""Background refresh of subscribed feeds.
+
+Each feed is polled on its own interval (taken from the feed's cache hints,
+see ``feed_model.Feed.ttl``) using conditional GETs. Failing feeds back off
+exponentially with random jitter so a dead host is not hammered and many
+failing feeds do not retry in lockstep.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from feed_cache import NotModified
+
+log = logging.getLogger(__name__)
+
+
+class FeedPoller:
+    def __init__(self, store, fetch, default_interval=900, min_interval=300,
+                 max_interval=86400, backoff_base=60, backoff_max=6 * 3600,
+                 idle_days=30, workers=4):
+        self.store = store
+        self.fetch = fetch
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.idle_days = idle_days
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='poller')
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='feed-poller', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def wake(self):
+        self._wake.set()
+
+    def interval_for(self, feed):
+        ttl = feed.ttl
+        if ttl is None:
+            ttl = self.default_interval
+        return max(self.min_interval, min(self.max_interval, ttl))
+
+    def backoff_for(self, failures):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** failures))
+        return delay * random.uniform(0.5, 1.5)
+
+    def poll(self, row):
+        """Refresh a single feed row. Raises the fetch error after recording it."""
+        now = time.time()
+        try:
+            feed, insecure = self.fetch(row['url'], etag=row['etag'], modified=row['modified'])
+        except Exception as e:
+            self.record_failure(row, e, now)
+            raise
+        self.record(row, feed, insecure, now)
+
+    def record(self, row, feed, insecure, now):
+        """Store the outcome of a fetch started at ``now`` (``feed`` None or ``NotModified``: 304)."""
+        if feed is None or isinstance(feed, NotModified):
+            if feed is not None and feed.ttl is not None:
+                interval = self.interval_for(feed)
+            else:
+                interval = row['interval'] or self.default_interval
+            self.store.not_modified(row['id'], now + interval * random.uniform(0.9, 1.1))
+            return
+        interval = self.interval_for(feed)
+        self.store.save(row['id'], feed, insecure, interval,
+                        now + interval * random.uniform(0.9, 1.1))
+
+    def record_failure(self, row, error, now):
+        self.store.failed(row['id'], error, now + self.backoff_for(row['failures']))
+
+    def _poll_quietly(self, row):
+        try:
+            self.poll(row)
+        except Exception as e:
+            log.warning('polling %s failed: %s', row['url'], e)
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.time()
+            try:
+                idle_before = now - self.idle_days * 86400 if self.idle_days else None
+                due = self.store.due_feeds(now, idle_before=idle_before)
+                for _ in self._pool.map(self._poll_quietly, due):
+                    pass
+                next_due = self.store.next_due(idle_before=idle_before)
+            except Exception:
+                log.exception('feed poller iteration failed')
+                next_due = None
+            wait = 60 if next_due is None else next_due - time.time()
+            self._wake.wait(timeout=max(1, min(60, wait)))
+            self._wake.clear()
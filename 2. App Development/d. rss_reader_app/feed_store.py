@@ -0,0 +1,252 @@
+"""Persistent SQLite store for subscribed feeds and their entries.
+
+The background poller writes here; page renders only read. Entries are
+deduplicated per feed by GUID (``feed_model.Entry.guid`` falls back to
+link, then title), so
+re-polling a feed only inserts what is new and updates what changed.
+
+Entries are read newest first by ``sort_ts``: the published timestamp, or
+when the entry was first fetched if it has none. Pages are keyset-paged on
+``(sort_ts, id)``, which is exactly the ``entries_feed_sort`` index. Each
+feed keeps at most ``max_entries`` entries, and optionally none older than
+``max_age`` seconds.
+"""
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feeds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT UNIQUE NOT NULL,
+    title TEXT,
+    subtitle TEXT,
+    updated TEXT,
+    insecure INTEGER NOT NULL DEFAULT 0,
+    etag TEXT,
+    modified TEXT,
+    interval INTEGER,
+    next_poll REAL NOT NULL DEFAULT 0,
+    last_polled REAL,
+    last_viewed REAL,
+    failures INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    version INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS feeds_next_poll ON feeds(next_poll);
+
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    feed_id INTEGER NOT NULL REFERENCES feeds(id) ON DELETE CASCADE,
+    guid TEXT NOT NULL,
+    link TEXT,
+    title TEXT,
+    published TEXT,
+    published_ts REAL,
+    summary TEXT,
+    fetched_at REAL,
+    sort_ts REAL NOT NULL DEFAULT 0,
+    UNIQUE(feed_id, guid)
+);
+"""
+
+# created after the migrations below have added sort_ts to older databases
+INDEXES = """
+DROP INDEX IF EXISTS entries_feed_published;
+CREATE INDEX IF NOT EXISTS entries_feed_sort ON entries(feed_id, sort_ts DESC, id DESC);
+"""
+
+# only refresh feeds.last_viewed once per this many seconds
+VIEW_WRITE_INTERVAL = 3600
+
+
+def entry_cursor(row):
+    """Page cursor for an ``entries()`` row: ``"<sort_ts>:<id>"``."""
+    return f"{row['sort_ts']!r}:{row['id']}"
+
+
+def parse_cursor(cursor):
+    """``(sort_ts, id)`` from ``entry_cursor``; ValueError if malformed."""
+    sort_ts, _, entry_id = cursor.partition(':')
+    return float(sort_ts), int(entry_id)
+
+
+class FeedStore:
+    def __init__(self, path, max_entries=1000, max_age=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._local = threading.local()
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {r['name'] for r in conn.execute('PRAGMA table_info(feeds)')}
+            if 'version' not in columns:
+                conn.execute('ALTER TABLE feeds ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+            columns = {r['name'] for r in conn.execute('PRAGMA table_info(entries)')}
+            if 'sort_ts' not in columns:
+                conn.execute('ALTER TABLE entries ADD COLUMN sort_ts REAL NOT NULL DEFAULT 0')
+                conn.execute('UPDATE entries SET sort_ts = COALESCE(published_ts, fetched_at, 0)')
+            conn.executescript(INDEXES)
+
+    def connect(self):
+        # one connection per thread; WAL lets page reads proceed while the
+        # poller writes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+
+    def get_feed(self, url):
+        return self.connect().execute('SELECT * FROM feeds WHERE url = ?', (url,)).fetchone()
+
+    def subscribe(self, url):
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                'INSERT OR IGNORE INTO feeds (url, next_poll, last_viewed) VALUES (?, 0, ?)',
+                (url, time.time()),
+            )
+        return self.get_feed(url)
+
+    def unsubscribe(self, url):
+        conn = self.connect()
+        with conn:
+            conn.execute('DELETE FROM feeds WHERE url = ?', (url,))
+
+    def touch(self, feed):
+        now = time.time()
+        if (feed['last_viewed'] or 0) < now - VIEW_WRITE_INTERVAL:
+            conn = self.connect()
+            with conn:
+                conn.execute('UPDATE feeds SET last_viewed = ? WHERE id = ?', (now, feed['id']))
+
+    def entries(self, feed_id, limit=200, before=None, after=None):
+        """Up to ``limit`` entries, newest first.
+
+        ``before``/``after`` are ``(sort_ts, id)`` keys (see ``parse_cursor``):
+        the rows just older than ``before``, or just newer than ``after``.
+        """
+        columns = 'id, guid, link, title, published, published_ts, summary, sort_ts'
+        if after is not None:
+            rows = self.connect().execute(
+                f'SELECT {columns} FROM entries WHERE feed_id = ? AND (sort_ts, id) > (?, ?) '
+                'ORDER BY sort_ts, id LIMIT ?',
+                (feed_id, *after, limit),
+            ).fetchall()
+            return rows[::-1]
+        if before is not None:
+            return self.connect().execute(
+                f'SELECT {columns} FROM entries WHERE feed_id = ? AND (sort_ts, id) < (?, ?) '
+                'ORDER BY sort_ts DESC, id DESC LIMIT ?',
+                (feed_id, *before, limit),
+            ).fetchall()
+        return self.connect().execute(
+            f'SELECT {columns} FROM entries WHERE feed_id = ? '
+            'ORDER BY sort_ts DESC, id DESC LIMIT ?',
+            (feed_id, limit),
+        ).fetchall()
+
+    def due_feeds(self, now, idle_before=None):
+        sql = 'SELECT * FROM feeds WHERE next_poll <= ?'
+        params = [now]
+        if idle_before is not None:
+            sql += ' AND last_viewed >= ?'
+            params.append(idle_before)
+        return self.connect().execute(sql + ' ORDER BY next_poll', params).fetchall()
+
+    def next_due(self, idle_before=None):
+        sql = 'SELECT MIN(next_poll) AS n FROM feeds'
+        params = []
+        if idle_before is not None:
+            sql += ' WHERE last_viewed >= ?'
+            params.append(idle_before)
+        row = self.connect().execute(sql, params).fetchone()
+        return row['n'] if row else None
+
+    def save(self, feed_id, feed, insecure, interval, next_poll):
+        """Store a freshly parsed ``feed_model.Feed`` and upsert its entries.
+
+        ``feeds.version`` is bumped whenever the feed's metadata or any entry
+        actually changed, so it can key caches of rendered pages.
+        """
+        now = time.time()
+        cutoff = now - self.max_age if self.max_age else None
+        rows = [
+            (feed_id, e.guid, e.link, e.title, e.published, e.timestamp, e.summary, now,
+             now if e.timestamp is None else e.timestamp)
+            for e in feed.entries
+            # entries past the retention age would only be pruned again
+            if e.guid and (cutoff is None or e.timestamp is None or e.timestamp >= cutoff)
+        ]
+        conn = self.connect()
+        with conn:
+            changed = conn.execute(
+                'SELECT 1 FROM feeds WHERE id = ? AND (title IS NOT ? OR subtitle IS NOT ? '
+                'OR updated IS NOT ? OR insecure IS NOT ?)',
+                (feed_id, feed.title, feed.subtitle, feed.updated, int(bool(insecure))),
+            ).fetchone() is not None
+            conn.execute(
+                'UPDATE feeds SET title = ?, subtitle = ?, updated = ?, insecure = ?, etag = ?, '
+                'modified = ?, interval = ?, next_poll = ?, last_polled = ?, failures = 0, '
+                'last_error = NULL WHERE id = ?',
+                (feed.title, feed.subtitle, feed.updated,
+                 int(bool(insecure)), feed.etag, feed.modified,
+                 interval, next_poll, now, feed_id),
+            )
+            cur = conn.executemany(
+                'INSERT INTO entries (feed_id, guid, link, title, published, published_ts, summary, '
+                'fetched_at, sort_ts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(feed_id, guid) DO UPDATE SET link = excluded.link, title = excluded.title, '
+                'published = excluded.published, published_ts = excluded.published_ts, '
+                'summary = excluded.summary, '
+                # an undated entry keeps the position it was first fetched at
+                'sort_ts = COALESCE(excluded.published_ts, entries.sort_ts) '
+                'WHERE entries.title IS NOT excluded.title OR entries.summary IS NOT excluded.summary '
+                'OR entries.link IS NOT excluded.link OR entries.published IS NOT excluded.published',
+                rows,
+            )
+            # never prune what the feed itself still lists
+            pruned = self._prune(conn, feed_id, max(self.max_entries, len(rows)), cutoff)
+            if changed or cur.rowcount > 0 or pruned:
+                conn.execute('UPDATE feeds SET version = version + 1 WHERE id = ?', (feed_id,))
+
+    def _prune(self, conn, feed_id, keep, cutoff):
+        """Delete the feed's entries beyond the newest ``keep`` or older than ``cutoff``."""
+        pruned = conn.execute(
+            'DELETE FROM entries WHERE id IN (SELECT id FROM entries WHERE feed_id = ? '
+            'ORDER BY sort_ts DESC, id DESC LIMIT -1 OFFSET ?)',
+            (feed_id, keep),
+        ).rowcount
+        if cutoff is not None:
+            pruned += conn.execute(
+                'DELETE FROM entries WHERE feed_id = ? AND sort_ts < ?', (feed_id, cutoff),
+            ).rowcount
+        return pruned
+
+    def not_modified(self, feed_id, next_poll):
+        now = time.time()
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                'UPDATE feeds SET next_poll = ?, last_polled = ?, failures = 0, last_error = NULL '
+                'WHERE id = ?',
+                (next_poll, now, feed_id),
+            )
+            # entries still age out of feeds that never change
+            if self.max_age and self._prune(conn, feed_id, self.max_entries, now - self.max_age):
+                conn.execute('UPDATE feeds SET version = version + 1 WHERE id = ?', (feed_id,))
+
+    def failed(self, feed_id, error, next_poll):
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                'UPDATE feeds SET next_poll = ?, last_polled = ?, failures = failures + 1, '
+                'last_error = ? WHERE id = ?',
+                (next_poll, time.time(), str(error)[:500], feed_id),
+            )
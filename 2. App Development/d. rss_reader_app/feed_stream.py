@@ -0,0 +1,222 @@
+"""Incremental RSS/Atom parsing for large feeds.
+
+``parse_stream`` feeds response chunks to an ``XMLPullParser`` and builds
+each item as soon as its closing tag arrives, then discards the element.
+Reading stops once ``max_entries`` items have been collected or
+``max_bytes`` have been read, so memory and time no longer scale with the
+size of the upstream document. The result has the same shape as
+``feedparser.parse`` (``feed``, ``entries``, ``bozo``) for the fields this
+app uses.
+
+Documents expat cannot handle (HTML entities, unsupported encodings,
+broken markup) fall back to ``feedparser`` on the bytes read so far, and
+so does anything else this module fails on.
+"""
+import xml.etree.ElementTree as ET
+
+import feedparser
+
+# Dates and summaries go through feedparser's own helpers so both paths give
+# the same results. They are not public API: requirements.txt pins the
+# feedparser release they were checked against, and if they are missing
+# every document takes the feedparser.parse fallback.
+try:
+    from feedparser.datetimes import _parse_date
+    from feedparser.sanitizer import _sanitize_html
+except ImportError:
+    _parse_date = _sanitize_html = None
+
+ITEM_TAGS = {'item', 'entry'}
+CONTAINER_TAGS = {'channel', 'feed'}
+
+# element local name -> (feed meta key) for channel/feed level fields
+FEED_FIELDS = {
+    'title': 'title',
+    'description': 'subtitle',
+    'subtitle': 'subtitle',
+    'tagline': 'subtitle',
+    'lastBuildDate': 'updated',
+    'updated': 'updated',
+    'modified': 'updated',
+    'pubDate': 'updated',
+    'ttl': 'ttl',
+    'updatePeriod': 'sy_updateperiod',
+    'updateFrequency': 'sy_updatefrequency',
+}
+
+# element local name -> entry key; the first match wins for each key
+ENTRY_FIELDS = {
+    'title': 'title',
+    'guid': 'id',
+    'id': 'id',
+    'pubDate': 'published',
+    'published': 'published',
+    'issued': 'published',
+    'date': 'published',
+    'updated': 'updated',
+    'modified': 'updated',
+    'description': 'summary',
+    'summary': 'summary',
+    'encoded': 'content',
+    'content': 'content',
+}
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+
+def _text(elem):
+    if len(elem):
+        # inline XHTML content (Atom type="xhtml")
+        parts = [elem.text or '']
+        parts.extend(ET.tostring(child, encoding='unicode') for child in elem)
+        return ''.join(parts).strip()
+    return (elem.text or '').strip()
+
+
+def _entry_from(elem):
+    entry = feedparser.FeedParserDict()
+    for child in elem:
+        name = _local(child.tag)
+        if name == 'link':
+            rel = child.get('rel', 'alternate')
+            href = child.get('href') or _text(child)
+            if href and rel == 'alternate' and 'link' not in entry:
+                entry['link'] = href
+            continue
+        key = ENTRY_FIELDS.get(name)
+        if key and key not in entry:
+            entry[key] = _text(child)
+    if 'summary' not in entry and 'content' in entry:
+        entry['summary'] = entry['content']
+    entry.pop('content', None)
+    if 'link' not in entry and entry.get('id', '').startswith(('http://', 'https://')):
+        entry['link'] = entry['id']
+    if entry.get('summary'):
+        entry['summary'] = _sanitize_html(entry['summary'], 'utf-8', 'text/html')
+    for key in ('published', 'updated'):
+        if entry.get(key):
+            entry[key + '_parsed'] = _parse_date(entry[key])
+    return entry
+
+
+class _StreamParser:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._stack = []
+        self.meta = feedparser.FeedParserDict()
+        self.entries = []
+
+    @property
+    def full(self):
+        return self.max_entries is not None and len(self.entries) >= self.max_entries
+
+    def feed(self, chunk):
+        self._parser.feed(chunk)
+        self._drain()
+
+    def close(self):
+        self._parser.close()
+        self._drain()
+
+    def _drain(self):
+        for event, elem in self._parser.read_events():
+            name = _local(elem.tag)
+            if event == 'start':
+                self._stack.append(name)
+                continue
+            self._stack.pop()
+            parent = self._stack[-1] if self._stack else None
+            if name in ITEM_TAGS:
+                if not self.full:
+                    self.entries.append(_entry_from(elem))
+                elem.clear()
+            elif parent in CONTAINER_TAGS:
+                key = FEED_FIELDS.get(name)
+                if key and key not in self.meta:
+                    self.meta[key] = _text(elem)
+                elem.clear()
+            if self.full:
+                return
+
+
+class StreamReader:
+    """Push-style ``parse_stream`` for callers that receive chunks themselves
+    (e.g. an async HTTP client): call ``feed(chunk)`` until it returns True
+    or the body ends, then ``result()``.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._parser = _StreamParser(max_entries)
+        self.read = 0
+        # kept only for the feedparser fallback; bounded by max_bytes
+        self._seen = []
+        self._failed = _sanitize_html is None or _parse_date is None
+        self.truncated = False
+
+    def feed(self, chunk):
+        """Consume ``chunk``; True once a limit is reached and reading should stop."""
+        if not chunk:
+            return False
+        if self._failed:
+            # not well-formed XML; collect what feedparser gets to see
+            if self.max_bytes is not None and self.read >= self.max_bytes:
+                self.truncated = True
+                return True
+            self.read += len(chunk)
+            self._seen.append(chunk)
+            return False
+        self.read += len(chunk)
+        self._seen.append(chunk)
+        try:
+            self._parser.feed(chunk)
+        except Exception:
+            # not well-formed XML, or an entry the helpers above choke on
+            self._failed = True
+            return False
+        if self._parser.full or (self.max_bytes is not None and self.read >= self.max_bytes):
+            self.truncated = True
+            return True
+        return False
+
+    def result(self):
+        """The parsed feed, shaped like ``feedparser.parse`` output."""
+        if not self._failed and not self.truncated:
+            try:
+                self._parser.close()
+            except Exception:
+                self._failed = True
+        if self._failed:
+            # let feedparser's lenient parser handle what has been read so
+            # far (still bounded by max_bytes)
+            result = feedparser.parse(b''.join(self._seen))
+            if self.max_entries is not None and len(result.entries) > self.max_entries:
+                result['entries'] = result.entries[:self.max_entries]
+                self.truncated = True
+            result['truncated'] = self.truncated
+            result['bytes_read'] = self.read
+            return result
+        return feedparser.FeedParserDict(
+            feed=self._parser.meta,
+            entries=self._parser.entries,
+            bozo=False,
+            truncated=self.truncated,
+            bytes_read=self.read,
+        )
+
+
+def parse_stream(chunks, max_entries=None, max_bytes=None):
+    """Parse a feed from an iterable of byte chunks.
+
+    The returned dict has ``truncated`` set when reading stopped early
+    because a limit was reached, and ``bytes_read`` with the amount consumed.
+    """
+    reader = StreamReader(max_entries, max_bytes)
+    for chunk in chunks:
+        if reader.feed(chunk):
+            break
+    return reader.result()
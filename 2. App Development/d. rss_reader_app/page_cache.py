@@ -0,0 +1,73 @@
+"""LRU cache of rendered HTML pages.
+
+Pages are stored as encoded bytes together with their ETag, keyed by
+whatever uniquely determines the output (for feed pages: URL, stored feed
+version, embed flag and page cursor). The ETag is derived from that key by the
+caller, so it is known before rendering. Because the feed version is part
+of the key, a refreshed feed simply misses and the stale page ages out of
+the LRU.
+"""
+import threading
+from collections import OrderedDict
+
+
+class RenderedPage:
+    __slots__ = ('body', 'etag')
+
+    def __init__(self, body, etag):
+        self.body = body
+        self.etag = etag
+
+
+class PageCache:
+    def __init__(self, max_entries=512, max_bytes=16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._pages = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None:
+                self.misses += 1
+                return None
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def put(self, key, html, etag):
+        body = html.encode('utf-8') if isinstance(html, str) else html
+        page = RenderedPage(body, etag)
+        with self._lock:
+            old = self._pages.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            self._pages[key] = page
+            self._bytes += len(body)
+            while len(self._pages) > 1 and (
+                len(self._pages) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, evicted = self._pages.popitem(last=False)
+                self._bytes -= len(evicted.body)
+                self.evictions += 1
+        return page
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._pages),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,80 @@
+"""Concurrent multi-feed aggregation ("river of news").
+
+Feeds are loaded on a shared thread pool, which caps global concurrency,
+with an additional per-host semaphore so a single origin is never hit by
+more than a few parallel requests. Feeds that fail, or that have not
+finished by the deadline, are reported instead of holding up the page.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+
+class River:
+    def __init__(self, load_feed, max_workers=16, per_host=2):
+        self.load_feed = load_feed
+        self.per_host = per_host
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='river')
+        self._host_limits = {}
+        self._lock = threading.Lock()
+
+    def _host_semaphore(self, url):
+        host = urlparse(url if '://' in url else 'http://' + url).netloc.lower()
+        with self._lock:
+            sem = self._host_limits.get(host)
+            if sem is None:
+                sem = self._host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return sem
+
+    def _load(self, url):
+        with self._host_semaphore(url):
+            return self.load_feed(url)
+
+    def aggregate(self, urls, timeout=10, limit=100, results=None):
+        """Load ``urls`` concurrently and merge their entries newest first.
+
+        Returns a dict with ``entries`` (at most ``limit``), ``feeds`` (per-URL
+        status) and ``elapsed`` seconds. Feeds still running after ``timeout``
+        seconds are marked ``timeout`` and left to finish in the background,
+        which warms the cache for the next request.
+
+        ``results`` maps URLs to already loaded ``(feed, insecure)`` pairs or
+        exceptions (see asgi.py); URLs missing from it count as timeouts and
+        nothing is loaded here.
+        """
+        started = time.monotonic()
+        urls = list(dict.fromkeys(u for u in urls if u))
+        if results is None:
+            futures = {self._pool.submit(self._load, u): u for u in urls}
+            done, _ = wait(futures, timeout=timeout)
+            results = {
+                url: future.exception() or future.result()
+                for future, url in futures.items() if future in done
+            }
+
+        entries = []
+        feeds = []
+        for url in urls:
+            status = {'url': url, 'status': 'ok', 'title': None, 'entries': 0, 'insecure': False}
+            outcome = results.get(url)
+            if outcome is None:
+                status['status'] = 'timeout'
+            elif isinstance(outcome, BaseException):
+                status['status'] = 'error'
+                status['error'] = str(outcome)
+            else:
+                feed, insecure = outcome
+                status['title'] = feed.title
+                status['insecure'] = insecure
+                status['entries'] = len(feed.entries)
+                for entry in feed.entries:
+                    entries.append((entry.timestamp, url, feed.title, entry))
+            feeds.append(status)
+
+        entries.sort(key=lambda e: e[0] or 0, reverse=True)
+        return {
+            'entries': entries[:limit],
+            'feeds': feeds,
+            'elapsed': round(time.monotonic() - started, 3),
+        }
@@ -27,6 +27,8 @@ pip install -r requirements.txt
 
 # Start the app (development server)
 export FLASK_APP=app.py
+# this process refreshes subscribed feeds in the background
+export RSS_POLLER=1
 echo "Starting Flask development server on http://127.0.0.1:5000"
 flask run --port 5000
 
@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# app.py opens its store (and may start the poller) on import
+os.environ['RSS_DB'] = os.path.join(tempfile.mkdtemp(prefix='rss-tests-'), 'feeds.db')
+os.environ['RSS_POLLER'] = '0'
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
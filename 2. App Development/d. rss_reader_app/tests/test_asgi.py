@@ -0,0 +1,84 @@
+import asyncio
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+import app as reader
+import asgi
+
+RSS = b'''<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Counted</title>
+<item><guid>a</guid><title>first</title><link>https://example.com/a</link></item>
+</channel></rss>'''
+
+
+class CountingServer:
+    """Local feed origin that counts GETs and answers slowly enough for callers to overlap."""
+
+    def __init__(self, delay=0.3):
+        self.hits = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(handler):
+                self.hits += 1
+                time.sleep(delay)
+                handler.send_response(200)
+                handler.send_header('Content-Type', 'application/rss+xml')
+                handler.send_header('Content-Length', str(len(RSS)))
+                handler.end_headers()
+                handler.wfile.write(RSS)
+
+            def log_message(handler, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def closed_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def get_all(url, count):
+    transport = httpx.ASGITransport(app=asgi.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url='http://testserver') as client:
+            return await asyncio.gather(*(
+                client.get('/api/feed', params={'url': url}) for _ in range(count)))
+    finally:
+        await asgi.FETCHER.aclose()
+
+
+def test_concurrent_first_loads_share_one_fetch():
+    origin = CountingServer()
+    try:
+        url = origin.base_url + '/feed.xml'
+        responses = asyncio.run(get_all(url, 20))
+    finally:
+        origin.close()
+    assert [r.status_code for r in responses] == [200] * 20
+    assert {r.json()['title'] for r in responses} == {'Counted'}
+    assert origin.hits == 1
+    assert reader.STORE.get_feed(url)['last_polled'] is not None
+
+
+def test_unreachable_feed_is_a_502():
+    url = f'http://127.0.0.1:{closed_port()}/feed.xml'
+    responses = asyncio.run(get_all(url, 3))
+    assert [r.status_code for r in responses] == [502] * 3
+    assert all(r.json()['error'].startswith('Failed to fetch feed') for r in responses)
+    # a URL that never worked is not kept subscribed
+    assert reader.STORE.get_feed(url) is None
@@ -0,0 +1,68 @@
+import asyncio
+
+from feed_cache import FeedCache, NotModified, feed_ttl
+from feed_model import Entry, Feed
+
+
+class Origin:
+    """Fake fetch: answers 304 while the client's etag matches, else the feed."""
+
+    def __init__(self):
+        self.version = 1
+        self.calls = []
+
+    def fetch(self, url, etag=None, modified=None):
+        self.calls.append(etag)
+        if etag == f'v{self.version}':
+            return None, False
+        return Feed(title=f'v{self.version}', entries=[Entry(guid='a', title='a')], etag=f'v{self.version}'), False
+
+    async def afetch(self, url, etag=None, modified=None):
+        return self.fetch(url, etag=etag, modified=modified)
+
+
+def expire(cache, url):
+    cache.lookup(url).expires = 0
+
+
+def check(load):
+    cache, origin = FeedCache(), Origin()
+    assert load(cache, origin)[0].title == 'v1'
+    assert load(cache, origin)[0].title == 'v1'
+    assert origin.calls == [None]  # the second load was a cache hit
+    expire(cache, 'u')
+    assert load(cache, origin)[0].title == 'v1'
+    assert origin.calls == [None, 'v1'] and cache.revalidations == 1
+    assert cache.lookup('u').fresh
+    origin.version = 2
+    expire(cache, 'u')
+    assert load(cache, origin)[0].title == 'v2'
+    assert cache.lookup('u').etag == 'v2'
+
+
+def test_load():
+    check(lambda cache, origin: cache.load('u', origin.fetch))
+
+
+def test_aload_behaves_like_load():
+    check(lambda cache, origin: asyncio.run(cache.aload('u', origin.afetch)))
+
+
+def test_304_applies_its_own_ttl():
+    cache = FeedCache(default_ttl=900, min_ttl=60, max_ttl=86400)
+    cache.put('u', Feed(title='v1', etag='v1'), ttl=900)
+    expire(cache, 'u')
+    answer = NotModified.from_headers({'Cache-Control': 'public, max-age=7200'})
+    assert cache.load('u', lambda url, **validators: (answer, False))[0].title == 'v1'
+    assert cache.lookup('u').ttl == 7200
+    # a 304 without freshness headers keeps the entry's previous lifetime
+    expire(cache, 'u')
+    cache.load('u', lambda url, **validators: (NotModified(), False))
+    assert cache.lookup('u').ttl == 7200 and cache.lookup('u').fresh
+
+
+def test_feed_ttl_reads_expires_against_date():
+    headers = {'Date': 'Sun, 18 Oct 2026 10:00:00 GMT', 'Expires': 'Sun, 18 Oct 2026 10:30:00 GMT'}
+    assert feed_ttl(headers) == 1800
+    assert feed_ttl(dict(headers, **{'Cache-Control': 'max-age=60'})) == 60
+    assert feed_ttl({'Expires': '0'}) == 0
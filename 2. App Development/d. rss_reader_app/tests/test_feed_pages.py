@@ -0,0 +1,79 @@
+import time
+
+import app as reader
+from feed_model import Entry, Feed
+
+FEED_URL = 'https://example.com/paged.xml'
+
+
+def setup_module():
+    row = reader.STORE.subscribe(FEED_URL)
+    feed = Feed(title='Paged', entries=[
+        Entry(guid=f'g{i}', title=f'entry {i}', link=f'https://example.com/{i}', timestamp=1000.0 + i)
+        for i in range(60)
+    ])
+    reader.POLLER.record(row, feed, False, time.time())
+
+
+def test_api_feed_pages_with_cursors():
+    client = reader.app.test_client()
+    pages = [client.get('/api/feed', query_string={'url': FEED_URL, 'per_page': 25}).get_json()]
+    while pages[-1]['older']:
+        pages.append(client.get('/api/feed', query_string={
+            'url': FEED_URL, 'per_page': 25, 'before': pages[-1]['older']}).get_json())
+    titles = [e['title'] for p in pages for e in p['entries']]
+    assert titles == [f'entry {i}' for i in range(59, -1, -1)]
+    assert [len(p['entries']) for p in pages] == [25, 25, 10]
+    assert pages[0]['newer'] is None and not pages[-1]['has_more']
+    # Newer from the last page lands on the middle one, and from there on the first
+    middle = client.get('/api/feed', query_string={
+        'url': FEED_URL, 'per_page': 25, 'after': pages[-1]['newer']}).get_json()
+    assert middle['entries'] == pages[1]['entries']
+    first = client.get('/api/feed', query_string={
+        'url': FEED_URL, 'per_page': 25, 'after': middle['newer']}).get_json()
+    assert first['entries'] == pages[0]['entries'] and first['newer'] is None
+
+
+def test_api_feed_rejects_bad_cursor():
+    resp = reader.app.test_client().get('/api/feed', query_string={'url': FEED_URL, 'before': 'x'})
+    assert resp.status_code == 400
+
+
+def test_index_pager_links():
+    client = reader.app.test_client()
+    html = client.get('/', query_string={'url': FEED_URL}).get_data(as_text=True)
+    assert 'before=' in html and 'after=' not in html
+    assert client.get('/', query_string={'url': FEED_URL, 'before': 'garbage'}).status_code == 200
+
+
+def test_api_feed_leaves_out_fetch_details():
+    data = reader.app.test_client().get('/api/feed', query_string={'url': FEED_URL}).get_json()
+    assert not {'etag', 'modified', 'ttl', 'truncated'} & set(data)
+    assert set(data['entries'][0]) == {'guid', 'title', 'link', 'published', 'timestamp', 'summary'}
+
+
+def record(url, titles):
+    row = reader.STORE.subscribe(url)
+    feed = Feed(title='Tagged', entries=[
+        Entry(guid=t, title=t, link=f'https://example.com/{t}', timestamp=2000.0 + i)
+        for i, t in enumerate(titles)
+    ])
+    reader.POLLER.record(row, feed, False, time.time())
+
+
+def test_etag_revalidation_and_refresh():
+    url = 'https://example.com/tagged.xml'
+    record(url, ['one'])
+    client = reader.app.test_client()
+    for path in ('/', '/api/feed'):
+        first = client.get(path, query_string={'url': url})
+        etag = first.headers['ETag']
+        assert first.status_code == 200 and etag
+        again = client.get(path, query_string={'url': url}, headers={'If-None-Match': etag})
+        assert again.status_code == 304 and not again.data
+        # a refresh that changes the feed changes the ETag, so the old one no longer matches
+        record(url, ['one', f'two via {path}'])
+        changed = client.get(path, query_string={'url': url}, headers={'If-None-Match': etag})
+        assert changed.status_code == 200
+        assert changed.headers['ETag'] != etag
+        assert f'two via {path}' in changed.get_data(as_text=True)
@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+from feed_model import Entry, Feed
+from feed_store import FeedStore, parse_cursor, entry_cursor
+
+DAY = 86400
+
+
+def make_feed(timestamps, prefix='e'):
+    return Feed(title='t', entries=[
+        Entry(guid=f'{prefix}{i}', title=f'{prefix}{i}', timestamp=ts) for i, ts in enumerate(timestamps)
+    ])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FeedStore(str(tmp_path / 'feeds.db'))
+
+
+def stored(store, feed_id, feed):
+    store.save(feed_id, feed, False, 900, 0)
+
+
+def titles(rows):
+    return [r['title'] for r in rows]
+
+
+def test_entries_newest_first_with_undated_at_fetch_time(store):
+    feed_id = store.subscribe('https://example.com/feed')['id']
+    now = time.time()
+    stored(store, feed_id, make_feed([now - 3 * DAY, None, now - DAY]))
+    assert titles(store.entries(feed_id)) == ['e1', 'e2', 'e0']
+
+
+def test_keyset_pages_cover_every_entry_once(store):
+    feed_id = store.subscribe('https://example.com/feed')['id']
+    # duplicate timestamps are ordered by id
+    stored(store, feed_id, make_feed([1000.0 + i // 3 for i in range(20)]))
+    seen, before = [], None
+    while True:
+        rows = store.entries(feed_id, limit=7, before=before)
+        if not rows:
+            break
+        seen += titles(rows)
+        before = parse_cursor(entry_cursor(rows[-1]))
+    assert seen == titles(store.entries(feed_id))
+    assert len(set(seen)) == 20
+    # after= walks back towards the newest, still newest first
+    first = store.entries(feed_id, limit=7)
+    second = store.entries(feed_id, limit=7, before=parse_cursor(entry_cursor(first[-1])))
+    assert titles(store.entries(feed_id, limit=7, after=parse_cursor(entry_cursor(second[0])))) == titles(first)
+
+
+def test_paging_query_uses_the_index(store):
+    plan = store.connect().execute(
+        'EXPLAIN QUERY PLAN SELECT id FROM entries WHERE feed_id = ? AND (sort_ts, id) < (?, ?) '
+        'ORDER BY sort_ts DESC, id DESC LIMIT 10', (1, 0.0, 0),
+    ).fetchall()
+    detail = ' '.join(r['detail'] for r in plan)
+    assert 'entries_feed_sort' in detail
+    assert 'TEMP B-TREE' not in detail
+
+
+def test_entries_are_capped_per_feed(tmp_path):
+    store = FeedStore(str(tmp_path / 'feeds.db'), max_entries=5)
+    feed_id = store.subscribe('https://example.com/feed')['id']
+    stored(store, feed_id, make_feed([1000.0 + i for i in range(4)], prefix='a'))
+    stored(store, feed_id, make_feed([2000.0 + i for i in range(3)], prefix='b'))
+    assert titles(store.entries(feed_id)) == ['b2', 'b1', 'b0', 'a3', 'a2']
+    # a feed listing more than the cap keeps all it lists
+    stored(store, feed_id, make_feed([3000.0 + i for i in range(8)], prefix='c'))
+    assert len(store.entries(feed_id)) == 8
+
+
+def test_entries_age_out(tmp_path):
+    store = FeedStore(str(tmp_path / 'feeds.db'), max_age=7 * DAY)
+    feed_id = store.subscribe('https://example.com/feed')['id']
+    now = time.time()
+    stored(store, feed_id, make_feed([now - DAY, now - 30 * DAY]))
+    assert titles(store.entries(feed_id)) == ['e0']
+    version = store.get_feed('https://example.com/feed')['version']
+    # re-polling the same feed neither re-inserts the old entry nor bumps the version
+    stored(store, feed_id, make_feed([now - DAY, now - 30 * DAY]))
+    assert store.get_feed('https://example.com/feed')['version'] == version
+
+
+def test_old_databases_get_a_sort_key(tmp_path):
+    import sqlite3
+    path = str(tmp_path / 'feeds.db')
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE entries (id INTEGER PRIMARY KEY AUTOINCREMENT, feed_id INTEGER NOT NULL, guid TEXT NOT NULL,
+            link TEXT, title TEXT, published TEXT, published_ts REAL, summary TEXT, fetched_at REAL,
+            UNIQUE(feed_id, guid));
+        CREATE INDEX entries_feed_published ON entries(feed_id, published_ts DESC, id DESC);
+        INSERT INTO entries (feed_id, guid, title, published_ts, fetched_at) VALUES
+            (1, 'a', 'a', 100, 500), (1, 'b', 'b', NULL, 300), (1, 'c', 'c', 400, 500);
+    """)
+    conn.close()
+    store = FeedStore(path)
+    assert titles(store.entries(1)) == ['c', 'b', 'a']
+    names = {r['name'] for r in store.connect().execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert 'entries_feed_published' not in names
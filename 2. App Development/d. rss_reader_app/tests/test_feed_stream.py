@@ -0,0 +1,42 @@
+import feed_stream
+from feed_stream import parse_stream
+
+DOC = b'''<?xml version="1.0"?><rss version="2.0"><channel><title>Stream</title>''' + b''.join(
+    b'<item><title>item %d</title><guid>g%d</guid><pubDate>Mon, 01 Jan 2024 00:%02d:00 +0000</pubDate>'
+    b'<description>&lt;p onclick="x()"&gt;text %d&lt;/p&gt;&lt;script&gt;bad()&lt;/script&gt;</description></item>'
+    % (i, i, i, i) for i in range(5)
+) + b'</channel></rss>'
+
+
+def chunked(data, size=50):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+def summary(result):
+    return [(e['title'], e['summary'], tuple(e['published_parsed'])) for e in result['entries']]
+
+
+def test_streamed_entries_match_feedparser():
+    streamed = parse_stream(chunked(DOC))
+    assert not streamed['bozo']
+    assert [e['title'] for e in streamed['entries']] == [f'item {i}' for i in range(5)]
+    assert 'script' not in streamed['entries'][0]['summary']
+    assert 'onclick' not in streamed['entries'][0]['summary']
+    assert summary(streamed) == summary(feed_stream.feedparser.parse(DOC))
+
+
+def test_without_feedparser_helpers_everything_falls_back(monkeypatch):
+    monkeypatch.setattr(feed_stream, '_sanitize_html', None)
+    result = parse_stream(chunked(DOC), max_entries=3)
+    assert [e['title'] for e in result['entries']] == ['item 0', 'item 1', 'item 2']
+    assert result['truncated']
+    assert 'script' not in result['entries'][0]['summary']
+
+
+def test_helper_errors_fall_back(monkeypatch):
+    def broken(value):
+        raise TypeError('changed signature')
+    monkeypatch.setattr(feed_stream, '_parse_date', broken)
+    result = parse_stream(chunked(DOC))
+    assert [e['title'] for e in result['entries']] == [f'item {i}' for i in range(5)]
+    assert result['entries'][0]['published_parsed'] is not None
@@ -0,0 +1,63 @@
+import threading
+
+import app as reader
+from feed_model import Entry, Feed
+from river import River
+
+
+def make_feed(name, *timestamps):
+    return Feed(title=name, entries=[
+        Entry(guid=f'{name}{ts}', title=f'{name} {ts}', timestamp=ts) for ts in timestamps
+    ])
+
+
+FEEDS = {
+    'https://a.example/feed': make_feed('a', 1.0, 3.0),
+    'https://b.example/feed': make_feed('b', 2.0),
+}
+BROKEN = 'https://broken.example/feed'
+
+
+def load_feed(url):
+    if url == BROKEN:
+        raise RuntimeError('Failed to fetch feed: 500 Server Error')
+    return FEEDS[url], url.startswith('https://b.')
+
+
+def test_one_failing_feed_does_not_hide_the_others():
+    result = River(load_feed).aggregate([*FEEDS, BROKEN])
+    statuses = {s['url']: s for s in result['feeds']}
+    assert statuses[BROKEN]['status'] == 'error'
+    assert '500 Server Error' in statuses[BROKEN]['error']
+    assert statuses['https://a.example/feed']['status'] == 'ok'
+    assert statuses['https://a.example/feed']['entries'] == 2
+    assert statuses['https://b.example/feed']['insecure']
+    assert [e[3].title for e in result['entries']] == ['a 3.0', 'b 2.0', 'a 1.0']
+
+
+def test_slow_feed_times_out_and_the_rest_render():
+    release = threading.Event()
+    slow = 'https://slow.example/feed'
+
+    def load(url):
+        if url == slow:
+            release.wait(5)
+            return make_feed('slow', 9.0), False
+        return load_feed(url)
+
+    try:
+        result = River(load).aggregate([slow, 'https://a.example/feed'], timeout=0.2)
+    finally:
+        release.set()
+    assert [s['status'] for s in result['feeds']] == ['timeout', 'ok']
+    assert [e[3].title for e in result['entries']] == ['a 3.0', 'a 1.0']
+
+
+def test_api_river_reports_partial_failure(monkeypatch):
+    monkeypatch.setattr(reader.RIVER, 'load_feed', load_feed)
+    resp = reader.app.test_client().get('/api/river', query_string=[
+        ('url', 'https://a.example/feed'), ('url', BROKEN)])
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert [s['status'] for s in data['feeds']] == ['ok', 'error']
+    assert {e['feed'] for e in data['entries']} == {'https://a.example/feed'}
@@ -1,11 +1,38 @@
 import os
-from flask import Flask
+import sys
+from flask import Flask, session
 from flask_login import LoginManager
 from .models import User
+from .security import configured_method, init_hasher, session_token
+from .cache import reference_cache
+from .pool import Database, PoolExhausted
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 
-def create_app():
+# modules shared by the repo's apps live in <repo>/shared
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "..", "shared"))
+import http_pipeline
+
+
+def init_instrumentation(app):
+    """
+    Opt-in (INSTRUMENT=1) request timing, /metrics and profiling from the
+    repo's shared/instrument.py. Must run before the pools open connections.
+    """
+    import instrument
+    from . import db, routes
+
+    instrument.init_app(app, prefix="secure_vault")
+    # routes imports decode_payload by name, so both references are wrapped
+    instrument.wrap(db, "decode_payload", "json")
+    instrument.wrap(routes, "decode_payload", "json")
+
+
+def create_app(config=None):
+    """
+    Build the app. ``config`` overrides the settings below (tests point
+    DATABASE at a scratch file with it).
+    """
     template_folder = os.path.join(BASE_DIR, "frontend", "templates")
     static_folder = os.path.join(BASE_DIR, "frontend", "static")
     app = Flask(__name__, template_folder=template_folder, static_folder=static_folder)
@@ -13,7 +40,20 @@ def create_app():
     app.config.from_mapping(
         SECRET_KEY=os.environ.get("PV_APP_SECRET", "change-me-for-production"),
         DATABASE=os.path.join(app.instance_path, "vault.db"),
+        # password hashing: cost (werkzeug method string) and concurrency cap
+        PASSWORD_HASH_METHOD=configured_method(),
+        PASSWORD_HASH_WORKERS=int(os.environ.get("PV_HASH_WORKERS", 2)),
+        PASSWORD_HASH_MAX_PENDING=int(os.environ.get("PV_HASH_MAX_PENDING", 16)),
+        # seconds other worker processes may serve cached sections/users
+        REFERENCE_CACHE_TTL=int(os.environ.get("PV_REFERENCE_CACHE_TTL", 60)),
+        # connection pools: size the read pool to at least the worker's thread count
+        DB_POOL_SIZE=int(os.environ.get("PV_DB_POOL_SIZE", 4)),
+        DB_READ_POOL_SIZE=int(os.environ.get("PV_DB_READ_POOL_SIZE", 16)),
+        DB_POOL_TIMEOUT=float(os.environ.get("PV_DB_POOL_TIMEOUT", 5)),
+        DB_BUSY_TIMEOUT=int(os.environ.get("PV_DB_BUSY_TIMEOUT", 5000)),
     )
+    if config:
+        app.config.update(config)
 
     # ensure instance folder exists
     try:
@@ -25,14 +65,36 @@ def create_app():
     login_manager = LoginManager()
     login_manager.login_view = "auth.login"
     login_manager.init_app(app)
+    init_hasher(app)
+    # compression, conditional GETs and fingerprinted static files
+    http_pipeline.init_app(app)
+    reference_cache.ttl = app.config["REFERENCE_CACHE_TTL"]
 
-    from .db import get_user_by_id
+    if os.environ.get("INSTRUMENT") == "1":
+        init_instrumentation(app)
+
+    Database(app)
+
+    from .db import get_cached_user, get_db, upgrade_schema
+
+    # add columns/indexes newer code relies on to existing databases
+    if os.path.exists(app.config["DATABASE"]):
+        with app.app_context():
+            upgrade_schema(get_db())
+
+    @app.errorhandler(PoolExhausted)
+    def pool_exhausted(e):
+        return "Server busy, please try again in a moment.", 503
 
     @login_manager.user_loader
     def load_user(user_id):
-        u = get_user_by_id(user_id)
+        u = get_cached_user(user_id)
         if not u:
             return None
+        # sessions are bound to the password hash they logged in with;
+        # this is a cached HMAC, never a password-hash computation
+        if session.get("auth_token") != session_token(app.secret_key, u):
+            return None
         return User(id=u["id"], username=u["username"])
 
     # register blueprints
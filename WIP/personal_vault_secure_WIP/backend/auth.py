@@ -1,8 +1,8 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from werkzeug.security import check_password_hash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, session
 from flask_login import login_user, logout_user, login_required, current_user
-from .db import get_user_by_username
+from .db import get_user_by_username, update_password_hash
 from .models import User
+from .security import HasherBusy, session_token
 
 bp = Blueprint("auth", __name__, url_prefix="/auth")
 
@@ -12,9 +12,23 @@ def login():
         username = request.form.get("username", "").strip()
         password = request.form.get("password", "")
         user_row = get_user_by_username(username)
-        if user_row and check_password_hash(user_row["password_hash"], password):
+        hasher = current_app.extensions["password_hasher"]
+        try:
+            verified = bool(user_row) and hasher.verify(user_row["password_hash"], password)
+        except HasherBusy:
+            flash("Too many sign-in attempts in progress, please try again in a moment.", "warning")
+            return render_template("login.html"), 503
+        if verified and hasher.needs_rehash(user_row["password_hash"]):
+            # hash parameters changed since this password was stored
+            try:
+                update_password_hash(user_row["id"], hasher.hash(password))
+                user_row = get_user_by_username(username)
+            except HasherBusy:
+                pass  # the password is verified; rehash on a later login
+        if verified:
             user = User(id=user_row["id"], username=user_row["username"])
             login_user(user)
+            session["auth_token"] = session_token(current_app.secret_key, user_row)
             flash("Logged in successfully.", "success")
             next_url = request.args.get("next") or url_for("main.index")
             return redirect(next_url)
@@ -25,5 +39,6 @@ def login():
 @login_required
 def logout():
     logout_user()
+    session.pop("auth_token", None)
     flash("Logged out.", "success")
     return redirect(url_for("main.index"))
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from flask import g, has_app_context
+
+
+class ReferenceCache:
+    """
+    Two-level cache for small, rarely changing reference data (the sections
+    list, user rows).
+
+    Values are memoized per request in ``g`` and process-wide with a TTL.
+    Code that writes reference data calls ``invalidate()`` so this process
+    sees the change immediately; the TTL bounds how long other worker
+    processes can serve a stale copy.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._values = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def get(self, key, loader):
+        memo = None
+        if has_app_context():
+            memo = g.setdefault("_reference_cache", {})
+            if key in memo:
+                return memo[key]
+        now = time.monotonic()
+        with self._lock:
+            hit = self._values.get(key)
+        if hit is not None and hit[0] > now:
+            value = hit[1]
+        else:
+            value = loader()
+            self.loads += 1
+            with self._lock:
+                self._values[key] = (now + self.ttl, value)
+        if memo is not None:
+            memo[key] = value
+        return value
+
+    def invalidate(self, *keys):
+        """Drop ``keys`` (or everything when called without arguments)."""
+        with self._lock:
+            if keys:
+                for key in keys:
+                    self._values.pop(key, None)
+            else:
+                self._values.clear()
+        if has_app_context():
+            memo = g.get("_reference_cache")
+            if memo is not None:
+                if keys:
+                    for key in keys:
+                        memo.pop(key, None)
+                else:
+                    memo.clear()
+
+
+reference_cache = ReferenceCache()
@@ -1,11 +1,24 @@
 import os
 import sqlite3
 import json
+import threading
+from collections import OrderedDict
 from flask import current_app, g
 from werkzeug.security import generate_password_hash
 import secrets
+from .security import configured_method
+from .cache import reference_cache
+from .fields import upgrade_field_indexes
 
 def get_db():
+    """
+    Read-write connection for the current app context. Apps built by
+    create_app() check it out of the pool (backend.pool); other app
+    contexts (scripts) get a plain connection closed by close_db().
+    """
+    manager = current_app.extensions.get("vault_db")
+    if manager is not None:
+        return manager.get_db()
     if "db" not in g:
         g.db = sqlite3.connect(
             current_app.config["DATABASE"], detect_types=sqlite3.PARSE_DECLTYPES
@@ -13,13 +26,52 @@ def get_db():
         g.db.row_factory = sqlite3.Row
     return g.db
 
+def get_read_db():
+    """Read-only pooled connection when available, else get_db()."""
+    manager = current_app.extensions.get("vault_db")
+    if manager is not None:
+        return manager.get_read_db()
+    return get_db()
+
 def close_db(e=None):
     db = g.pop("db", None)
     if db is not None:
         db.close()
 
+# Single-row change counter bumped on every write to sections or entries;
+# page ETags are derived from it instead of hashing the rendered output.
+DATA_VERSION_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS data_version (id INTEGER PRIMARY KEY CHECK (id = 1), n INTEGER NOT NULL);
+    INSERT OR IGNORE INTO data_version (id, n) VALUES (1, 0);
+""" + "".join(
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {table}_version_{suffix} AFTER {event} ON {table} BEGIN
+      UPDATE data_version SET n = n + 1;
+    END;
+"""
+    for table in ("sections", "entries")
+    for suffix, event in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE"))
+)
+
+def upgrade_schema(db):
+    """Bring databases created by older versions up to date (cheap when current)."""
+    cols = {r[1] for r in db.execute("PRAGMA table_info(entries)")}
+    if cols and "version" not in cols:
+        db.execute("ALTER TABLE entries ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    if cols:
+        db.execute("CREATE INDEX IF NOT EXISTS entries_section_id ON entries(section_id, id)")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS section_fields (section_id INTEGER NOT NULL, name TEXT NOT NULL, "
+            "PRIMARY KEY (section_id, name), FOREIGN KEY(section_id) REFERENCES sections(id) ON DELETE CASCADE)"
+        )
+        db.commit()
+        if not db.execute("SELECT 1 FROM sqlite_master WHERE name = 'data_version'").fetchone():
+            db.executescript(DATA_VERSION_SCHEMA)
+        upgrade_field_indexes(db)
+
 def init_db():
     db = get_db()
+    upgrade_schema(db)
     db.executescript(
         """
     PRAGMA foreign_keys = ON;
@@ -41,12 +93,24 @@ def init_db():
       id INTEGER PRIMARY KEY AUTOINCREMENT,
       section_id INTEGER,
       payload TEXT,
+      version INTEGER NOT NULL DEFAULT 1,
       created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
       FOREIGN KEY(section_id) REFERENCES sections(id) ON DELETE CASCADE
     );
+
+    CREATE INDEX IF NOT EXISTS entries_section_id ON entries(section_id, id);
+
+    CREATE TABLE IF NOT EXISTS section_fields (
+      section_id INTEGER NOT NULL,
+      name TEXT NOT NULL,
+      PRIMARY KEY (section_id, name),
+      FOREIGN KEY(section_id) REFERENCES sections(id) ON DELETE CASCADE
+    );
     """
+        + DATA_VERSION_SCHEMA
     )
     db.commit()
+    reference_cache.invalidate()
 
 def init_app_db():
     root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -58,6 +122,7 @@ def init_app_db():
     temp.config["DATABASE"] = os.path.join(instance, "vault.db")
     with temp.app_context():
         init_db()
+        close_db()
 
 def create_user_if_none():
     root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -88,12 +153,24 @@ def create_user_if_none():
       id INTEGER PRIMARY KEY AUTOINCREMENT,
       section_id INTEGER,
       payload TEXT,
+      version INTEGER NOT NULL DEFAULT 1,
       created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
       FOREIGN KEY(section_id) REFERENCES sections(id) ON DELETE CASCADE
     );
+
+    CREATE INDEX IF NOT EXISTS entries_section_id ON entries(section_id, id);
+
+    CREATE TABLE IF NOT EXISTS section_fields (
+      section_id INTEGER NOT NULL,
+      name TEXT NOT NULL,
+      PRIMARY KEY (section_id, name),
+      FOREIGN KEY(section_id) REFERENCES sections(id) ON DELETE CASCADE
+    );
     """
+        + DATA_VERSION_SCHEMA
     )
     conn.commit()
+    upgrade_schema(conn)
     cur.execute("SELECT COUNT(*) as c FROM users")
     row = cur.fetchone()
     c = row["c"] if row else 0
@@ -102,38 +179,111 @@ def create_user_if_none():
         return False, None, None
     username = "admin"
     password = secrets.token_urlsafe(10)
-    phash = generate_password_hash(password)
+    phash = generate_password_hash(password, configured_method())
     cur.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)", (username, phash))
     conn.commit()
     conn.close()
+    reference_cache.invalidate()
     return True, username, password
 
+def data_version():
+    """Change counter for sections and entries, for conditional GETs."""
+    return get_read_db().execute("SELECT n FROM data_version").fetchone()[0]
+
 def get_user_by_username(username):
-    db = get_db()
+    db = get_read_db()
     return db.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
 
 def get_user_by_id(user_id):
-    db = get_db()
+    db = get_read_db()
     return db.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
 
+def get_cached_user(user_id):
+    """get_user_by_id through the reference cache (as a plain dict)."""
+    def load():
+        row = get_user_by_id(user_id)
+        return dict(row) if row else None
+    return reference_cache.get(("user", str(user_id)), load)
+
+def get_sections_nav():
+    """[{slug, title}] for the navigation, cached until sections change."""
+    def load():
+        secs = get_read_db().execute("SELECT slug, title FROM sections ORDER BY id").fetchall()
+        return tuple({"slug": s["slug"], "title": s["title"]} for s in secs)
+    return reference_cache.get("sections_nav", load)
+
+def update_password_hash(user_id, password_hash):
+    db = get_db()
+    db.execute("UPDATE users SET password_hash = ? WHERE id = ?", (password_hash, user_id))
+    db.commit()
+    reference_cache.invalidate(("user", str(user_id)))
+
+# Decoded entry payloads keyed by (entry id, version). Rows whose version
+# hasn't changed are served from here instead of being json.loads'ed again.
+PAYLOAD_CACHE_SIZE = 10000
+_payload_cache = OrderedDict()
+_payload_lock = threading.Lock()
+
+def decode_payload(entry_id, version, payload):
+    key = (entry_id, version)
+    with _payload_lock:
+        cached = _payload_cache.get(key)
+        if cached is not None:
+            _payload_cache.move_to_end(key)
+            return cached
+    try:
+        value = json.loads(payload)
+        if not isinstance(value, dict):
+            value = {"_raw": payload}
+    except Exception:
+        value = {"_raw": payload}
+    with _payload_lock:
+        _payload_cache[key] = value
+        while len(_payload_cache) > PAYLOAD_CACHE_SIZE:
+            _payload_cache.popitem(last=False)
+    return value
+
+def load_sections_with_entries():
+    """
+    All sections with their entries, in one query.
+
+    Returns a list of {"id", "slug", "title", "rows"} dicts where each row is
+    the entry's decoded payload plus its "id". Uses the
+    entries(section_id, id) index for the join and ordering.
+    """
+    db = get_read_db()
+    cur = db.execute(
+        """
+        SELECT s.id AS section_id, s.slug, s.title, e.id AS entry_id, e.version, e.payload
+        FROM sections s
+        LEFT JOIN entries e ON e.section_id = s.id
+        ORDER BY s.id, e.id
+        """
+    )
+    sections = []
+    current = None
+    for r in cur:
+        if current is None or current["id"] != r["section_id"]:
+            current = {"id": r["section_id"], "slug": r["slug"], "title": r["title"], "rows": []}
+            sections.append(current)
+        if r["entry_id"] is not None:
+            payload = decode_payload(r["entry_id"], r["version"], r["payload"])
+            current["rows"].append({"id": r["entry_id"], **payload})
+    return sections
+
 def create_section_if_missing(slug, title):
     db = get_db()
-    db.execute("INSERT OR IGNORE INTO sections (slug, title) VALUES (?, ?)", (slug, title))
+    cur = db.execute("INSERT OR IGNORE INTO sections (slug, title) VALUES (?, ?)", (slug, title))
     db.commit()
+    if cur.rowcount:
+        reference_cache.invalidate("sections_nav")
 
-def seed_from_jsonpath(path):
+def seed_from_jsonpath(path, **kwargs):
+    """
+    Stream a seed JSON file into the database (see backend.seed.import_seed).
+    Returns the import stats, or None if the file does not exist.
+    """
     if not os.path.exists(path):
-        return
-    with open(path, "r", encoding="utf-8") as fh:
-        data = json.load(fh)
-    db = get_db()
-    for sec in data.get("sections", []):
-        db.execute("INSERT OR IGNORE INTO sections (slug, title) VALUES (?, ?)", (sec.get("slug"), sec.get("title")))
-        db.commit()
-        section_row = db.execute("SELECT id FROM sections WHERE slug = ?", (sec.get("slug"),)).fetchone()
-        if not section_row:
-            continue
-        section_id = section_row["id"]
-        for row in sec.get("rows", []):
-            db.execute("INSERT INTO entries (section_id, payload) VALUES (?, ?)", (section_id, json.dumps(row, ensure_ascii=False)))
-        db.commit()
+        return None
+    from .seed import import_seed_path
+    return import_seed_path(get_db(), path, **kwargs)
@@ -0,0 +1,136 @@
+import hashlib
+import re
+
+# Field names end up inside a JSON path and an SQL string literal, so keep
+# them to characters that need no escaping in either.
+FIELD_NAME_RE = re.compile(r"^[^\"'\\$.\[\]\x00-\x1f]{1,64}$")
+
+MAX_LIMIT = 500
+
+
+class FieldError(ValueError):
+    pass
+
+
+def check_field_name(name):
+    if not isinstance(name, str) or not FIELD_NAME_RE.match(name):
+        raise FieldError(f"invalid field name: {name!r}")
+    return name
+
+
+def field_expr(name):
+    """
+    SQL expression extracting ``name`` from an entry's payload.
+
+    Payloads that are not JSON (shown as ``_raw``) have no fields, so they
+    yield NULL instead of failing the whole query or index build.
+
+    Queries must use exactly this text for SQLite to match it against the
+    expression index created by declare_field().
+    """
+    return f"CASE WHEN json_valid(payload) THEN json_extract(payload, '$.\"{check_field_name(name)}\"') END"
+
+
+def index_name(name):
+    return "entries_field_" + hashlib.sha1(name.encode("utf-8")).hexdigest()[:16]
+
+
+def analyze(db):
+    """
+    Refresh planner statistics for entries. Without them SQLite prefers
+    entries_section_id (it also yields id order) over a far more selective
+    field index.
+    """
+    with db:
+        db.execute("ANALYZE entries")
+
+
+def declared_fields(db, section_id):
+    rows = db.execute("SELECT name FROM section_fields WHERE section_id = ? ORDER BY name", (section_id,))
+    return [r[0] for r in rows]
+
+
+def declare_field(db, section_id, name):
+    """
+    Mark ``name`` as an indexed field of the section and make sure its
+    expression index exists. The index is shared by every section that
+    declares the same field name (section_id is its second column).
+    Returns True if the field was newly declared.
+    """
+    expr = field_expr(name)
+    with db:
+        cur = db.execute("INSERT OR IGNORE INTO section_fields (section_id, name) VALUES (?, ?)", (section_id, name))
+        if not cur.rowcount:
+            return False
+        db.execute(f"CREATE INDEX IF NOT EXISTS {index_name(name)} ON entries({expr}, section_id)")
+    analyze(db)
+    return True
+
+
+def upgrade_field_indexes(db):
+    """Rebuild field indexes created before field_expr() skipped non-JSON payloads."""
+    names = [r[0] for r in db.execute("SELECT DISTINCT name FROM section_fields")]
+    rebuilt = False
+    with db:
+        for name in names:
+            row = db.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?", (index_name(name),)).fetchone()
+            if row is not None and "json_valid" in row[0]:
+                continue
+            db.execute(f"DROP INDEX IF EXISTS {index_name(name)}")
+            db.execute(f"CREATE INDEX {index_name(name)} ON entries({field_expr(name)}, section_id)")
+            rebuilt = True
+    if rebuilt:
+        analyze(db)
+
+
+def drop_field(db, section_id, name):
+    """Undeclare a field; its index is dropped once no section uses it."""
+    with db:
+        cur = db.execute("DELETE FROM section_fields WHERE section_id = ? AND name = ?", (section_id, name))
+        if not db.execute("SELECT 1 FROM section_fields WHERE name = ?", (name,)).fetchone():
+            db.execute(f"DROP INDEX IF EXISTS {index_name(name)}")
+    return cur.rowcount > 0
+
+
+def _candidates(value):
+    # form-entered payloads store strings, seeded ones may store numbers
+    values = [value]
+    try:
+        number = int(value)
+    except ValueError:
+        try:
+            number = float(value)
+        except ValueError:
+            return values
+    values.append(number)
+    return values
+
+
+def filter_entries(db, section_id=None, equals=None, prefixes=None, after=None, limit=100):
+    """
+    Entries matching every predicate, as (id, section_id, version, payload)
+    rows ordered by id. ``equals`` and ``prefixes`` map field names to
+    values; each becomes a comparison on field_expr() so declared fields
+    are answered from their index and nothing is decoded in Python.
+    """
+    clauses, params = [], []
+    if section_id is not None:
+        clauses.append("section_id = ?")
+        params.append(section_id)
+    for name, value in (equals or {}).items():
+        candidates = _candidates(value)
+        clauses.append(f"{field_expr(name)} IN ({', '.join('?' * len(candidates))})")
+        params.extend(candidates)
+    for name, value in (prefixes or {}).items():
+        # a range instead of LIKE so the expression index can be used
+        clauses.append(f"{field_expr(name)} >= ? AND {field_expr(name)} < ?")
+        params.extend([value, value + "\U0010ffff"])
+    if after is not None:
+        clauses.append("id > ?")
+        params.append(after)
+    where = " AND ".join(clauses) or "1"
+    params.append(max(1, min(limit, MAX_LIMIT)))
+    return db.execute(
+        f"SELECT id, section_id, version, payload FROM entries WHERE {where} ORDER BY id LIMIT ?",
+        params,
+    ).fetchall()
@@ -0,0 +1,160 @@
+import queue
+import sqlite3
+import threading
+
+from flask import g
+
+# Applied to every pooled connection; journal_mode is only set by writers
+# (it is persistent in the database file).
+PRAGMAS = (
+    ("foreign_keys", "ON"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -16000),  # ~16 MiB page cache
+    ("mmap_size", 256 * 1024 * 1024),
+    ("temp_store", "MEMORY"),
+)
+
+
+class PoolExhausted(Exception):
+    """Raised when no connection frees up within the pool timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections to one database file.
+
+    Idle connections are reused most-recently-used first; at most ``size``
+    exist at once and acquire() waits up to ``timeout`` seconds for one to
+    be released. A connection is only ever used by one thread at a time.
+    """
+
+    def __init__(self, path, size=4, timeout=5.0, busy_timeout=5000, readonly=False):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.busy_timeout = busy_timeout
+        self.readonly = readonly
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "reused": 0, "waits": 0, "timeouts": 0, "discarded": 0, "in_use": 0}
+
+    def _connect(self):
+        if self.readonly:
+            conn = sqlite3.connect(
+                f"file:{self.path}?mode=ro", uri=True,
+                detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False,
+            )
+        else:
+            conn = sqlite3.connect(self.path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        for name, value in PRAGMAS:
+            conn.execute(f"PRAGMA {name} = {value}")
+        if self.readonly:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def acquire(self):
+        if not self._slots.acquire(blocking=False):
+            self._count("waits")
+            if not self._slots.acquire(timeout=self.timeout):
+                self._count("timeouts")
+                raise PoolExhausted(f"no database connection available after {self.timeout}s")
+        try:
+            conn = self._idle.get_nowait()
+            self._count("reused")
+        except queue.Empty:
+            try:
+                conn = self._connect()
+            except Exception:
+                self._slots.release()
+                raise
+            self._count("created")
+        self._count("in_use")
+        return conn
+
+    def release(self, conn, discard=False):
+        """Return ``conn`` to the pool; ``discard`` closes it instead."""
+        try:
+            if not discard and conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            discard = True
+        if discard:
+            conn.close()
+            self._count("discarded")
+        else:
+            self._idle.put(conn)
+        self._count("in_use", -1)
+        self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["size"] = self.size
+        stats["idle"] = self._idle.qsize()
+        return stats
+
+
+class Database:
+    """
+    Per-app connection manager: a small writer pool and a larger read-only
+    pool. Under WAL, readers never wait on the writer, and giving them their
+    own pool keeps page views from queueing behind slow writes for a
+    connection. Connections are checked out once per app context (``g``)
+    and returned by the teardown registered in init_app().
+    """
+
+    def __init__(self, app=None):
+        self.writer = None
+        self.reader = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        path = app.config["DATABASE"]
+        timeout = app.config["DB_POOL_TIMEOUT"]
+        busy_timeout = app.config["DB_BUSY_TIMEOUT"]
+        self.writer = ConnectionPool(path, app.config["DB_POOL_SIZE"], timeout, busy_timeout)
+        self.reader = ConnectionPool(path, app.config["DB_READ_POOL_SIZE"], timeout, busy_timeout, readonly=True)
+        app.extensions["vault_db"] = self
+        app.teardown_appcontext(self.teardown)
+
+    def get_db(self):
+        if "db" not in g:
+            g.db = self.writer.acquire()
+        return g.db
+
+    def get_read_db(self):
+        if "read_db" not in g:
+            g.read_db = self.reader.acquire()
+        return g.read_db
+
+    def teardown(self, exc=None):
+        # don't hand a connection in an unknown state to the next request
+        conn = g.pop("db", None)
+        if conn is not None:
+            self.writer.release(conn, discard=exc is not None)
+        conn = g.pop("read_db", None)
+        if conn is not None:
+            self.reader.release(conn, discard=exc is not None)
+
+    def close(self):
+        self.writer.close()
+        self.reader.close()
+
+    def stats(self):
+        return {"writer": self.writer.stats(), "reader": self.reader.stats()}
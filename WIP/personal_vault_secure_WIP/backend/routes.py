@@ -1,7 +1,10 @@
-from flask import Blueprint, render_template, current_app, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, current_app, request, redirect, url_for, flash, jsonify, session
 from flask_login import login_required, current_user
-from .db import get_db, create_section_if_missing, seed_from_jsonpath
+from .db import get_db, get_read_db, seed_from_jsonpath, load_sections_with_entries, decode_payload, get_sections_nav, data_version
+from .fields import MAX_LIMIT, FieldError, declare_field, declared_fields, drop_field, filter_entries
+import http_pipeline
 import json
+import os
 
 bp = Blueprint("main", __name__)
 
@@ -9,29 +12,25 @@ bp = Blueprint("main", __name__)
 def inject_nav():
     """
     Provide a callable sections_nav() to templates so they can call sections_nav()
-    (keeps backward compatibility with templates that do that).
+    (keeps backward compatibility with templates that do that). Results are
+    memoized per request and cached process-wide until sections change.
     """
-    def sections_nav():
-        db = get_db()
-        secs = db.execute("SELECT slug, title FROM sections ORDER BY id").fetchall()
-        return [{"slug": s["slug"], "title": s["title"]} for s in secs]
-    return dict(sections_nav=sections_nav)
+    return dict(sections_nav=get_sections_nav)
+
+def page_version():
+    """
+    ETag parts for pages built from sections/entries: the data version and
+    who is looking. Pages carrying flashed messages are one-off and skip it.
+    """
+    if "_flashes" in session:
+        return None
+    return (data_version(), current_user.get_id())
 
 @bp.route("/")
+@http_pipeline.uncompressed
+@http_pipeline.conditional(page_version, cache_control="private, no-cache")
 def index():
-    db = get_db()
-    sections = db.execute("SELECT id, slug, title FROM sections ORDER BY id").fetchall()
-    data = []
-    for s in sections:
-        rows = db.execute("SELECT id, payload FROM entries WHERE section_id = ? ORDER BY id", (s["id"],)).fetchall()
-        parsed = []
-        for r in rows:
-            try:
-                parsed.append({"id": r["id"], **json.loads(r["payload"])})
-            except Exception:
-                parsed.append({"id": r["id"], "_raw": r["payload"]})
-        data.append({"id": s["id"], "slug": s["slug"], "title": s["title"], "rows": parsed})
-    return render_template("index.html", sections=data)
+    return render_template("index.html", sections=load_sections_with_entries())
 
 @bp.route("/add/<slug>", methods=["GET", "POST"])
 @login_required
@@ -53,22 +52,23 @@ def add_entry(slug):
 
 @bp.route("/edit/<int:entry_id>", methods=["GET", "POST"])
 @login_required
+@http_pipeline.uncompressed
 def edit_entry(entry_id):
     db = get_db()
-    row = db.execute("SELECT id, section_id, payload FROM entries WHERE id = ?", (entry_id,)).fetchone()
+    row = db.execute("SELECT id, section_id, version, payload FROM entries WHERE id = ?", (entry_id,)).fetchone()
     if not row:
         flash("Entry not found", "warning")
         return redirect(url_for("main.index"))
-    try:
-        payload = json.loads(row["payload"])
-    except Exception:
-        payload = {"_raw": row["payload"]}
+    payload = decode_payload(row["id"], row["version"], row["payload"])
     section = db.execute("SELECT slug, title FROM sections WHERE id = ?", (row["section_id"],)).fetchone()
     if request.method == "POST":
         keys = request.form.getlist("key[]")
         values = request.form.getlist("value[]")
         payload_new = {k: v for k, v in zip(keys, values) if k}
-        db.execute("UPDATE entries SET payload = ? WHERE id = ?", (json.dumps(payload_new, ensure_ascii=False), entry_id))
+        db.execute(
+            "UPDATE entries SET payload = ?, version = version + 1 WHERE id = ?",
+            (json.dumps(payload_new, ensure_ascii=False), entry_id),
+        )
         db.commit()
         flash("Entry updated.", "success")
         return redirect(url_for("main.index") + "#" + section["slug"])
@@ -83,16 +83,93 @@ def delete_entry(entry_id):
     flash("Entry deleted.", "success")
     return redirect(url_for("main.index"))
 
+@bp.route("/admin/pool")
+@login_required
+def pool_stats():
+    return jsonify(current_app.extensions["vault_db"].stats())
+
 @bp.route("/admin/seed", methods=["POST"])
 @login_required
 def admin_seed():
     # convenience endpoint: seed from frontend/data/seed.json if present; keep protected
-    jsonpath = current_app.root_path + "/frontend/data/seed.json"
-    seed_from_jsonpath(jsonpath)
-    flash("Seed attempted from data/seed.json", "info")
+    jsonpath = os.path.join(os.path.dirname(current_app.root_path), "frontend", "data", "seed.json")
+    try:
+        stats = seed_from_jsonpath(jsonpath)
+    except ValueError as e:
+        flash(f"Seed failed: {e}", "warning")
+        return redirect(url_for("main.index"))
+    if stats is None:
+        flash("No seed file found at frontend/data/seed.json", "info")
+    else:
+        flash(
+            f"Seeded {stats['rows']} rows in {stats['sections']} sections "
+            f"({stats['seconds']}s, {stats['rows_per_second']:.0f} rows/s).",
+            "success",
+        )
     return redirect(url_for("main.index"))
-PY
 
-# quick verify
-grep -n "def inject_nav" backend/routes.py || true
-echo "Backup kept at backend/routes.py.bak"
\ No newline at end of file
+@bp.route("/api/entries")
+@login_required
+@http_pipeline.uncompressed
+@http_pipeline.conditional(page_version, cache_control="private, no-cache")
+def api_entries():
+    """
+    Filter entries inside SQL.
+
+    ?section=<slug>, ?field.<name>=<value> (exact), ?prefix.<name>=<value>,
+    ?limit=N and ?after=<id> (the "next" value of the previous page).
+    Predicates on a section's declared fields are index lookups.
+    """
+    db = get_read_db()
+    section_id = None
+    slug = request.args.get("section")
+    if slug:
+        sec = db.execute("SELECT id FROM sections WHERE slug = ?", (slug,)).fetchone()
+        if not sec:
+            return jsonify(error="section not found"), 404
+        section_id = sec["id"]
+    equals, prefixes = {}, {}
+    for key, value in request.args.items():
+        kind, _, name = key.partition(".")
+        if kind == "field" and name:
+            equals[name] = value
+        elif kind == "prefix" and name:
+            prefixes[name] = value
+    # clamp here too: a short page is how clients know there is no next one
+    limit = max(1, min(request.args.get("limit", 100, type=int), MAX_LIMIT))
+    try:
+        rows = filter_entries(
+            db, section_id, equals, prefixes,
+            after=request.args.get("after", type=int), limit=limit,
+        )
+    except FieldError as e:
+        return jsonify(error=str(e)), 400
+    entries = [{"id": r["id"], **decode_payload(r["id"], r["version"], r["payload"])} for r in rows]
+    next_after = rows[-1]["id"] if len(rows) == limit else None
+    return jsonify(entries=entries, next=next_after)
+
+@bp.route("/api/sections/<slug>/fields", methods=["GET", "POST"])
+@login_required
+def section_fields(slug):
+    """List a section's indexed fields, or declare a new one ({"name": ...})."""
+    db = get_db() if request.method == "POST" else get_read_db()
+    sec = db.execute("SELECT id FROM sections WHERE slug = ?", (slug,)).fetchone()
+    if not sec:
+        return jsonify(error="section not found"), 404
+    if request.method == "POST":
+        data = request.get_json(silent=True) or request.form
+        try:
+            declare_field(db, sec["id"], data.get("name"))
+        except FieldError as e:
+            return jsonify(error=str(e)), 400
+    return jsonify(section=slug, fields=declared_fields(db, sec["id"]))
+
+@bp.route("/api/sections/<slug>/fields/<name>", methods=["DELETE"])
+@login_required
+def delete_section_field(slug, name):
+    db = get_db()
+    sec = db.execute("SELECT id FROM sections WHERE slug = ?", (slug,)).fetchone()
+    if not sec:
+        return jsonify(error="section not found"), 404
+    drop_field(db, sec["id"], name)
+    return jsonify(section=slug, fields=declared_fields(db, sec["id"]))
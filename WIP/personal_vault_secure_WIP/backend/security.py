@@ -0,0 +1,106 @@
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from functools import lru_cache
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# werkzeug method string; raise the scrypt N (or pbkdf2 iterations) to make
+# hashing more expensive. Stored hashes using different parameters are
+# upgraded transparently on the next successful login.
+DEFAULT_HASH_METHOD = "scrypt:32768:8:1"
+
+
+def configured_method():
+    return os.environ.get("PV_HASH_METHOD", DEFAULT_HASH_METHOD)
+
+
+def method_params(method):
+    """
+    ``method`` (a werkzeug method string, or a stored hash's prefix) as a
+    tuple with werkzeug's defaults filled in, so "scrypt" and
+    "scrypt:32768:8:1" compare equal.
+    """
+    name, *args = method.split("$", 1)[0].split(":")
+    if name == "scrypt":
+        defaults = [2**15, 8, 1]
+    elif name == "pbkdf2":
+        defaults = ["sha256", DEFAULT_PBKDF2_ITERATIONS]
+    else:
+        defaults = []
+    args = [int(a) if a.isdigit() else a for a in args]
+    return (name, *args, *defaults[len(args):])
+
+
+class HasherBusy(Exception):
+    """Raised when too many hash operations are queued or one times out."""
+
+
+class PasswordHasher:
+    """
+    Runs password hashing on a small, bounded worker pool so a burst of
+    logins can use at most ``workers`` CPUs, and fails fast (HasherBusy)
+    once ``max_pending`` operations are queued instead of piling up request
+    threads behind them.
+    """
+
+    def __init__(self, method=DEFAULT_HASH_METHOD, workers=2, max_pending=16, timeout=10):
+        self.method = method
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy("too many password checks in progress")
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # the slot belongs to the job, not to the caller waiting on it, so
+        # abandoned jobs still count against max_pending until they finish
+        future.add_done_callback(lambda f: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise HasherBusy("password check timed out")
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return method_params(password_hash) != method_params(self.method)
+
+
+def init_hasher(app):
+    app.extensions["password_hasher"] = PasswordHasher(
+        method=app.config["PASSWORD_HASH_METHOD"],
+        workers=app.config["PASSWORD_HASH_WORKERS"],
+        max_pending=app.config["PASSWORD_HASH_MAX_PENDING"],
+    )
+    return app.extensions["password_hasher"]
+
+
+@lru_cache(maxsize=1024)
+def _session_token(secret, user_id, password_hash):
+    msg = f"{user_id}:{password_hash}".encode("utf-8")
+    return hmac.new(secret.encode("utf-8"), msg, hashlib.sha256).hexdigest()[:32]
+
+
+def session_token(secret, user_row):
+    """
+    Token stored in the session at login and checked on every request.
+
+    It is an HMAC over the user's current password hash, so sessions stop
+    validating as soon as the password (or its hash parameters) change,
+    but checking it costs a cached HMAC and never the password hash itself.
+    """
+    return _session_token(secret, str(user_row["id"]), user_row["password_hash"])
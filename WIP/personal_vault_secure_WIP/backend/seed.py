@@ -0,0 +1,189 @@
+import json
+import time
+
+from .cache import reference_cache
+from .fields import analyze, declare_field
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_BATCH_SIZE = 1000
+
+_WS = " \t\r\n"
+
+
+class SeedFormatError(ValueError):
+    pass
+
+
+class _Reader:
+    """
+    Minimal pull parser over a text file for the seed layout
+    {"sections": [{"slug": ..., "title": ..., "rows": [{...}, ...]}, ...]}.
+
+    Structure is walked by hand and each leaf value (every row, and any
+    other key's value) is decoded on its own with raw_decode, so memory is
+    bounded by the largest single row rather than the whole file.
+    """
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.fh.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch):
+        if self.peek() != ch:
+            raise SeedFormatError(f"expected {ch!r} in seed file, got {self.peek()!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                # probably cut off at the end of the buffer; read more and retry
+                if self._fill():
+                    continue
+                raise SeedFormatError(f"invalid JSON in seed file: {e}") from None
+            # a number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buf) and not self.eof and not isinstance(value, (dict, list, str)):
+                if self._fill():
+                    continue
+            self.pos = end
+            return value
+
+    def items(self):
+        """Iterate over ``key`` for each member of the object starting here."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            sep = self.peek()
+            self.pos += 1
+            if sep == "}":
+                return
+            if sep != ",":
+                raise SeedFormatError(f"expected ',' or '}}' in seed file, got {sep!r}")
+
+    def elements(self):
+        """Iterate once per element of the array starting here."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            sep = self.peek()
+            self.pos += 1
+            if sep == "]":
+                return
+            if sep != ",":
+                raise SeedFormatError(f"expected ',' or ']' in seed file, got {sep!r}")
+
+
+def iter_seed(fh):
+    """
+    Yield ("section", {"slug", "title"}) before the first row of each
+    section, then ("row", payload) for each of its rows. A section's
+    "slug" (and optional "indexed_fields") has to come before its "rows".
+    """
+    reader = _Reader(fh)
+    for key in reader.items():
+        if key != "sections":
+            reader.value()
+            continue
+        for _ in reader.elements():
+            section = {}
+            announced = False
+            for skey in reader.items():
+                if skey == "rows":
+                    if not announced:
+                        yield "section", section
+                        announced = True
+                    for _ in reader.elements():
+                        yield "row", reader.value()
+                else:
+                    section[skey] = reader.value()
+            if not announced:
+                yield "section", section
+
+
+def import_seed(db, fh, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Stream a seed file into the database.
+
+    Rows are inserted with executemany in batches of ``batch_size``, each
+    batch in its own transaction, so the write lock is released between
+    batches. ``progress`` (optional) is called with the running stats after
+    every batch. Returns the final stats dict.
+    """
+    started = time.monotonic()
+    stats = {"sections": 0, "rows": 0, "batches": 0, "seconds": 0.0, "rows_per_second": 0.0}
+    batch = []
+    section_id = None
+
+    def flush():
+        if batch:
+            with db:
+                db.executemany("INSERT INTO entries (section_id, payload) VALUES (?, ?)", batch)
+            stats["rows"] += len(batch)
+            stats["batches"] += 1
+            batch.clear()
+        elapsed = time.monotonic() - started
+        stats["seconds"] = round(elapsed, 3)
+        stats["rows_per_second"] = round(stats["rows"] / elapsed, 1) if elapsed else 0.0
+        if progress is not None:
+            progress(dict(stats))
+
+    for kind, value in iter_seed(fh):
+        if kind == "section":
+            slug = value.get("slug")
+            # the section row has to exist before its entries reference it
+            flush()
+            with db:
+                db.execute("INSERT OR IGNORE INTO sections (slug, title) VALUES (?, ?)", (slug, value.get("title")))
+            row = db.execute("SELECT id FROM sections WHERE slug = ?", (slug,)).fetchone()
+            section_id = row[0] if row else None
+            if section_id is not None:
+                for name in value.get("indexed_fields") or ():
+                    declare_field(db, section_id, name)
+            stats["sections"] += 1
+        elif section_id is not None:
+            batch.append((section_id, json.dumps(value, ensure_ascii=False)))
+            if len(batch) >= batch_size:
+                flush()
+    flush()
+    if stats["rows"]:
+        analyze(db)
+    reference_cache.invalidate("sections_nav")
+    return stats
+
+
+def import_seed_path(db, path, **kwargs):
+    with open(path, "r", encoding="utf-8") as fh:
+        return import_seed(db, fh, **kwargs)
@@ -0,0 +1,40 @@
+import argparse
+import os
+import sqlite3
+import sys
+from backend.db import init_app_db
+from backend.seed import DEFAULT_BATCH_SIZE, import_seed_path
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a seed JSON file into instance/vault.db")
+    parser.add_argument("path", nargs="?", default=os.path.join(ROOT, "frontend", "data", "seed.json"))
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"Seed file not found: {args.path}")
+        return 1
+    init_app_db()  # creates/upgrades the schema; safe to run repeatedly
+
+    def progress(stats):
+        print(f"\r {stats['rows']} rows, {stats['sections']} sections, {stats['rows_per_second']:.0f} rows/s", end="", flush=True)
+
+    conn = sqlite3.connect(os.path.join(ROOT, "instance", "vault.db"))
+    conn.execute("PRAGMA foreign_keys = ON")
+    try:
+        stats = import_seed_path(conn, args.path, batch_size=args.batch_size, progress=progress)
+    except ValueError as e:
+        # SeedFormatError, FieldError (a bad indexed_fields name) or a file
+        # that is not UTF-8; batches committed so far stay imported
+        print(f"\nSeed failed: {e}")
+        return 1
+    finally:
+        conn.close()
+    print(f"\nImported {stats['rows']} rows in {stats['sections']} sections "
+          f"in {stats['seconds']}s ({stats['rows_per_second']:.0f} rows/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
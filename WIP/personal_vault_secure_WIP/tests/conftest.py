@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend import create_app, db as vault_db  # noqa: E402
+from backend.cache import reference_cache  # noqa: E402
+
+PASSWORD = "correct horse"
+# cheap hashes keep the suite fast; tests needing real parameters set their own
+TEST_HASH_METHOD = "pbkdf2:sha256:1000"
+
+
+@pytest.fixture
+def app(tmp_path):
+    # process-wide caches are keyed by row ids, which every scratch database reuses
+    vault_db._payload_cache.clear()
+    reference_cache.invalidate()
+    app = create_app({
+        "TESTING": True,
+        "DATABASE": str(tmp_path / "vault.db"),
+        "PASSWORD_HASH_METHOD": TEST_HASH_METHOD,
+    })
+    with app.app_context():
+        vault_db.init_db()
+        db = vault_db.get_db()
+        db.execute(
+            "INSERT INTO users (username, password_hash) VALUES (?, ?)",
+            ("admin", generate_password_hash(PASSWORD, TEST_HASH_METHOD)),
+        )
+        db.commit()
+    yield app
+    app.extensions["vault_db"].close()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    resp = client.post("/auth/login", data={"username": "admin", "password": PASSWORD})
+    assert resp.status_code == 302
+    return client
+
+
+def add_section(app, slug, rows):
+    """Insert a section with ``rows`` (dicts, or raw strings stored as-is)."""
+    with app.app_context():
+        db = vault_db.get_db()
+        section_id = db.execute("INSERT INTO sections (slug, title) VALUES (?, ?)", (slug, slug.title())).lastrowid
+        db.executemany(
+            "INSERT INTO entries (section_id, payload) VALUES (?, ?)",
+            [(section_id, r if isinstance(r, str) else vault_db.json.dumps(r)) for r in rows],
+        )
+        db.commit()
+        return section_id
@@ -0,0 +1,81 @@
+import sqlite3
+
+import pytest
+
+from backend import db as vault_db
+from backend.cache import reference_cache
+from conftest import add_section
+
+
+def per_section_load():
+    """What the joined loader replaced: one query for the sections, then one per section."""
+    db = vault_db.get_read_db()
+    sections = []
+    for s in db.execute("SELECT id, slug, title FROM sections ORDER BY id"):
+        rows = db.execute("SELECT id, version, payload FROM entries WHERE section_id = ? ORDER BY id", (s["id"],))
+        sections.append({
+            "id": s["id"], "slug": s["slug"], "title": s["title"],
+            "rows": [{"id": r["id"], **vault_db.decode_payload(r["id"], r["version"], r["payload"])} for r in rows],
+        })
+    return sections
+
+
+def test_joined_loader_matches_per_section_queries(app, client):
+    add_section(app, "bank", [{"account": "1"}, {"account": "2"}])
+    add_section(app, "empty", [])
+    add_section(app, "notes", ["not json", '["a list"]', {"text": "hi"}])
+    with app.app_context():
+        sections = vault_db.load_sections_with_entries()
+        assert sections == per_section_load()
+    assert [s["slug"] for s in sections] == ["bank", "empty", "notes"]
+    assert sections[1]["rows"] == []
+    assert sections[2]["rows"][0]["_raw"] == "not json"
+    html = client.get("/").get_data(as_text=True)
+    assert "Empty" in html and "not json" in html
+
+
+def test_sections_nav_is_reloaded_after_a_section_write(app):
+    add_section(app, "bank", [])
+    with app.app_context():
+        assert [s["slug"] for s in vault_db.get_sections_nav()] == ["bank"]
+    loads = reference_cache.loads
+    with app.app_context():
+        # a new request is served from the process-wide copy
+        assert [s["slug"] for s in vault_db.get_sections_nav()] == ["bank"]
+        assert reference_cache.loads == loads
+        vault_db.create_section_if_missing("cards", "Cards")
+        # the writer's own request sees the change at once
+        assert [s["slug"] for s in vault_db.get_sections_nav()] == ["bank", "cards"]
+    with app.app_context():
+        assert [s["slug"] for s in vault_db.get_sections_nav()] == ["bank", "cards"]
+        # an existing section is not a change and keeps the cached copy
+        loads = reference_cache.loads
+        vault_db.create_section_if_missing("cards", "Cards")
+        vault_db.get_sections_nav()
+        assert reference_cache.loads == loads
+
+
+def test_cached_user_is_reloaded_after_a_password_change(app):
+    with app.app_context():
+        user = vault_db.get_user_by_username("admin")
+        assert vault_db.get_cached_user(user["id"])["password_hash"] == user["password_hash"]
+        vault_db.update_password_hash(user["id"], "pbkdf2:sha256:1000$salt$new")
+    with app.app_context():
+        assert vault_db.get_cached_user(user["id"])["password_hash"] == "pbkdf2:sha256:1000$salt$new"
+
+
+@pytest.mark.parametrize("sql", [
+    "INSERT INTO sections (slug, title) VALUES ('x', 'X')",
+    "UPDATE users SET username = 'root'",
+    "CREATE TABLE scratch (id INTEGER)",
+])
+def test_read_pool_rejects_writes(app, sql):
+    with app.app_context():
+        read_db = vault_db.get_read_db()
+        assert read_db is not vault_db.get_db()
+        with pytest.raises(sqlite3.OperationalError):
+            read_db.execute(sql)
+    # the failed write left the connection usable for the next request
+    with app.app_context():
+        assert vault_db.get_read_db().execute("SELECT COUNT(*) FROM sections").fetchone()[0] == 0
+        assert vault_db.get_db().execute("SELECT COUNT(*) FROM users").fetchone()[0] == 1
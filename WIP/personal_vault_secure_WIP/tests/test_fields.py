@@ -0,0 +1,72 @@
+from backend import db as vault_db
+from backend.fields import MAX_LIMIT, declare_field, field_expr, filter_entries, index_name
+
+from conftest import add_section
+
+LEGACY = "not json, kept as _raw"
+
+
+def test_filter_skips_non_json_payloads(app):
+    section_id = add_section(app, "bank", [{"name": "alpha"}, LEGACY, {"name": "beta"}])
+    with app.app_context():
+        db = vault_db.get_db()
+        rows = filter_entries(db, section_id, equals={"name": "beta"})
+        assert [vault_db.json.loads(r["payload"])["name"] for r in rows] == ["beta"]
+        assert len(filter_entries(db, section_id, prefixes={"name": "al"})) == 1
+        # unfiltered listings still include the legacy row
+        assert LEGACY in [r["payload"] for r in filter_entries(db, section_id)]
+
+
+def test_declared_field_with_legacy_rows(app):
+    section_id = add_section(app, "bank", [{"name": f"name{i}"} for i in range(200)] + [{"name": "alpha"}, LEGACY])
+    with app.app_context():
+        db = vault_db.get_db()
+        assert declare_field(db, section_id, "name")
+        # the index tolerates non-JSON payloads written after it exists
+        db.execute("INSERT INTO entries (section_id, payload) VALUES (?, ?)", (section_id, "also not json"))
+        db.commit()
+        plan = " ".join(
+            r[3] for r in db.execute(
+                f"EXPLAIN QUERY PLAN SELECT id FROM entries WHERE {field_expr('name')} = ? AND section_id = ?",
+                ("alpha", section_id),
+            )
+        )
+        assert index_name("name") in plan
+        assert len(filter_entries(db, section_id, equals={"name": "alpha"})) == 1
+
+
+def test_old_field_indexes_are_rebuilt(app):
+    section_id = add_section(app, "bank", [{"name": "alpha"}])
+    with app.app_context():
+        db = vault_db.get_db()
+        db.execute("INSERT INTO section_fields (section_id, name) VALUES (?, 'name')", (section_id,))
+        db.execute(f"""CREATE INDEX {index_name("name")} ON entries(json_extract(payload, '$."name"'), section_id)""")
+        db.commit()
+        vault_db.upgrade_schema(db)
+        sql = db.execute("SELECT sql FROM sqlite_master WHERE name = ?", (index_name("name"),)).fetchone()[0]
+        assert "json_valid" in sql
+        db.execute("INSERT INTO entries (section_id, payload) VALUES (?, ?)", (section_id, LEGACY))
+        db.commit()
+
+
+def test_api_entries_with_legacy_row(app, client):
+    add_section(app, "bank", [{"name": "alpha"}, LEGACY])
+    resp = client.get("/api/entries?section=bank&field.name=alpha")
+    assert resp.status_code == 200
+    assert [e["name"] for e in resp.get_json()["entries"]] == ["alpha"]
+    resp = client.get("/api/entries?section=bank")
+    assert {"_raw": LEGACY} in [{k: v for k, v in e.items() if k != "id"} for e in resp.get_json()["entries"]]
+
+
+def test_api_entries_cursor_with_limit_above_max(app, client):
+    total = MAX_LIMIT + 20
+    add_section(app, "bank", [{"n": i} for i in range(total)])
+    seen = []
+    url = "/api/entries?section=bank&limit=1000"
+    while True:
+        data = client.get(url).get_json()
+        seen.extend(e["n"] for e in data["entries"])
+        if data["next"] is None:
+            break
+        url = f"/api/entries?section=bank&limit=1000&after={data['next']}"
+    assert seen == list(range(total))
@@ -0,0 +1,15 @@
+from conftest import add_section
+
+
+def test_vault_contents_are_not_compressed(app, client):
+    add_section(app, "bank", [{"account": f"{i:012d}", "notes": "x" * 40} for i in range(100)])
+    for url in ("/", "/api/entries?section=bank"):
+        resp = client.get(url, headers={"Accept-Encoding": "gzip"})
+        assert resp.status_code == 200
+        assert len(resp.data) > app.config["COMPRESS_MIN_SIZE"]
+        assert "Content-Encoding" not in resp.headers
+
+
+def test_static_files_are_still_compressed(app, client):
+    resp = client.get("/static/css/style.css", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers.get("Content-Encoding") == "gzip"
@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+from backend import db as vault_db
+from backend import security
+from backend.security import HasherBusy, PasswordHasher
+
+
+def slow_hasher(release, **kwargs):
+    """A hasher whose jobs block until ``release`` is set."""
+    return PasswordHasher(workers=1, max_pending=1, **kwargs), lambda *args: release.wait(5)
+
+
+def test_timeout_is_busy_and_keeps_the_slot():
+    release = threading.Event()
+    hasher, job = slow_hasher(release, timeout=0.05)
+    with pytest.raises(HasherBusy):
+        hasher._run(job)
+    # the abandoned job still runs, so it still holds the only slot
+    with pytest.raises(HasherBusy):
+        hasher._run(job)
+    release.set()
+    hasher._pool.submit(lambda: None).result(timeout=5)
+    assert hasher._run(lambda: "done") == "done"
+
+
+def test_login_timeout_returns_503(app, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(security, "check_password_hash", lambda *args: release.wait(5))
+    app.extensions["password_hasher"].timeout = 0.05
+    try:
+        resp = app.test_client().post("/auth/login", data={"username": "admin", "password": "x"})
+        assert resp.status_code == 503
+    finally:
+        release.set()
+
+
+@pytest.mark.parametrize("configured, stored", [
+    ("scrypt", "scrypt:32768:8:1"),
+    ("scrypt:32768:8:1", "scrypt:32768:8:1"),
+    ("pbkdf2:sha256", f"pbkdf2:sha256:{security.DEFAULT_PBKDF2_ITERATIONS}"),
+    ("pbkdf2", f"pbkdf2:sha256:{security.DEFAULT_PBKDF2_ITERATIONS}"),
+])
+def test_defaulted_methods_do_not_rehash(configured, stored):
+    assert not PasswordHasher(method=configured).needs_rehash(stored + "$salt$hash")
+
+
+@pytest.mark.parametrize("configured, stored", [
+    ("scrypt:65536:8:1", "scrypt:32768:8:1"),
+    ("scrypt", "pbkdf2:sha256:600000"),
+    ("pbkdf2:sha256", "pbkdf2:sha256:600000"),
+])
+def test_changed_parameters_rehash(configured, stored):
+    assert PasswordHasher(method=configured).needs_rehash(stored + "$salt$hash")
+
+
+def test_login_keeps_hash_for_parameterless_method(app, monkeypatch):
+    hasher = app.extensions["password_hasher"]
+    monkeypatch.setattr(hasher, "method", "scrypt")
+    with app.app_context():
+        db = vault_db.get_db()
+        db.execute("UPDATE users SET password_hash = ?", (security.generate_password_hash("pw", "scrypt"),))
+        db.commit()
+        before = db.execute("SELECT password_hash FROM users").fetchone()[0]
+    client = app.test_client()
+    assert client.post("/auth/login", data={"username": "admin", "password": "pw"}).status_code == 302
+    with app.app_context():
+        assert vault_db.get_db().execute("SELECT password_hash FROM users").fetchone()[0] == before
+    # the session stays valid because the hash was not rewritten
+    assert client.get("/api/entries").status_code == 200
+
+
+def test_busy_rehash_still_logs_in(app, monkeypatch):
+    hasher = app.extensions["password_hasher"]
+    monkeypatch.setattr(hasher, "method", "pbkdf2:sha256:2000")
+
+    def busy(password):
+        raise HasherBusy("too many password checks in progress")
+
+    monkeypatch.setattr(hasher, "hash", busy)
+    with app.app_context():
+        before = vault_db.get_db().execute("SELECT password_hash FROM users").fetchone()[0]
+    client = app.test_client()
+    resp = client.post("/auth/login", data={"username": "admin", "password": "correct horse"})
+    assert resp.status_code == 302
+    # the old hash is kept for a later login to upgrade, and the session matches it
+    with app.app_context():
+        assert vault_db.get_db().execute("SELECT password_hash FROM users").fetchone()[0] == before
+    assert client.get("/api/entries").status_code == 200
@@ -0,0 +1,61 @@
+"""
+Compare two benchmark result files from bench/run.py.
+
+    python bench/compare.py baseline.json candidate.json [--threshold 10]
+
+Prints throughput and p50/p95/p99 changes per (app, rows, mode, scenario).
+Exits with status 1 if any p95 latency regressed by more than the
+threshold (percent), so it can gate CI.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as fh:
+        report = json.load(fh)
+    return {(r['app'], r['rows'], r['mode'], r['scenario']): r for r in report['results']}
+
+
+def change(old, new):
+    if not old or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def fmt(pct):
+    return '     n/a' if pct is None else f'{pct:+7.1f}%'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0, help='allowed p95 regression in percent')
+    args = parser.parse_args()
+
+    old, new = load(args.baseline), load(args.candidate)
+    regressions = []
+    print(f"{'app':<18} {'rows':>8} {'mode':<6} {'scenario':<24} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for key in sorted(old.keys() & new.keys()):
+        a, b = old[key], new[key]
+        p95 = change(a['latency_ms']['p95'], b['latency_ms']['p95'])
+        print(f'{key[0]:<18} {key[1]:>8} {key[2]:<6} {key[3]:<24} '
+              f"{fmt(change(a['throughput_rps'], b['throughput_rps']))} "
+              f"{fmt(change(a['latency_ms']['p50'], b['latency_ms']['p50']))} "
+              f"{fmt(p95)} {fmt(change(a['latency_ms']['p99'], b['latency_ms']['p99']))}")
+        if p95 is not None and p95 > args.threshold:
+            regressions.append(key)
+    for key in sorted(old.keys() - new.keys()):
+        print('only in baseline:', *key)
+    for key in sorted(new.keys() - old.keys()):
+        print('only in candidate:', *key)
+    if regressions:
+        print(f'{len(regressions)} scenario(s) regressed p95 by more than {args.threshold}%', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
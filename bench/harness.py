@@ -0,0 +1,229 @@
+"""Request drivers, timing loop and latency statistics for the benchmarks."""
+import http.client
+import itertools
+import logging
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from werkzeug.serving import make_server
+
+
+class TestClientDriver:
+    """Calls the app in-process through Flask's test client."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        resp = self.client.open(path, method=method, data=body, headers=headers or {})
+        resp.get_data()
+        status = resp.status_code
+        resp.close()
+        return status
+
+
+class HTTPDriver:
+    """Talks HTTP/1.1 to a real server over one keep-alive connection, keeping its cookies."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.conn = None
+        self.cookies = {}
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        for attempt in (1, 2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                resp = self.conn.getresponse()
+                resp.read()
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # the server closed the idle connection; reconnect once
+                self.conn.close()
+                self.conn = None
+                if attempt == 2:
+                    raise
+        for header in resp.headers.get_all('Set-Cookie') or ():
+            name, _, rest = header.partition('=')
+            self.cookies[name.strip()] = rest.split(';', 1)[0]
+        if resp.will_close:
+            self.conn.close()
+            self.conn = None
+        return resp.status
+
+
+class WSGIServer:
+    """The app behind werkzeug's threaded WSGI server on an ephemeral port."""
+
+    def __init__(self, app):
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+
+    def driver(self):
+        return HTTPDriver('127.0.0.1', self.port)
+
+
+class FixtureServer:
+    """
+    Local HTTP server for RSS fixtures: ``routes`` maps a path to
+    ``(body, content_type)``. Honours If-None-Match with the route's ETag
+    so revalidation can be benchmarked as well.
+    """
+
+    def __init__(self, routes):
+        self.routes = routes
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(handler):
+                path = urlsplit(handler.path).path
+                route = self.routes.get(path)
+                if route is None:
+                    handler.send_response(404)
+                    handler.send_header('Content-Length', '0')
+                    handler.end_headers()
+                    return
+                body, content_type = route
+                etag = f'"{len(body):x}"'
+                if handler.headers.get('If-None-Match') == etag:
+                    handler.send_response(304)
+                    handler.send_header('ETag', etag)
+                    handler.send_header('Content-Length', '0')
+                    handler.end_headers()
+                    return
+                handler.send_response(200)
+                handler.send_header('Content-Type', content_type)
+                handler.send_header('Content-Length', str(len(body)))
+                handler.send_header('ETag', etag)
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+class Scenario:
+    """
+    One benchmarked route. ``build(i, rng)`` returns
+    ``(method, path, body, headers)`` for the i-th request.
+    """
+
+    def __init__(self, name, build, expect=(200,)):
+        self.name = name
+        self.build = build
+        self.expect = expect
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, seconds):
+    values = sorted(latencies)
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {
+        'throughput_rps': round(len(values) / seconds, 2) if seconds else None,
+        'latency_ms': {
+            'mean': ms(sum(values) / len(values)) if values else None,
+            'p50': ms(percentile(values, 50)),
+            'p95': ms(percentile(values, 95)),
+            'p99': ms(percentile(values, 99)),
+            'max': ms(values[-1]) if values else None,
+        },
+    }
+
+
+def run_scenario(scenario, driver_factory, requests, concurrency, warmup=10, max_seconds=60, seed=0):
+    """
+    Issue ``requests`` requests from ``concurrency`` threads, each with its
+    own driver, and return the stats. Stops early once ``max_seconds``
+    have passed, so very slow routes on big datasets still finish.
+    """
+    warm = driver_factory()
+    rng = random.Random(seed)
+    for i in range(warmup):
+        warm.request(*scenario.build(i, rng))
+
+    counter = itertools.count()
+    latencies = []
+    errors = []
+    exceptions = []
+    lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = started + max_seconds
+
+    def worker(tid):
+        driver = driver_factory()
+        rng = random.Random(seed * 1000 + tid)
+        local, failed, raised = [], [], []
+        while time.perf_counter() < deadline:
+            i = next(counter)
+            if i >= requests:
+                break
+            method, path, body, headers = scenario.build(i, rng)
+            t0 = time.perf_counter()
+            try:
+                status = driver.request(method, path, body, headers)
+            except Exception as e:
+                raised.append(type(e).__name__)
+                continue
+            local.append(time.perf_counter() - t0)
+            if status not in scenario.expect:
+                failed.append(status)
+        with lock:
+            latencies.extend(local)
+            errors.extend(failed)
+            exceptions.extend(raised)
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    seconds = time.perf_counter() - started
+
+    stats = {
+        'scenario': scenario.name,
+        'requests': len(latencies),
+        'errors': len(errors) + len(exceptions),
+        'error_samples': sorted({str(e) for e in errors + exceptions})[:5],
+        'concurrency': concurrency,
+        'seconds': round(seconds, 3),
+        'truncated': len(latencies) + len(exceptions) < requests,
+    }
+    stats.update(summarize(latencies, seconds))
+    return stats
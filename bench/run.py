@@ -0,0 +1,150 @@
+"""
+Benchmark the apps' hot routes on synthetic datasets.
+
+    python bench/run.py                              # every app, 1k rows
+    python bench/run.py --apps documents_tracker --sizes 1k,100k,1M
+    python bench/compare.py old.json new.json
+
+Every (app, size) runs in its own subprocess against a scratch copy of the
+app, through the Flask test client and a real threaded WSGI server. The
+results (throughput, p50/p95/p99 latency) are written as JSON.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+MODES = ('client', 'wsgi')
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_worker(config):
+    """Set up one app/dataset and run its scenarios in every mode (subprocess side)."""
+    sys.path.insert(0, str(HERE))
+    from harness import TestClientDriver, WSGIServer, run_scenario
+    from scenarios import APPS
+
+    started = time.perf_counter()
+    target = APPS[config['app']](config['workdir'], config['rows'], config['seed'])
+    setup_seconds = round(time.perf_counter() - started, 3)
+    login = target.login or (lambda driver: driver)
+    scenarios = [s for s in target.scenarios if not config['scenarios'] or s.name in config['scenarios']]
+
+    def run_all(mode, factory):
+        for scenario in scenarios:
+            stats = run_scenario(
+                scenario, factory, config['requests'], config['concurrency'],
+                warmup=config['warmup'], max_seconds=config['max_seconds'], seed=config['seed'],
+            )
+            stats.update(app=config['app'], rows=config['rows'], mode=mode,
+                         dataset=target.dataset, setup_seconds=setup_seconds)
+            results.append(stats)
+            print(f"  {config['app']:<18} {config['rows']:>8} {mode:<6} {scenario.name:<24} "
+                  f"{stats['throughput_rps']:>9} rps  p50 {stats['latency_ms']['p50']} ms  "
+                  f"p99 {stats['latency_ms']['p99']} ms  errors {stats['errors']}", file=sys.stderr)
+
+    results = []
+    try:
+        if 'client' in config['modes']:
+            run_all('client', lambda: login(TestClientDriver(target.app)))
+        if 'wsgi' in config['modes']:
+            with WSGIServer(target.app) as server:
+                run_all('wsgi', lambda: login(server.driver()))
+    finally:
+        if target.close:
+            target.close()
+    with open(config['output'], 'w') as fh:
+        json.dump(results, fh)
+
+
+def main():
+    from scenarios import APPS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--apps', default=','.join(APPS), help='comma-separated, from: ' + ', '.join(APPS))
+    parser.add_argument('--sizes', default='1k', help='dataset rows, e.g. 1k,100k,1M')
+    parser.add_argument('--modes', default=','.join(MODES), help='client (Flask test client), wsgi (real server)')
+    parser.add_argument('--scenarios', default='', help='only these scenario names')
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--max-seconds', type=float, default=30, help='time cap per scenario')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='results JSON (default: bench/results/<timestamp>.json)')
+    args = parser.parse_args()
+
+    apps = [a for a in args.apps.split(',') if a]
+    unknown = set(apps) - set(APPS)
+    if unknown:
+        parser.error('unknown apps: ' + ', '.join(sorted(unknown)))
+    stamp = datetime.now(timezone.utc)
+    output = Path(args.output or HERE / 'results' / f"{stamp.strftime('%Y%m%dT%H%M%SZ')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    failures = []
+    for app in apps:
+        for size in args.sizes.split(','):
+            rows = parse_size(size)
+            with tempfile.TemporaryDirectory(prefix=f'bench-{app}-') as workdir:
+                config = {
+                    'app': app, 'rows': rows, 'workdir': workdir, 'seed': args.seed,
+                    'modes': args.modes.split(','), 'scenarios': [s for s in args.scenarios.split(',') if s],
+                    'requests': args.requests, 'concurrency': args.concurrency, 'warmup': args.warmup,
+                    'max_seconds': args.max_seconds, 'output': os.path.join(workdir, 'results.json'),
+                }
+                print(f'{app} with {rows} rows ...', file=sys.stderr)
+                proc = subprocess.run([sys.executable, __file__, '--worker', json.dumps(config)], cwd=workdir)
+                if proc.returncode != 0:
+                    failures.append({'app': app, 'rows': rows, 'returncode': proc.returncode})
+                    continue
+                with open(config['output']) as fh:
+                    results.extend(json.load(fh))
+
+    report = {
+        'meta': {
+            'timestamp': stamp.isoformat(),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'args': vars(args),
+        },
+        'results': results,
+        'failures': failures,
+    }
+    with open(output, 'w') as fh:
+        json.dump(report, fh, indent=2)
+    print(f'wrote {output}', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == '--worker':
+        run_worker(json.loads(sys.argv[2]))
+    else:
+        sys.path.insert(0, str(HERE))
+        sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Per-app setup for the benchmarks: copy the app into a scratch directory,
+generate a synthetic dataset there and describe the routes to drive.
+
+Each ``setup_*`` function takes ``(workdir, rows, seed)`` and returns a
+Target. Apps are imported from the copy, so the databases checked into the
+repo are never opened.
+"""
+import importlib
+import itertools
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import quote, urlencode
+
+from harness import FixtureServer, Scenario
+
+ROOT = Path(__file__).resolve().parent.parent
+APPS_DIR = ROOT / '2. App Development'
+
+WORDS = (
+    'alpha bank beta bills car contract delta doctor email energy family flight gamma '
+    'garden health home insurance invoice kappa lambda lease loan medical mobile mortgage '
+    'network notes omega passport pension phone policy python receipt rent report school '
+    'sigma sqlite statement storage subscription tax theta ticket travel utility vault '
+    'visa warranty work'
+).split()
+HOSTS = [f'docs{i}.example.com' for i in range(200)]
+BATCH = 10000
+# RSS fixture feeds are generated as one XML document; keep it bounded
+MAX_FEED_ITEMS = 20000
+
+
+class Target:
+    def __init__(self, app, scenarios, login=None, close=None, dataset=None):
+        self.app = app
+        self.scenarios = scenarios
+        self.login = login
+        self.close = close
+        self.dataset = dataset or {}
+
+
+def copy_app(src, workdir):
+    # keep the app's place in the tree: apps import <repo>/shared relative to themselves
+    ignore = shutil.ignore_patterns('*.db', '*.db-*', '__pycache__', 'instance', '.DS_Store', 'feeds.db*')
+    dst = Path(workdir) / src.relative_to(ROOT)
+    shutil.copytree(src, dst, ignore=ignore)
+    shutil.copytree(ROOT / 'shared', Path(workdir) / 'shared', ignore=ignore)
+    sys.path.insert(0, str(dst))
+    return dst
+
+
+def words(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+
+def batched(iterable, size=BATCH):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def bulk_insert(path, sql, rows):
+    conn = sqlite3.connect(path)
+    try:
+        for chunk in batched(rows):
+            with conn:
+                conn.executemany(sql, chunk)
+    finally:
+        conn.close()
+
+
+def form(data):
+    return urlencode(data), {'Content-Type': 'application/x-www-form-urlencoded'}
+
+
+# --- a. password_vault -------------------------------------------------------
+
+def setup_password_vault(workdir, rows, seed):
+    dst = copy_app(APPS_DIR / 'a. password_vault', workdir)
+    module = importlib.import_module('app')  # creates and migrates vault.db
+    rng = random.Random(seed)
+    bulk_insert(
+        dst / 'vault.db',
+        'INSERT INTO entries (site, username, password, description) VALUES (?, ?, ?, ?)',
+        ((f'{rng.choice(WORDS)}{i}.example.com', f'user{i}', f'pw{i:08d}', words(rng, 6)) for i in range(rows)),
+    )
+
+    def login(driver):
+        body, headers = form({'username': module.USERNAME, 'password': module.PASSWORD})
+        driver.request('POST', '/login', body, headers)
+        return driver
+
+    scenarios = [
+        Scenario('index_search', lambda i, r: ('GET', '/?q=' + r.choice(WORDS), None, None)),
+        Scenario('index_search_short', lambda i, r: ('GET', '/?q=' + r.choice(WORDS)[:2], None, None)),
+        Scenario('index_list', lambda i, r: ('GET', '/', None, None)),
+        Scenario('api_entries_page', lambda i, r: ('GET', f'/api/entries?before={r.randint(1, rows + 1)}', None, None)),
+    ]
+    return Target(module.app, scenarios, login=login, dataset={'entries': rows})
+
+
+# --- c. documents_tracker ----------------------------------------------------
+
+def setup_documents_tracker(workdir, rows, seed):
+    dst = copy_app(APPS_DIR / 'c. documents_tracker', workdir)
+    module = importlib.import_module('app')  # creates doctrack.db, FTS and triggers
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+
+    def items():
+        for i in range(1, rows + 1):
+            urls = [f'https://{rng.choice(HOSTS)}/{rng.choice(WORDS)}/{i}']
+            yield (i, rng.choice(WORDS), words(rng, 5), json.dumps(urls), words(rng, 12),
+                   str(start + timedelta(seconds=i)), urls)
+
+    item_rows, url_rows = [], []
+    for row in items():
+        item_rows.append(row[:6])
+        url_rows.extend((row[0], pos, u, u.split('/')[2]) for pos, u in enumerate(row[6]))
+        if len(item_rows) >= BATCH:
+            flush_tracker(dst, item_rows, url_rows)
+    flush_tracker(dst, item_rows, url_rows)
+
+    def import_body(i, r):
+        batch = [{'section': r.choice(WORDS), 'desc': words(r, 5), 'notes': words(r, 10),
+                  'urls': [f'https://{r.choice(HOSTS)}/import/{i}/{n}']} for n in range(100)]
+        return 'POST', '/api/import', json.dumps(batch), {'Content-Type': 'application/json'}
+
+    scenarios = [
+        Scenario('items_search', lambda i, r: ('GET', '/api/items?limit=50&q=' + r.choice(WORDS), None, None)),
+        Scenario('items_search_prefix', lambda i, r: ('GET', '/api/items?limit=50&q=' + r.choice(WORDS)[:3], None, None)),
+        Scenario('items_list', lambda i, r: ('GET', '/api/items?limit=100', None, None)),
+        Scenario('items_by_host', lambda i, r: ('GET', '/api/items?limit=100&host=' + r.choice(HOSTS), None, None)),
+        Scenario('import_100', import_body),
+    ]
+    return Target(module.app, scenarios, dataset={'items': rows})
+
+
+def flush_tracker(dst, item_rows, url_rows):
+    conn = sqlite3.connect(dst / 'doctrack.db')
+    try:
+        with conn:
+            conn.executemany('INSERT INTO item (id, section, "desc", urls, notes, created) VALUES (?, ?, ?, ?, ?, ?)', item_rows)
+            conn.executemany('INSERT INTO item_urls (item_id, position, url, host) VALUES (?, ?, ?, ?)', url_rows)
+    finally:
+        conn.close()
+    item_rows.clear()
+    url_rows.clear()
+
+
+# --- d. rss_reader_app -------------------------------------------------------
+
+def rss_document(title, n, rng):
+    items = ''.join(
+        f'<item><title>{words(rng, 6)}</title><link>https://news.example.com/{i}</link>'
+        f'<guid>urn:bench:{title}:{i}</guid>'
+        f'<pubDate>{(datetime(2024, 1, 1) + timedelta(minutes=n - i)).strftime("%a, %d %b %Y %H:%M:%S +0000")}</pubDate>'
+        f'<description>{words(rng, 30)}</description></item>'
+        for i in range(n)
+    )
+    return (f'<?xml version="1.0"?><rss version="2.0"><channel><title>{title}</title>'
+            f'<link>https://news.example.com/</link><description>bench</description>{items}</channel></rss>').encode()
+
+
+def setup_rss_reader(workdir, rows, seed):
+    items = min(rows, MAX_FEED_ITEMS)
+    os.environ.update(
+        RSS_DB=str(Path(workdir) / 'feeds.db'),
+        RSS_POLLER='0',
+        RSS_MAX_ENTRIES=str(items),
+        RSS_MAX_BYTES=str(1 << 30),
+    )
+    copy_app(APPS_DIR / 'd. rss_reader_app', workdir)
+    module = importlib.import_module('app')
+    rng = random.Random(seed)
+    fixtures = FixtureServer({
+        '/feed.xml': (rss_document('big', items, rng), 'application/rss+xml'),
+        '/small.xml': (rss_document('small', 20, rng), 'application/rss+xml'),
+    })
+    feed = quote(fixtures.base_url + '/feed.xml', safe='')
+    small = fixtures.base_url + '/small.xml?n='
+    # every cold fetch needs a URL the app has never seen, across modes too
+    cold = itertools.count()
+
+    # subscribe and store the big feed once; the routes then read the store.
+    # Pages are keyset-paged, so collect every page's cursor on the way.
+    cursors = ['']
+    with module.app.test_client() as c:
+        older = c.get(f'/api/feed?url={feed}').get_json()['older']
+        while older:
+            cursors.append('&before=' + quote(older, safe=''))
+            older = c.get(f'/api/feed?url={feed}{cursors[-1]}').get_json()['older']
+
+    scenarios = [
+        Scenario('render_first_page', lambda i, r: ('GET', f'/?url={feed}', None, None)),
+        Scenario('render_random_page', lambda i, r: ('GET', f'/?url={feed}{r.choice(cursors)}', None, None)),
+        Scenario('api_feed_random_page', lambda i, r: ('GET', f'/api/feed?url={feed}{r.choice(cursors)}', None, None)),
+        Scenario('api_feed_cold_fetch', lambda i, r: ('GET', '/api/feed?url=' + quote(small + str(next(cold)), safe=''), None, None)),
+    ]
+    return Target(module.app, scenarios, close=fixtures.close, dataset={'feed_items': items})
+
+
+# --- WIP/personal_vault_secure_WIP -------------------------------------------
+
+def setup_secure_vault(workdir, rows, seed):
+    dst = copy_app(ROOT / 'WIP' / 'personal_vault_secure_WIP', workdir)
+    from backend import create_app
+    from backend.db import init_app_db
+    init_app_db()
+    rng = random.Random(seed)
+    sections = [(f'section-{n}', f'Section {n}') for n in range(10)]
+    db_path = dst / 'instance' / 'vault.db'
+    bulk_insert(db_path, 'INSERT INTO sections (slug, title) VALUES (?, ?)', sections)
+    bulk_insert(
+        db_path,
+        'INSERT INTO entries (section_id, payload) VALUES (?, ?)',
+        ((rng.randint(1, len(sections)), json.dumps({
+            'name': words(rng, 3), 'account': f'{i:010d}', 'notes': words(rng, 8),
+        })) for i in range(rows)),
+    )
+    app = create_app()
+    scenarios = [
+        Scenario('index', lambda i, r: ('GET', '/', None, None)),
+        Scenario('login_page', lambda i, r: ('GET', '/auth/login', None, None)),
+    ]
+    return Target(app, scenarios, dataset={'entries': rows})
+
+
+APPS = {
+    'password_vault': setup_password_vault,
+    'documents_tracker': setup_documents_tracker,
+    'rss_reader': setup_rss_reader,
+    'secure_vault': setup_secure_vault,
+}
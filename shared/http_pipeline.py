@@ -0,0 +1,251 @@
+"""
+Response pipeline shared by the Flask apps in this repo.
+
+    import http_pipeline
+    http_pipeline.init_app(app)
+
+- Compression: 200 responses of a compressible type and at least
+  ``COMPRESS_MIN_SIZE`` bytes are brotli-compressed when the client accepts
+  it and the ``brotli`` package is installed, and gzipped otherwise.
+  Responses carrying an ETag are compressed once per (URL, ETag, encoding)
+  and then served from a small in-memory cache.
+- Conditional GETs: views wrapped in ``conditional(version)`` get a weak
+  ETag built from the data version the app already tracks (a change
+  counter, a row version, ...), never from a hash of the rendered body.
+  A matching If-None-Match is answered with 304 before the view runs.
+- Views wrapped in ``uncompressed`` are never compressed. Use it for
+  pages that show secrets, especially next to anything reflected from the
+  request: compressed sizes would leak them (BREACH).
+- Static assets: ``url_for('static', ...)`` adds a ``?v=<content hash>``
+  fingerprint, and requests carrying the current fingerprint are served
+  with a one-year ``immutable`` Cache-Control.
+"""
+import functools
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import current_app, make_response, request
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE = (
+    'text/', 'application/json', 'application/javascript', 'application/xml',
+    'application/rss+xml', 'application/atom+xml', 'image/svg+xml',
+)
+# static files are read into memory to be compressed; leave big ones alone
+MAX_STATIC_COMPRESS = 1024 * 1024
+
+DEFAULTS = {
+    'COMPRESS_MIN_SIZE': 1024,
+    'COMPRESS_LEVEL': 6,  # gzip
+    'COMPRESS_BR_QUALITY': 4,  # brotli; higher levels cost too much CPU for dynamic pages
+    'COMPRESS_CACHE_BYTES': 8 * 1024 * 1024,
+    'STATIC_MAX_AGE': 365 * 24 * 3600,
+}
+
+
+def version_etag(*parts):
+    """Opaque ETag value for a tuple of version parts (ids, counters, paths)."""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:20]
+
+
+def not_modified(etag, cache_control='no-cache'):
+    """A 304 response when the request's If-None-Match matches ``etag``, else None."""
+    if request.method not in ('GET', 'HEAD') or not request.if_none_match.contains_weak(etag):
+        return None
+    return tag(current_app.response_class(status=304), etag, cache_control)
+
+
+def tag(response, etag, cache_control='no-cache'):
+    """Set ``etag`` (weak) and ``cache_control`` on a successful response."""
+    if response.status_code in (200, 304):
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def conditional(version, cache_control='no-cache'):
+    """
+    Decorate a view whose output is determined by the request URL and
+    ``version()``, a cheap callable returning a tuple of version parts, or
+    None to skip caching for this request.
+
+    The version is read before the view runs. A write landing in between
+    only means the response carries an older tag than its data, so the
+    next request gets a 200 rather than a stale 304.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+            parts = version()
+            if parts is None:
+                return view(*args, **kwargs)
+            etag = version_etag(request.full_path, *parts)
+            resp = not_modified(etag, cache_control)
+            if resp is not None:
+                return resp
+            return tag(make_response(view(*args, **kwargs)), etag, cache_control)
+        return wrapper
+    return decorator
+
+
+def uncompressed(view):
+    """Decorate a view whose responses must be sent uncompressed (see module docstring)."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        request.environ['http_pipeline.uncompressed'] = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class Fingerprints:
+    """Content hashes of static files, recomputed when a file's mtime or size changes."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def get(self, filename):
+        path = safe_join(self.folder, filename)
+        if path is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            hit = self._hashes.get(filename)
+        if hit is not None and hit[0] == key:
+            return hit[1]
+        digest = hashlib.sha1()
+        with open(path, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(65536), b''):
+                digest.update(chunk)
+        value = digest.hexdigest()[:12]
+        with self._lock:
+            self._hashes[filename] = (key, value)
+        return value
+
+
+class CompressedCache:
+    """LRU of compressed bodies keyed by (URL, ETag, encoding), bounded in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._bodies = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._bodies.get(key)
+            if body is not None:
+                self._bodies.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._bodies.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._bodies[key] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._bodies.popitem(last=False)
+                self._bytes -= len(evicted)
+
+
+def choose_encoding():
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+
+def init_app(app):
+    for key, value in DEFAULTS.items():
+        app.config.setdefault(key, value)
+    fingerprints = Fingerprints(app.static_folder) if app.static_folder else None
+    cache = CompressedCache(app.config['COMPRESS_CACHE_BYTES'])
+
+    def encode(data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=app.config['COMPRESS_BR_QUALITY'])
+        return gzip.compress(data, compresslevel=app.config['COMPRESS_LEVEL'], mtime=0)
+
+    if fingerprints is not None:
+        @app.url_defaults
+        def static_fingerprint(endpoint, values):
+            if endpoint == 'static' and 'filename' in values and 'v' not in values:
+                version = fingerprints.get(values['filename'])
+                if version:
+                    values['v'] = version
+
+    @app.after_request
+    def finish(response):
+        if request.endpoint == 'static' and response.status_code in (200, 304):
+            version = request.args.get('v')
+            if version and fingerprints is not None and version == fingerprints.get(request.view_args['filename']):
+                response.headers['Cache-Control'] = f"public, max-age={app.config['STATIC_MAX_AGE']}, immutable"
+        compress(response)
+        return response
+
+    def compress(response):
+        if not (response.mimetype or '').startswith(COMPRESSIBLE):
+            return
+        if request.environ.get('http_pipeline.uncompressed'):
+            return
+        response.vary.add('Accept-Encoding')
+        if (
+            response.status_code != 200
+            or request.method == 'HEAD'
+            or 'Content-Encoding' in response.headers
+            or 'no-transform' in response.headers.get('Cache-Control', '')
+        ):
+            return
+        if response.direct_passthrough:
+            # send_file(): a file wrapper of known length
+            length = response.content_length
+            if length is None or length > MAX_STATIC_COMPRESS:
+                return
+            response.direct_passthrough = False
+        elif response.is_streamed:
+            return
+        encoding = choose_encoding()
+        if encoding is None:
+            return
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return
+        etag, weak = response.get_etag()
+        key = (request.full_path, etag, encoding) if etag else None
+        body = cache.get(key) if key else None
+        if body is None:
+            body = encode(data, encoding)
+            if len(body) >= len(data):
+                return
+            if key:
+                cache.put(key, body)
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        if etag and not weak:
+            # a strong ETag names exact bytes; this encoding is a different
+            # representation, but still a weak match for revalidation
+            response.set_etag(etag, weak=True)
+
+    app.extensions['http_pipeline'] = {'fingerprints': fingerprints, 'compressed': cache}
@@ -0,0 +1,325 @@
+"""
+Opt-in per-request instrumentation for the Flask apps in this repo.
+
+    import instrument
+    instrument.init_app(app)
+
+Each request is broken down into phases:
+
+- ``db``: sqlite3, including SQLAlchemy's connections, with a query count.
+- ``tpl``: Jinja template rendering.
+- ``json``: JSON serialization through the app's JSON provider.
+- ``http``: outbound requests made with ``requests``.
+
+Every response gets a ``Server-Timing`` header with these phases, and
+``/metrics`` serves per-route counters and latency histograms in the
+Prometheus text format. When ``INSTRUMENT_PROFILE_DIR`` is set, a sample
+of requests is run under cProfile and the ones slower than
+``INSTRUMENT_SLOW_MS`` are saved there as ``.prof`` files.
+
+Nothing here is active until ``init_app()`` is called; the apps only call
+it when ``INSTRUMENT=1``.
+"""
+import cProfile
+import functools
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import before_render_template, g, has_app_context, request, template_rendered
+from flask.json.provider import DefaultJSONProvider
+
+PHASES = ('db', 'tpl', 'json', 'http')
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    __slots__ = ('started', 'phases', 'active', 'queries', 'template_started', 'profile')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.active = set()
+        self.queries = 0
+        self.template_started = None
+        self.profile = None
+
+
+def current():
+    """Stats of the request being handled on this thread, or None."""
+    if has_app_context():
+        return g.get('_instrument')
+    return None
+
+
+@contextmanager
+def phase(name):
+    """Attribute the time spent in the block to ``name`` (e.g. 'json')."""
+    stats = current()
+    if stats is None or name in stats.active:
+        # nested blocks of the same phase are already being timed
+        yield
+        return
+    stats.active.add(name)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.phases[name] = stats.phases.get(name, 0.0) + time.perf_counter() - t0
+        stats.active.discard(name)
+
+
+def wrap(owner, name, phase_name):
+    """Replace ``owner.name`` (a module or class function) with a version timed as ``phase_name``."""
+    fn = getattr(owner, name)
+    if getattr(fn, '__instrumented__', False):
+        return
+
+    @functools.wraps(fn)
+    def timed(*args, **kwargs):
+        with phase(phase_name):
+            return fn(*args, **kwargs)
+
+    timed.__instrumented__ = True
+    setattr(owner, name, timed)
+
+
+# --- sqlite3 -----------------------------------------------------------------
+# SQLite does most of a SELECT's work while rows are fetched, so cursors
+# time their fetches as well as execute().
+
+class TimedCursor(sqlite3.Cursor):
+    def _timed(self, fn, *args, query=False):
+        stats = current()
+        if stats is None:
+            return fn(*args)
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            stats.phases['db'] += time.perf_counter() - t0
+            if query:
+                stats.queries += 1
+
+    def execute(self, *args):
+        return self._timed(super().execute, *args, query=True)
+
+    def executemany(self, *args):
+        return self._timed(super().executemany, *args, query=True)
+
+    def executescript(self, *args):
+        return self._timed(super().executescript, *args, query=True)
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, *args):
+        return self._timed(super().fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+    def __next__(self):
+        return self._timed(super().__next__)
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def executescript(self, *args):
+        return self.cursor().executescript(*args)
+
+
+_patched = set()
+_patch_lock = threading.Lock()
+
+
+def patch_sqlite():
+    """Make new sqlite3 connections (SQLAlchemy's too) timed connections."""
+    with _patch_lock:
+        if 'sqlite3' in _patched:
+            return
+        original = sqlite3.connect
+
+        def connect(*args, **kwargs):
+            kwargs.setdefault('factory', TimedConnection)
+            with phase('db'):
+                return original(*args, **kwargs)
+
+        sqlite3.connect = connect
+        sqlite3.dbapi2.connect = connect
+        _patched.add('sqlite3')
+
+
+def patch_requests():
+    """Time outbound HTTP made through requests (up to the response headers)."""
+    try:
+        import requests
+    except ImportError:
+        return
+    with _patch_lock:
+        if 'requests' in _patched:
+            return
+        original = requests.Session.send
+
+        def send(self, *args, **kwargs):
+            with phase('http'):
+                return original(self, *args, **kwargs)
+
+        requests.Session.send = send
+        _patched.add('requests')
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        with phase('json'):
+            return super().dumps(obj, **kwargs)
+
+
+# --- metrics -----------------------------------------------------------------
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}   # (route, method, status) -> count
+        self.latency = {}    # route -> [bucket counts..., sum, count]
+        self.phases = {}     # (route, phase) -> seconds
+        self.queries = {}    # route -> [total, max]
+
+    def record(self, route, method, status, seconds, stats):
+        with self._lock:
+            key = (route, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            hist = self.latency.setdefault(route, [0] * (len(BUCKETS) + 2))
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    hist[i] += 1
+            hist[-2] += seconds
+            hist[-1] += 1
+            for name, value in stats.phases.items():
+                self.phases[(route, name)] = self.phases.get((route, name), 0.0) + value
+            q = self.queries.setdefault(route, [0, 0])
+            q[0] += stats.queries
+            q[1] = max(q[1], stats.queries)
+
+    def render(self, prefix):
+        esc = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"')
+        lines = []
+        with self._lock:
+            lines.append(f'# TYPE {prefix}_requests_total counter')
+            for (route, method, status), n in sorted(self.requests.items()):
+                lines.append(f'{prefix}_requests_total{{route="{esc(route)}",method="{method}",status="{status}"}} {n}')
+            lines.append(f'# TYPE {prefix}_request_duration_seconds histogram')
+            for route, hist in sorted(self.latency.items()):
+                for bound, n in zip(BUCKETS, hist):
+                    lines.append(f'{prefix}_request_duration_seconds_bucket{{route="{esc(route)}",le="{bound}"}} {n}')
+                lines.append(f'{prefix}_request_duration_seconds_bucket{{route="{esc(route)}",le="+Inf"}} {hist[-1]}')
+                lines.append(f'{prefix}_request_duration_seconds_sum{{route="{esc(route)}"}} {hist[-2]:.6f}')
+                lines.append(f'{prefix}_request_duration_seconds_count{{route="{esc(route)}"}} {hist[-1]}')
+            lines.append(f'# TYPE {prefix}_request_phase_seconds_total counter')
+            for (route, name), seconds in sorted(self.phases.items()):
+                lines.append(f'{prefix}_request_phase_seconds_total{{route="{esc(route)}",phase="{name}"}} {seconds:.6f}')
+            lines.append(f'# TYPE {prefix}_db_queries_total counter')
+            for route, (total, _) in sorted(self.queries.items()):
+                lines.append(f'{prefix}_db_queries_total{{route="{esc(route)}"}} {total}')
+            lines.append(f'# TYPE {prefix}_db_queries_per_request_max gauge')
+            for route, (_, most) in sorted(self.queries.items()):
+                lines.append(f'{prefix}_db_queries_per_request_max{{route="{esc(route)}"}} {most}')
+        return '\n'.join(lines) + '\n'
+
+
+# --- Flask wiring ------------------------------------------------------------
+
+def init_app(app, prefix='app', metrics_path='/metrics'):
+    """
+    Instrument ``app``; metric names start with ``prefix``. Settings come
+    from the environment: INSTRUMENT_QUERY_WARN (log requests running more
+    queries than this), INSTRUMENT_PROFILE_DIR, INSTRUMENT_PROFILE_RATE
+    (fraction of requests profiled) and INSTRUMENT_SLOW_MS.
+    """
+    query_warn = int(os.environ.get('INSTRUMENT_QUERY_WARN', 50))
+    profile_dir = os.environ.get('INSTRUMENT_PROFILE_DIR')
+    profile_rate = float(os.environ.get('INSTRUMENT_PROFILE_RATE', 0.1))
+    slow = float(os.environ.get('INSTRUMENT_SLOW_MS', 500)) / 1000
+    # cProfile can only run one profile at a time per process
+    profiler_lock = threading.Lock()
+    metrics = Metrics()
+
+    patch_sqlite()
+    patch_requests()
+    app.json = TimedJSONProvider(app)
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+
+    @app.before_request
+    def start():
+        stats = g._instrument = RequestStats()
+        if profile_dir and random.random() < profile_rate and profiler_lock.acquire(blocking=False):
+            stats.profile = cProfile.Profile()
+            stats.profile.enable()
+
+    @app.after_request
+    def finish(response):
+        stats = g.get('_instrument')
+        if stats is None:
+            return response
+        total = time.perf_counter() - stats.started
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        timings = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in stats.phases.items() if seconds]
+        timings.append(f'db_queries;desc="{stats.queries} queries"')
+        timings.append(f'total;dur={total * 1000:.2f}')
+        response.headers.add('Server-Timing', ', '.join(timings))
+        if request.path != metrics_path:
+            metrics.record(route, request.method, response.status_code, total, stats)
+        if stats.queries > query_warn:
+            app.logger.warning('%s %s ran %d queries', request.method, route, stats.queries)
+        return response
+
+    @app.teardown_request
+    def stop_profile(exc=None):
+        stats = g.get('_instrument')
+        if stats is None or stats.profile is None:
+            return
+        stats.profile.disable()
+        try:
+            elapsed = time.perf_counter() - stats.started
+            if elapsed >= slow:
+                name = re.sub(r'\W+', '_', request.endpoint or 'unmatched')
+                path = os.path.join(profile_dir, f'{time.time_ns() // 1000000}-{name}-{elapsed * 1000:.0f}ms.prof')
+                stats.profile.dump_stats(path)
+        finally:
+            stats.profile = None
+            profiler_lock.release()
+
+    def template_start(sender, template, context, **extra):
+        stats = current()
+        if stats is not None:
+            stats.template_started = time.perf_counter()
+
+    def template_done(sender, template, context, **extra):
+        stats = current()
+        if stats is not None and stats.template_started is not None:
+            stats.phases['tpl'] += time.perf_counter() - stats.template_started
+            stats.template_started = None
+
+    # blinker holds receivers weakly by default; these are closures
+    before_render_template.connect(template_start, app, weak=False)
+    template_rendered.connect(template_done, app, weak=False)
+
+    def metrics_view():
+        return app.response_class(metrics.render(prefix), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule(metrics_path, 'instrument_metrics', metrics_view)
+    app.extensions['instrument'] = metrics
+    return metrics